@@ -0,0 +1,260 @@
+"""
+UserServices 热点路径基准测试
+
+    python -m benchmarks.run --sizes 10000 100000 1000000 --output bench.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json   # 与基线比较，回退时退出码为 1
+    python -m benchmarks.run --output benchmarks/baseline.json     # 更新基线
+
+每个规模使用一个本地 SQLite 文件(首次运行时生成并复用)。每个操作在单独的事务中执行，
+结束后回滚，数据库始终保持 N 个用户。报告吞吐(ops/sec)和 p50/p95/p99 延迟(毫秒)
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone as dt_timezone
+from typing import Callable, Dict, List, Optional
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.apps import apps  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from core.pagination import encode_cursor  # noqa: E402
+from users.cache import safety_user_cache  # noqa: E402
+from users.management.commands.seed import GIVEN_NAMES, SURNAMES, base36  # noqa: E402
+from users.ngram_index import user_name_index  # noqa: E402
+from users.service import UserServices  # noqa: E402
+from users.unique_filter import account_filter, planet_code_filter  # noqa: E402
+
+PASSWORD = "benchpassword"
+# 各操作默认的迭代次数：注册/登录受密码哈希限制，每次在百毫秒量级
+ITERATIONS = {
+    "user_register": 20,
+    "do_login": 20,
+    "list": 500,
+    "list_by_name": 200,
+    "delete_user": 500,
+}
+WARMUP = 3
+# 吞吐下降或 p95 上升超过该比例视为回退
+DEFAULT_THRESHOLD = 0.10
+
+
+class _Rollback(Exception):
+    pass
+
+
+def use_database(path: str) -> None:
+    """切换 default 连接使用的 SQLite 文件，并丢弃按旧数据构建的进程内索引和缓存"""
+    connection.close()
+    connection.settings_dict["NAME"] = path
+    user_name_index.invalidate()
+    account_filter.invalidate()
+    planet_code_filter.invalidate()
+    if safety_user_cache.backend is not None:
+        safety_user_cache.backend.clear()
+
+
+def seed(size: int, path: str) -> None:
+    """生成 size 个用户；已存在且行数一致的数据库直接复用"""
+    if os.path.exists(path):
+        with sqlite3.connect(path) as db:
+            try:
+                (count,) = db.execute("SELECT COUNT(*) FROM users").fetchone()
+            except sqlite3.Error:
+                count = -1
+        if count == size:
+            use_database(path)
+            # 旧版本生成的文件可能缺少之后新增的表(id_sequences、user_stats 等)
+            call_command("migrate", verbosity=0)
+            return
+        os.remove(path)
+
+    use_database(path)
+    # 托管的表(django_session、id_sequences、unique_keys、user_stats 等)由迁移创建，
+    # users、tags 等非托管的表按模型直接建表
+    call_command("migrate", verbosity=0)
+    with connection.schema_editor() as editor:
+        for model in apps.get_models():
+            if not model._meta.managed:
+                editor.create_model(model)
+
+    call_command(
+        "seed",
+        users=size,
+        seed=size,
+        prefix="bench",
+        password=PASSWORD,
+        stdout=sys.stderr,
+    )
+
+
+def measure(operation: Callable[[int], object], iterations: int) -> Dict[str, float]:
+    """在一个回滚的事务中执行 warmup + iterations 次，返回吞吐和延迟分位数"""
+    latencies: List[float] = []
+    try:
+        with transaction.atomic():
+            for i in range(-WARMUP, iterations):
+                start = time.perf_counter()
+                operation(i)
+                elapsed = time.perf_counter() - start
+                if i >= 0:
+                    latencies.append(elapsed)
+            raise _Rollback
+    except _Rollback:
+        pass
+
+    latencies.sort()
+
+    def percentile(p: float) -> float:
+        # nearest-rank
+        index = max(0, min(len(latencies) - 1, round(p / 100 * len(latencies)) - 1))
+        return latencies[index] * 1000
+
+    total = sum(latencies)
+    return {
+        "iterations": iterations,
+        "ops_per_sec": iterations / total if total else 0.0,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+    }
+
+
+def operations(size: int) -> Dict[str, Callable[[int], object]]:
+    rng = random.Random(size)
+
+    def register(i: int):
+        # planet_code 最长 5 位，用 "~" 前缀避开 seed 生成的 base36 编号
+        UserServices.user_register(
+            f"newbench{i + 100}", PASSWORD, PASSWORD, f"~{base36(i + 100)}"
+        )
+
+    def login(i: int):
+        UserServices.do_login(None, f"bench{rng.randrange(size):07d}", PASSWORD)
+
+    def list_page(i: int):
+        # 从随机位置开始的一页(keyset 游标)
+        UserServices.list(cursor=encode_cursor(rng.randrange(size)), limit=20)
+
+    def list_by_name(i: int):
+        # 姓 + 名的组合，选择性和真实的用户名查询接近
+        UserServices.list(rng.choice(SURNAMES) + rng.choice(GIVEN_NAMES), limit=20)
+
+    # 删除的行在回滚前一直不存在，每次取不同的 id
+    delete_ids = rng.sample(range(1, size + 1), min(size, 10_000))
+
+    def delete(i: int):
+        UserServices.delete_user(delete_ids[(i + WARMUP) % len(delete_ids)])
+
+    return {
+        "user_register": register,
+        "do_login": login,
+        "list": list_page,
+        "list_by_name": list_by_name,
+        "delete_user": delete,
+    }
+
+
+def compare(
+    results: Dict, baseline: Dict, threshold: float = DEFAULT_THRESHOLD
+) -> List[str]:
+    """返回回退描述列表：吞吐下降或 p95 上升超过 threshold"""
+    regressions = []
+    for size, ops in results["results"].items():
+        for name, current in ops.items():
+            base = baseline.get("results", {}).get(size, {}).get(name)
+            if not base:
+                continue
+            if current["ops_per_sec"] < base["ops_per_sec"] * (1 - threshold):
+                regressions.append(
+                    f"{name}@{size}: ops/sec {base['ops_per_sec']:.1f} -> "
+                    f"{current['ops_per_sec']:.1f}"
+                )
+            if current["p95_ms"] > base["p95_ms"] * (1 + threshold):
+                regressions.append(
+                    f"{name}@{size}: p95 {base['p95_ms']:.2f}ms -> "
+                    f"{current['p95_ms']:.2f}ms"
+                )
+    return regressions
+
+
+def run(
+    sizes: List[int], data_dir: str, only: Optional[List[str]], scale: float
+) -> Dict:
+    os.makedirs(data_dir, exist_ok=True)
+    results: Dict[str, Dict] = {}
+    for size in sizes:
+        seed(size, os.path.join(data_dir, f"users-{size}.sqlite3"))
+        results[str(size)] = {}
+        for name, operation in operations(size).items():
+            if only and name not in only:
+                continue
+            iterations = max(1, int(ITERATIONS[name] * scale))
+            result = measure(operation, iterations)
+            results[str(size)][name] = result
+            print(
+                f"{size:>8} {name:<14} {result['ops_per_sec']:>10.1f} ops/s  "
+                f"p50 {result['p50_ms']:8.2f}ms  p95 {result['p95_ms']:8.2f}ms  "
+                f"p99 {result['p99_ms']:8.2f}ms",
+                file=sys.stderr,
+            )
+    return {
+        "meta": {
+            "timestamp": datetime.now(dt_timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument(
+        "--data-dir", default=os.path.join(tempfile.gettempdir(), "user_center_bench")
+    )
+    parser.add_argument("--only", nargs="+", choices=sorted(ITERATIONS))
+    parser.add_argument("--scale", type=float, default=1.0, help="迭代次数倍率")
+    parser.add_argument("--output", help="结果 JSON 文件")
+    parser.add_argument("--baseline", help="用于比较的基线 JSON 文件")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.data_dir, args.only, args.scale)
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+"""
+基准测试使用的 Django 配置：在 user_center.settings 的基础上换成本地 SQLite
+数据库文件由 benchmarks.run 按用户规模切换
+"""
+
+import os
+
+# 基准测试不依赖 core/.env，缺少的配置项使用固定值
+for _key, _value in {
+    "SALT": "benchmark",
+    "USER_LOGIN_STATE": "user_login_state",
+    "DB_NAME": "benchmark",
+    "DB_USER": "",
+    "DB_PASSWORD": "",
+    "DB_HOST": "",
+    "DB_PORT": "0",
+    "DEBUG": "false",
+    "SECRET_KEY": "benchmark",
+    "DEFAULT_ROLE": "0",
+    "ADMIN_ROLE": "1",
+}.items():
+    os.environ.setdefault(_key, _value)
+
+from user_center.settings import *  # noqa: E402,F401,F403
+
+# DEBUG 下 Django 会保存每条查询，影响耗时和内存
+DEBUG = False
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+    }
+}
+
+# 只保留警告，避免 INFO 日志干扰输出
+LOGGING["loggers"]["django"]["level"] = "WARNING"  # noqa: F405
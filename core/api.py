@@ -0,0 +1,66 @@
+"""
+运行状态监控接口(仅管理员)
+"""
+
+from django.http import HttpResponse
+from ninja import Router
+from core.constants import ErrorCode
+from core.exception.business_exception import BusinessException
+from core.metrics import registry
+from core.db_pool import pool_stats
+from core.db_router import replicas
+from core.schemas import (
+    CacheStatsResponse,
+    DatabasePoolStatsResponse,
+    ReplicaStatsResponse,
+)
+from core.sessions import session_cache
+from users.api import is_admin
+from users.cache import safety_user_cache
+from users.throttle import login_throttle
+
+router = Router()
+
+
+@router.get("/cache", response=CacheStatsResponse, by_alias=True)
+def cache_stats(request):
+    if not is_admin(request):
+        raise BusinessException(
+            error_code=ErrorCode.NO_AUTH, description="仅管理员可查看"
+        )
+    stats = {"session": session_cache.stats()}
+    if safety_user_cache.backend is not None:
+        stats["safety_user"] = safety_user_cache.backend.stats()
+    if login_throttle.backend is not None:
+        stats["login_throttle"] = login_throttle.backend.stats()
+    return CacheStatsResponse.success(stats)
+
+
+@router.get("/db_pool", response=DatabasePoolStatsResponse, by_alias=True)
+def db_pool_stats(request):
+    if not is_admin(request):
+        raise BusinessException(
+            error_code=ErrorCode.NO_AUTH, description="仅管理员可查看"
+        )
+    return DatabasePoolStatsResponse.success(pool_stats())
+
+
+@router.get("/replicas", response=ReplicaStatsResponse, by_alias=True)
+def replica_stats(request):
+    if not is_admin(request):
+        raise BusinessException(
+            error_code=ErrorCode.NO_AUTH, description="仅管理员可查看"
+        )
+    return ReplicaStatsResponse.success(replicas.stats())
+
+
+@router.get("/metrics")
+def metrics(request):
+    # Prometheus 文本格式，抓取时需带上管理员 session
+    if not is_admin(request):
+        raise BusinessException(
+            error_code=ErrorCode.NO_AUTH, description="仅管理员可查看"
+        )
+    return HttpResponse(
+        registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
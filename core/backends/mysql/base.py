@@ -0,0 +1,13 @@
+"""
+带连接池的 MySQL 后端：settings.DATABASES 中 ENGINE 设为 core.backends.mysql
+"""
+
+from django.db.backends.mysql import base
+from core.db_pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    @staticmethod
+    def ping_connection(connection) -> None:
+        # mysqlclient 的 ping 不自动重连，连接断开时抛出 OperationalError
+        connection.ping()
@@ -0,0 +1,201 @@
+"""
+压缩位图(Roaring 风格)
+按 id 的高 16 位分桶，每个桶(container)根据基数选择存储方式：
+    - 元素不超过 ARRAY_MAX 个时用有序 array('H') 存低 16 位(稀疏)
+    - 否则用 65536 位的 Python int 作为位图(稠密)，与/或/差运算由 int 的位运算在 C 层完成
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, Iterator, Union
+
+ARRAY_MAX = 4096
+CONTAINER_BITS = 1 << 16
+LOW_MASK = CONTAINER_BITS - 1
+
+Container = Union[array, int]
+
+# 每个字节值中为 1 的位的下标，用于遍历稠密位图
+_BYTE_BITS = [tuple(i for i in range(8) if value >> i & 1) for value in range(256)]
+
+
+def _to_int(container: Container) -> int:
+    if isinstance(container, int):
+        return container
+    bits = bytearray(CONTAINER_BITS // 8)
+    for low in container:
+        bits[low >> 3] |= 1 << (low & 7)
+    return int.from_bytes(bits, "little")
+
+
+def _to_array(bits: int) -> array:
+    result = array("H")
+    data = bits.to_bytes(CONTAINER_BITS // 8, "little")
+    for index, byte in enumerate(data):
+        if byte:
+            base = index << 3
+            result.extend(base + i for i in _BYTE_BITS[byte])
+    return result
+
+
+def _cardinality(container: Container) -> int:
+    return container.bit_count() if isinstance(container, int) else len(container)
+
+
+def _normalize(container: Container) -> Container:
+    """根据基数在两种存储方式之间转换，空桶返回空 array"""
+    if isinstance(container, int):
+        return _to_array(container) if container.bit_count() <= ARRAY_MAX else container
+    return container if len(container) <= ARRAY_MAX else _to_int(container)
+
+
+def _and(a: Container, b: Container) -> Container:
+    if isinstance(a, int) and isinstance(b, int):
+        return _normalize(a & b)
+    if isinstance(a, int):
+        a, b = b, a
+    if isinstance(b, int):
+        return array("H", (low for low in a if b >> low & 1))
+    return array("H", sorted(set(a).intersection(b)))
+
+
+def _or(a: Container, b: Container) -> Container:
+    if isinstance(a, int) or isinstance(b, int):
+        return _to_int(a) | _to_int(b)
+    return _normalize(array("H", sorted(set(a).union(b))))
+
+
+def _andnot(a: Container, b: Container) -> Container:
+    if isinstance(a, int):
+        return _normalize(a & ~_to_int(b))
+    if isinstance(b, int):
+        return array("H", (low for low in a if not b >> low & 1))
+    return array("H", sorted(set(a).difference(b)))
+
+
+class RoaringBitmap:
+    """非负整数集合，支持增量增删和集合运算(&、|、-)，运算结果为新对象"""
+
+    __slots__ = ("_containers",)
+
+    def __init__(self, values: Iterable[int] = ()):
+        self._containers: Dict[int, Container] = {}
+        # 批量构建：先按高 16 位分组，再一次性生成每个桶
+        groups: Dict[int, set] = {}
+        for value in values:
+            groups.setdefault(value >> 16, set()).add(value & LOW_MASK)
+        for high, lows in groups.items():
+            self._containers[high] = _normalize(array("H", sorted(lows)))
+
+    @classmethod
+    def _from_containers(cls, containers: Dict[int, Container]) -> "RoaringBitmap":
+        bitmap = cls()
+        bitmap._containers = {
+            high: c for high, c in containers.items() if _cardinality(c)
+        }
+        return bitmap
+
+    def add(self, value: int) -> None:
+        high, low = value >> 16, value & LOW_MASK
+        container = self._containers.get(high)
+        if container is None:
+            self._containers[high] = array("H", [low])
+        elif isinstance(container, int):
+            self._containers[high] = container | (1 << low)
+        else:
+            index = bisect_left(container, low)
+            if index == len(container) or container[index] != low:
+                container.insert(index, low)
+                if len(container) > ARRAY_MAX:
+                    self._containers[high] = _to_int(container)
+
+    def discard(self, value: int) -> None:
+        high, low = value >> 16, value & LOW_MASK
+        container = self._containers.get(high)
+        if container is None:
+            return
+        if isinstance(container, int):
+            container = _normalize(container & ~(1 << low))
+        else:
+            index = bisect_left(container, low)
+            if index < len(container) and container[index] == low:
+                del container[index]
+        if _cardinality(container):
+            self._containers[high] = container
+        else:
+            del self._containers[high]
+
+    def __contains__(self, value: int) -> bool:
+        container = self._containers.get(value >> 16)
+        if container is None:
+            return False
+        low = value & LOW_MASK
+        if isinstance(container, int):
+            return bool(container >> low & 1)
+        index = bisect_left(container, low)
+        return index < len(container) and container[index] == low
+
+    def __len__(self) -> int:
+        return sum(_cardinality(c) for c in self._containers.values())
+
+    def __bool__(self) -> bool:
+        return bool(self._containers)
+
+    def __iter__(self) -> Iterator[int]:
+        return self.iter_after(-1)
+
+    def iter_after(self, value: int) -> Iterator[int]:
+        """按升序遍历大于 value 的元素，用于 keyset 分页"""
+        for high in sorted(self._containers):
+            if high < value >> 16:
+                continue
+            container = self._containers[high]
+            if isinstance(container, int):
+                container = _to_array(container)
+            base = high << 16
+            start = 0
+            if high == value >> 16:
+                start = bisect_right(container, value & LOW_MASK)
+            for index in range(start, len(container)):
+                yield base | container[index]
+
+    def __and__(self, other: "RoaringBitmap") -> "RoaringBitmap":
+        return RoaringBitmap._from_containers(
+            {
+                high: _and(c, other._containers[high])
+                for high, c in self._containers.items()
+                if high in other._containers
+            }
+        )
+
+    def __or__(self, other: "RoaringBitmap") -> "RoaringBitmap":
+        containers = {high: _copy(c) for high, c in self._containers.items()}
+        for high, c in other._containers.items():
+            containers[high] = (
+                _or(containers[high], c) if high in containers else _copy(c)
+            )
+        return RoaringBitmap._from_containers(containers)
+
+    def __sub__(self, other: "RoaringBitmap") -> "RoaringBitmap":
+        return RoaringBitmap._from_containers(
+            {
+                high: (
+                    _andnot(c, other._containers[high])
+                    if high in other._containers
+                    else _copy(c)
+                )
+                for high, c in self._containers.items()
+            }
+        )
+
+    def copy(self) -> "RoaringBitmap":
+        return RoaringBitmap._from_containers(
+            {high: _copy(c) for high, c in self._containers.items()}
+        )
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, RoaringBitmap) and list(self) == list(other)
+
+
+def _copy(container: Container) -> Container:
+    return container if isinstance(container, int) else array("H", container)
@@ -0,0 +1,97 @@
+"""
+布隆过滤器
+判断"一定不存在"或"可能存在"：不存在的判断没有误差，存在的判断有 error_rate 的误判率
+"""
+
+import hashlib
+import math
+import os
+import struct
+import threading
+from typing import Optional
+
+_MAGIC = b"UCBF1"
+_HEADER = struct.Struct("<5sQIQq")
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # m = -n·ln(p) / ln(2)^2，k = m/n·ln(2)
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+        # 构建时读取到的最大用户 id，用于持久化后增量追赶
+        self.max_id = 0
+        self._lock = threading.Lock()
+
+    def _positions(self, value: str):
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        # 双重哈希模拟 k 个独立哈希函数
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, value: str) -> None:
+        positions = list(self._positions(value))
+        # bytearray 的读改写不是原子的，并发写入可能丢位导致误判"不存在"，必须加锁
+        with self._lock:
+            added = False
+            for position in positions:
+                mask = 1 << (position & 7)
+                if not self.bits[position >> 3] & mask:
+                    self.bits[position >> 3] |= mask
+                    added = True
+            # 所有位都已置位说明(很可能)是重复元素，不计数
+            if added:
+                self.count += 1
+
+    def __contains__(self, value: str) -> bool:
+        bits = self.bits
+        return all(
+            bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(value)
+        )
+
+    @property
+    def saturated(self) -> bool:
+        """写入数量超过设计容量后误判率会快速上升，需要按更大容量重建"""
+        return self.count > self.capacity
+
+    def save(self, path: str) -> None:
+        """原子地写入文件(先写临时文件再改名)"""
+        tmp_path = f"{path}.tmp"
+        with self._lock:
+            header = _HEADER.pack(
+                _MAGIC, self.num_bits, self.num_hashes, self.count, self.max_id
+            )
+            data = bytes(self.bits)
+        with open(tmp_path, "wb") as file:
+            file.write(header)
+            file.write(data)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, error_rate: float = 0.001) -> Optional["BloomFilter"]:
+        """读取 save 写入的文件，文件不存在或格式不对时返回 None"""
+        try:
+            with open(path, "rb") as file:
+                header = file.read(_HEADER.size)
+                magic, num_bits, num_hashes, count, max_id = _HEADER.unpack(header)
+                bits = bytearray(file.read())
+        except (OSError, struct.error):
+            return None
+        if magic != _MAGIC or len(bits) != (num_bits + 7) // 8:
+            return None
+        bloom = cls.__new__(cls)
+        bloom.num_bits, bloom.num_hashes = num_bits, num_hashes
+        bloom.capacity = max(
+            1, int(num_bits * math.log(2) ** 2 / -math.log(error_rate))
+        )
+        bloom.error_rate = error_rate
+        bloom.bits, bloom.count, bloom.max_id = bits, count, max_id
+        bloom._lock = threading.Lock()
+        return bloom
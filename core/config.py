@@ -1,3 +1,4 @@
+from functools import lru_cache
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -13,5 +14,96 @@ class ProjectConfig(BaseSettings):
     secret_key: str
     default_role: int
     admin_role: int
+    # 为 True 时 users 路由使用 async def 处理函数和异步 ORM(需以 ASGI 方式部署)
+    async_mode: bool = False
+    # 用户名模糊查询是否使用进程内 n-gram 索引
+    user_name_index: bool = True
+    # 进程内用户索引(n-gram、标签位图、标签矩阵，见 users/index_sync.py)：按 id 追赶其他进程新增用户的间隔秒数；
+    # 全量重建的间隔秒数(覆盖其他进程的改名、改标签和删除)，0 表示不追赶/不重建
+    user_index_refresh: float = 5
+    user_index_rebuild: float = 600
+    # 标签树缓存的最长有效期(秒)，用于感知其他进程的标签变更，0 表示只靠信号失效
+    tag_tree_ttl: int = 300
+    # 新密码使用的加密算法: pbkdf2_sha256 / scrypt，旧的加盐 MD5 密文在登录成功后自动升级
+    password_hasher: str = "pbkdf2_sha256"
+    pbkdf2_iterations: int = 260000
+    scrypt_n: int = 16384
+    scrypt_r: int = 8
+    scrypt_p: int = 1
+    # 加密池: thread / process、工作线程(进程)数、最多排队任务数(超过后拒绝)
+    hash_pool: str = "thread"
+    hash_workers: int = 4
+    hash_max_pending: int = 64
+    # 批量注册专用加密池的工作线程(进程)数，与登录、注册共用的加密池分开，批量任务不会占满共享池
+    batch_hash_workers: int = 2
+    # 注册查重前的布隆过滤器：是否启用、误判率、快照目录(为空不持久化)、追赶其他进程新增行的间隔(秒)
+    unique_filter: bool = True
+    unique_filter_error_rate: float = 0.001
+    unique_filter_dir: str = ""
+    unique_filter_refresh: float = 5
+    # session 缓存(core.sessions)的最多条数和有效期(秒)，有效期决定其他进程登出后的最长延迟
+    session_cache_size: int = 10000
+    session_cache_ttl: int = 60
+    # SafetyUser 缓存后端: local(进程内 LRU) / none / django:<CACHES 别名>，以及条数和有效期(秒)
+    safety_user_cache: str = "local"
+    safety_user_cache_size: int = 50000
+    safety_user_cache_ttl: int = 300
+    # 请求级查询统计(core.middleware)：是否启用、告警阈值(查询条数 / 数据库耗时毫秒 / 同一语句重复次数)
+    query_metrics: bool = True
+    query_count_warn: int = 30
+    query_time_warn_ms: float = 300
+    n_plus_one_threshold: int = 5
+    # 列表类接口跳过响应模型的二次校验，直接按预编译的字段映射序列化(core.serialization)
+    fast_serialization: bool = True
+    # 登录限流(users.throttle)：后端 local(进程内分片令牌桶) / none / django:<CACHES 别名>；
+    # 账号和客户端 IP 各一个令牌桶：容量(允许的突发次数)和每分钟补充的令牌数
+    login_throttle: str = "local"
+    login_throttle_account_burst: int = 10
+    login_throttle_account_per_minute: float = 5
+    login_throttle_ip_burst: int = 100
+    login_throttle_ip_per_minute: float = 60
+    login_throttle_shards: int = 64
+    login_throttle_max_keys: int = 100000
+    # 前面的反向代理层数：0 时用 REMOTE_ADDR，否则取 X-Forwarded-For 中倒数第 N 个地址
+    trusted_proxies: int = 0
+    # 日志(core.log)：是否由后台线程写日志、队列长度(满了丢弃并计数)、每批最多处理的条数后 flush
+    log_queue: bool = True
+    log_queue_size: int = 10000
+    log_batch_size: int = 256
+    # 业务异常日志：每个错误码第 1 次和之后每 N 次记录堆栈，0 表示不记录堆栈
+    business_exception_traceback_every: int = 100
+    # 读写分离(core.db_router)：从库地址 host[:port]，逗号分隔，为空时读写都走主库；
+    # 写操作后同一客户端读主库的时长(秒)，应不小于 db_replica_max_lag；
+    # 从库探测间隔(秒)、允许的最大复制延迟(秒)和连接超时(秒，从库宕机时探测线程最多等待的时长)
+    db_replicas: str = ""
+    db_replica_pin_seconds: int = 5
+    db_replica_check_interval: float = 5
+    db_replica_max_lag: float = 2
+    db_replica_connect_timeout: int = 2
+    # 数据库连接池(core.db_pool)：是否启用(ENGINE 使用 core.backends.mysql)、每个进程每个库的最大连接数、
+    # 连接用满时等待的最长时间(秒)、连接的最长使用时间和最长空闲时间(秒)、借出前是否 ping
+    db_pool: bool = True
+    db_pool_size: int = 10
+    db_pool_timeout: float = 10
+    db_pool_max_lifetime: float = 1800
+    db_pool_max_idle: float = 300
+    db_pool_pre_ping: bool = True
+    # users 表分片(users.sharding)：分片库 host[:port][/库名]，逗号分隔，按账号哈希分布，为空时不分片；
+    # 全局 id 每次从主库领取的个数；scatter-gather 查询的并发线程数，0 表示在当前线程依次查询
+    user_shards: str = ""
+    user_id_block: int = 100
+    user_shard_workers: int = 0
+    # 用户统计计数(users.stats)：每个计数的槽位数(并发写入分散到不同的行)；
+    # 读取时距上次按真实 COUNT 校正超过该秒数则在后台校正一次，0 表示只由 reconcile_user_stats 命令校正
+    user_stats_slots: int = 8
+    user_stats_reconcile_interval: float = 3600
 
     model_config = SettingsConfigDict(env_file="core/.env")
+
+
+@lru_cache(maxsize=None)
+def get_config() -> ProjectConfig:
+    """进程内共享的配置实例，环境变量和 core/.env 只读取一次
+    测试中修改配置属性会影响所有模块，需要用 monkeypatch 等方式还原
+    """
+    return ProjectConfig()  # type: ignore
@@ -11,6 +11,7 @@ class ErrorCode(Enum):
     NO_AUTH = (40101, "无权限", "")
     USER_NOT_EXIST = (40102, "密码不正确", "")
     ALREADY_LOGOUT = (40300, "已经登出", "")
+    TOO_MANY_REQUESTS = (42900, "请求过于频繁", "")
     SYSTEM_ERROR = (50000, "系统内部异常", "")
 
     def __init__(self, code: int, message: str, description: str):
@@ -0,0 +1,274 @@
+"""
+数据库连接池
+    - 每个进程每个数据库别名一个 ConnectionPool，连接数不超过 db_pool_size，用满时借用方最多等待 db_pool_timeout 秒
+    - Django 在请求开始和结束时关闭连接(CONN_MAX_AGE=0)，PooledDatabaseWrapperMixin 把关闭改为归还，
+      下一次 connect 从池中借出，省去 TCP 和认证握手
+    - 借出前 ping(db_pool_pre_ping)，失败的连接关闭后换一个；使用超过 db_pool_max_lifetime 秒
+      或空闲超过 db_pool_max_idle 秒的连接在借出和归还时关闭
+    - 连接只在借出它的线程中使用，WSGI 线程和 ASGI 的 sync_to_async 线程都适用；fork 出的子进程使用新的池
+    - 统计(借出、等待、新建/关闭的连接数)由 /api/monitor/db_pool 和 /api/monitor/metrics 导出
+"""
+
+import atexit
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from django.db import OperationalError
+from core.config import get_config
+from core.metrics import TIME_BUCKETS, registry
+
+config = get_config()
+
+CHECKOUTS = registry.counter("db_pool_checkouts_total", "从连接池借出连接的次数")
+WAIT_SECONDS = registry.histogram(
+    "db_pool_wait_seconds", "连接池用满时等待连接的耗时", TIME_BUCKETS
+)
+TIMEOUTS = registry.counter("db_pool_timeouts_total", "等待连接超时的次数")
+CREATED = registry.counter("db_pool_connections_created_total", "新建的数据库连接数")
+CLOSED = registry.counter(
+    "db_pool_connections_closed_total", "按原因统计关闭的数据库连接数"
+)
+
+
+class _Entry:
+    __slots__ = ("connection", "created_at", "released_at")
+
+    def __init__(self, connection: Any):
+        self.connection = connection
+        self.created_at = self.released_at = time.monotonic()
+
+
+class ConnectionPool:
+    def __init__(
+        self,
+        alias: str,
+        connect: Callable[[], Any],
+        ping: Optional[Callable[[Any], None]],
+        max_size: int,
+        timeout: float,
+        max_lifetime: float,
+        max_idle: float,
+    ):
+        self.alias = alias
+        self.connect = connect
+        self.ping = ping
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self._cond = threading.Condition()
+        # 按归还时间排序，末尾是最近归还的
+        self._idle: List[_Entry] = []
+        self._in_use: Dict[int, _Entry] = {}
+        # 已借出 + 空闲 + 正在新建的连接数
+        self._size = 0
+        self._stats = dict.fromkeys(
+            ("checkouts", "waits", "timeouts", "created", "closed"), 0
+        )
+        self._wait_seconds = 0.0
+
+    def acquire(self) -> Any:
+        deadline = time.monotonic() + self.timeout
+        waited = 0.0
+        while True:
+            expired: List[_Entry] = []
+            entry = None
+            with self._cond:
+                expired.extend(self._evict_idle())
+                if self._idle:
+                    entry = self._idle.pop()
+                elif self._size < self.max_size:
+                    self._size += 1
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        TIMEOUTS.inc(alias=self.alias)
+                        raise OperationalError(
+                            f"数据库连接池 {self.alias} 已满({self.max_size})，"
+                            f"等待 {self.timeout} 秒超时"
+                        )
+                    start = time.monotonic()
+                    self._cond.wait(remaining)
+                    waited += time.monotonic() - start
+                    continue
+            self._close_all(expired, "idle")
+            if entry is None:
+                entry = self._create()
+            elif time.monotonic() - entry.created_at > self.max_lifetime:
+                self._close(entry, "lifetime")
+                continue
+            elif not self._usable(entry):
+                continue
+            with self._cond:
+                self._in_use[id(entry.connection)] = entry
+                self._stats["checkouts"] += 1
+                if waited:
+                    self._stats["waits"] += 1
+                    self._wait_seconds += waited
+            CHECKOUTS.inc(alias=self.alias)
+            if waited:
+                WAIT_SECONDS.observe(waited, alias=self.alias)
+            return entry.connection
+
+    def release(self, connection: Any, discard: bool = False) -> None:
+        """归还连接；discard 为 True 或连接已超过最长使用时间时关闭"""
+        with self._cond:
+            entry = self._in_use.pop(id(connection), None)
+            if (
+                entry is not None
+                and not discard
+                and time.monotonic() - entry.created_at <= self.max_lifetime
+            ):
+                entry.released_at = time.monotonic()
+                self._idle.append(entry)
+                self._cond.notify()
+                return
+        if entry is None:
+            # 不是本池借出的连接(例如 fork 之前借出的)
+            _close_quietly(connection)
+        else:
+            self._close(entry, "discarded" if discard else "lifetime")
+
+    def close_idle(self) -> None:
+        with self._cond:
+            idle, self._idle = self._idle, []
+        self._close_all(idle, "shutdown")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                **self._stats,
+                "wait_seconds": round(self._wait_seconds, 6),
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "max_size": self.max_size,
+            }
+
+    def _evict_idle(self) -> List[_Entry]:
+        # 调用方持有锁；最早归还的在前面
+        now = time.monotonic()
+        count = 0
+        for entry in self._idle:
+            if now - entry.released_at <= self.max_idle:
+                break
+            count += 1
+        expired, self._idle[:count] = self._idle[:count], []
+        return expired
+
+    def _create(self) -> _Entry:
+        try:
+            entry = _Entry(self.connect())
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats["created"] += 1
+        CREATED.inc(alias=self.alias)
+        return entry
+
+    def _usable(self, entry: _Entry) -> bool:
+        if self.ping is None:
+            return True
+        try:
+            self.ping(entry.connection)
+        except Exception:
+            self._close(entry, "ping")
+            return False
+        return True
+
+    def _close(self, entry: _Entry, reason: str) -> None:
+        _close_quietly(entry.connection)
+        with self._cond:
+            self._size -= 1
+            self._stats["closed"] += 1
+            self._cond.notify()
+        CLOSED.inc(alias=self.alias, reason=reason)
+
+    def _close_all(self, entries: List[_Entry], reason: str) -> None:
+        for entry in entries:
+            self._close(entry, reason)
+
+
+def _close_quietly(connection: Any) -> None:
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias: str, connect: Callable[[], Any], ping) -> ConnectionPool:
+    pool = _pools.get(alias)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(alias)
+            if pool is None:
+                pool = _pools[alias] = ConnectionPool(
+                    alias,
+                    connect,
+                    ping if config.db_pool_pre_ping else None,
+                    config.db_pool_size,
+                    config.db_pool_timeout,
+                    config.db_pool_max_lifetime,
+                    config.db_pool_max_idle,
+                )
+    return pool
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    return {alias: pool.stats() for alias, pool in list(_pools.items())}
+
+
+def _close_pools() -> None:
+    for pool in list(_pools.values()):
+        pool.close_idle()
+
+
+def _reset_after_fork() -> None:
+    # 子进程不能使用父进程的连接，也不关闭它们(关闭会断开父进程的连接)
+    _pools.clear()
+
+
+atexit.register(_close_pools)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class PooledDatabaseWrapperMixin:
+    """与 Django 的 DatabaseWrapper 组合使用：新建连接改为从池中借出，关闭连接改为归还"""
+
+    @staticmethod
+    def ping_connection(connection: Any) -> None:
+        """连接不可用时抛出异常"""
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        finally:
+            cursor.close()
+
+    def get_new_connection(self, conn_params):
+        connect = super().get_new_connection
+        pool = get_pool(self.alias, lambda: connect(conn_params), self.ping_connection)
+        return pool.acquire()
+
+    def _close(self):
+        pool = _pools.get(self.alias)
+        if pool is None or self.connection is None:
+            return super()._close()
+        connection = self.connection
+        # 事务中关闭(通常是出错后)的连接状态不确定，直接丢弃；否则回滚未提交的事务后归还
+        discard = self.in_atomic_block
+        if not discard and not self.autocommit:
+            try:
+                connection.rollback()
+            except Exception:
+                discard = True
+        pool.release(connection, discard=discard)
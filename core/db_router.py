@@ -0,0 +1,248 @@
+"""
+读写分离路由(settings.DATABASE_ROUTERS)
+    - 写操作总是走主库(default)；读操作在 settings.DATABASE_REPLICAS 列出的从库中选择
+    - 以下情况读主库：主库连接处于事务中；use_primary() 块内；当前请求已经写过数据库；
+      请求带有 db_pin cookie(同一客户端在写操作之后 db_replica_pin_seconds 秒内，见 ReplicaPinMiddleware)
+    - 从库由后台线程每 db_replica_check_interval 秒探测一次：SELECT 1 的耗时(指数平滑)和复制延迟；
+      连接失败或延迟超过 db_replica_max_lag 的从库暂不使用。健康的从库按耗时的倒数加权随机选择，
+      没有健康的从库时读主库。探测不在请求线程中执行：第一次选择从库时启动探测线程，
+      首次探测完成前读主库
+    - 从其他库(users 分片)取出的实例，保存、删除和关联查询仍在该库进行
+    - 本地可以用多个 SQLite 文件充当主库和从库，复制延迟视为 0
+"""
+
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Optional
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from core.config import get_config
+
+config = get_config()
+logger = logging.getLogger("django")
+
+PIN_COOKIE = "db_pin"
+# 探测耗时的平滑系数；按耗时的倒数加权选择从库，耗时低于 MIN_LATENCY 的按 MIN_LATENCY 计
+LATENCY_ALPHA = 0.3
+MIN_LATENCY = 0.0001
+
+
+class RequestState:
+    """一个请求的读写状态；在 sync_to_async 的线程中修改也能被中间件看到"""
+
+    __slots__ = ("pinned", "wrote")
+
+    def __init__(self, pinned: bool = False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+_request: ContextVar[Optional[RequestState]] = ContextVar(
+    "db_request_state", default=None
+)
+_force_primary: ContextVar[bool] = ContextVar("db_force_primary", default=False)
+
+
+@contextmanager
+def use_primary():
+    """块内(或被装饰的函数中)的读操作走主库；用于按信号和版本戳维护一致性的进程内索引和缓存"""
+    token = _force_primary.set(True)
+    try:
+        yield
+    finally:
+        _force_primary.reset(token)
+
+
+@contextmanager
+def request_state(pinned: bool = False):
+    state = RequestState(pinned)
+    token = _request.set(state)
+    try:
+        yield state
+    finally:
+        _request.reset(token)
+
+
+class ReplicaStatus:
+    __slots__ = ("alias", "healthy", "latency", "lag", "error")
+
+    def __init__(self, alias: str):
+        self.alias = alias
+        self.healthy = False
+        self.latency: Optional[float] = None
+        self.lag: Optional[float] = None
+        self.error = ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "healthy": self.healthy,
+            "latency_ms": None if self.latency is None else self.latency * 1000,
+            "lag_seconds": self.lag,
+            "error": self.error,
+        }
+
+
+def replication_lag(connection) -> Optional[float]:
+    """复制延迟(秒)；复制已停止返回 None，不是从库或无法查询(SQLite、权限不足)时返回 0"""
+    if connection.vendor != "mysql":
+        return 0.0
+    with connection.cursor() as cursor:
+        for statement, column in (
+            ("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+            ("SHOW SLAVE STATUS", "Seconds_Behind_Master"),
+        ):
+            try:
+                cursor.execute(statement)
+            except DatabaseError:
+                continue
+            row = cursor.fetchone()
+            if row is None:
+                return 0.0
+            names = [description[0] for description in cursor.description]
+            value = dict(zip(names, row)).get(column)
+            return None if value is None else float(value)
+    return 0.0
+
+
+class ReplicaSet:
+    def __init__(self, aliases: Iterable[str], check_interval: float, max_lag: float):
+        self.aliases = list(aliases)
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        self._status = {alias: ReplicaStatus(alias) for alias in self.aliases}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def check(self) -> None:
+        """探测所有从库；在调用线程中使用各从库的连接"""
+        for status in self._status.values():
+            connection = connections[status.alias]
+            try:
+                start = time.perf_counter()
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                    cursor.fetchone()
+                latency = time.perf_counter() - start
+                lag = replication_lag(connection)
+            except DatabaseError as exc:
+                if status.healthy or not status.error:
+                    logger.warning(f"replica {status.alias} unavailable: {exc}")
+                status.healthy, status.error = False, str(exc)
+                # 断开的连接下次探测时重建
+                connection.close()
+            else:
+                status.latency = (
+                    latency
+                    if status.latency is None
+                    else LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * status.latency
+                )
+                status.lag = lag
+                status.healthy = lag is not None and lag <= self.max_lag
+                status.error = "" if status.healthy else "replication lag"
+
+    def start(self) -> None:
+        """启动后台探测线程(立即探测一次，之后每 check_interval 秒一次)"""
+        if self._thread is not None or not self.aliases:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="replica-check", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.is_set():
+                try:
+                    self.check()
+                except Exception:
+                    logger.exception("replica check failed")
+                self._stop.wait(self.check_interval)
+        finally:
+            # 本线程的连接不会在请求结束时关闭
+            for alias in self.aliases:
+                connections[alias].close()
+
+    def choose(self) -> Optional[str]:
+        """返回用于读操作的从库别名，没有健康的从库时返回 None"""
+        if not self.aliases:
+            return None
+        self.start()
+        healthy = [status for status in self._status.values() if status.healthy]
+        if not healthy:
+            return None
+        if len(healthy) == 1:
+            return healthy[0].alias
+        weights = [1 / max(status.latency, MIN_LATENCY) for status in healthy]
+        return random.choices(healthy, weights)[0].alias
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {alias: status.to_dict() for alias, status in self._status.items()}
+
+
+replicas = ReplicaSet(
+    getattr(settings, "DATABASE_REPLICAS", ()),
+    config.db_replica_check_interval,
+    config.db_replica_max_lag,
+)
+
+
+class PrimaryReplicaRouter:
+    def __init__(self, replica_set: Optional[ReplicaSet] = None):
+        self.replicas = replicas if replica_set is None else replica_set
+
+    def db_for_read(self, model, **hints) -> str:
+        other = self._other_db(hints)
+        if other is not None:
+            return other
+        if not self.replicas.aliases or self._use_primary():
+            return DEFAULT_DB_ALIAS
+        return self.replicas.choose() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints) -> str:
+        state = _request.get()
+        if state is not None:
+            state.wrote = True
+        return self._other_db(hints) or DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        # 从库与主库数据相同
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints) -> Optional[bool]:
+        # 从库的表结构由复制同步；users 分片只有手工建的 users 表
+        if db in self.replicas.aliases or db in getattr(settings, "USER_SHARDS", ()):
+            return False
+        return None
+
+    def _other_db(self, hints) -> Optional[str]:
+        """实例取自主从以外的库(users 分片)时，它的保存、删除和关联查询都在该库进行"""
+        instance = hints.get("instance")
+        db = getattr(getattr(instance, "_state", None), "db", None)
+        if db is None or db == DEFAULT_DB_ALIAS or db in self.replicas.aliases:
+            return None
+        return db
+
+    @staticmethod
+    def _use_primary() -> bool:
+        if _force_primary.get():
+            return True
+        state = _request.get()
+        if state is not None and (state.pinned or state.wrote):
+            return True
+        # 事务中的读要看到本事务的写入
+        return connections[DEFAULT_DB_ALIAS].in_atomic_block
@@ -2,22 +2,27 @@ from ninja import NinjaAPI
 from .exception.business_exception import BusinessException
 from users.schemas import ResponseBase
 from core.constants import ErrorCode
+from core.config import get_config
+from core.log import BusinessExceptionLog
 import logging
 
 logger = logging.getLogger("django")
+# 业务异常(密码错误、参数校验失败等)量大，只记一行，堆栈按错误码抽样
+business_log = BusinessExceptionLog(
+    logger, get_config().business_exception_traceback_every
+)
 
 
 def exception_handler(api: NinjaAPI):
     @api.exception_handler(BusinessException)
     def handle_business_exception(request, exc: BusinessException):
-        logger.error(
-            f"BusinessException occurred: {exc.code} - {exc.message}-{exc.description}",
-            exc_info=True,
-        )
+        business_log.log(request, exc)
         response = ResponseBase.from_error_code(
             code=exc.code, description=exc.description, message=exc.message
         )
-        return api.create_response(request, response, status=400)
+        # 限流返回 429，其他业务异常返回 400
+        status = 429 if exc.code == ErrorCode.TOO_MANY_REQUESTS.code else 400
+        return api.create_response(request, response, status=status)
 
     @api.exception_handler(Exception)
     def handle_exception(request, exc: Exception):
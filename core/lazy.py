@@ -0,0 +1,24 @@
+"""
+延迟导入：模块在第一次访问属性时才真正执行，用于导入开销大、只在部分请求中用到的可选依赖
+"""
+
+import importlib.util
+import sys
+from types import ModuleType
+from typing import Optional
+
+
+def lazy_import(name: str) -> Optional[ModuleType]:
+    """返回延迟加载的模块，模块未安装时返回 None(与 try/except ImportError 的写法等价)"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        return None
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,192 @@
+"""
+非阻塞日志
+    - configure：settings.LOGGING_CONFIG 指向这里。按 LOGGING 配置好处理器后，把每个 logger 的处理器
+      换成一个 QueueHandler，原处理器由后台线程(BatchQueueListener)调用；请求线程只做入队，
+      格式化(包括堆栈)和写文件都在后台线程中进行。队列满时丢弃并计数，不会阻塞请求
+    - BatchFileHandler：在队列之后使用时不逐条 flush，由后台线程在队列取空或攒够一批时统一 flush
+    - BusinessExceptionLog：业务异常记为一行带错误码的紧凑记录，按错误码分组计数，
+      堆栈按错误码抽样记录
+"""
+
+import atexit
+import copy
+import logging
+import logging.config
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler
+from typing import Dict, List
+from core.config import get_config
+from core.constants import ErrorCode
+from core.metrics import registry
+
+DROPPED = registry.counter("log_records_dropped_total", "日志队列已满而丢弃的记录数")
+BUSINESS_EXCEPTIONS = registry.counter(
+    "business_exceptions_total", "按错误码统计的业务异常数"
+)
+
+_STOP = object()
+
+
+class BatchFileHandler(logging.FileHandler):
+    """与 FileHandler 相同；deferred_flush 为 True 时写入后不 flush，由调用方批量 flush"""
+
+    deferred_flush = False
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if not self.deferred_flush:
+            return super().emit(record)
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 只合并消息参数，exc_info 原样交给后台线程格式化
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DROPPED.inc()
+
+
+class BatchQueueListener:
+    """从队列中取记录交给处理器；队列取空或处理满 batch_size 条后 flush 一次"""
+
+    def __init__(
+        self,
+        queue_handler: QueueHandler,
+        handlers: List[logging.Handler],
+        batch_size: int,
+    ):
+        self.queue_handler = queue_handler
+        self.queue = queue_handler.queue
+        self.handlers = handlers
+        self.batch_size = max(1, batch_size)
+        self._thread = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="log-listener", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        if self._thread is None:
+            return
+        self.queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        pending = 0
+        while True:
+            record = self.queue.get()
+            if record is _STOP:
+                self._flush()
+                return
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+            pending += 1
+            if pending >= self.batch_size or self.queue.empty():
+                self._flush()
+                pending = 0
+
+    def _flush(self) -> None:
+        for handler in self.handlers:
+            try:
+                handler.flush()
+            except Exception:  # pragma: no cover
+                pass
+
+
+_listeners: List[BatchQueueListener] = []
+
+
+def _stop_all() -> None:
+    for listener in _listeners:
+        listener.stop()
+
+
+def _restart_after_fork() -> None:
+    # 子进程中没有后台线程；fork 时队列的锁可能被持有，换一个新队列再启动
+    for listener in _listeners:
+        listener.queue = listener.queue_handler.queue = queue.Queue(
+            listener.queue.maxsize
+        )
+        listener._thread = None
+        listener.start()
+
+
+def configure(logging_settings: Dict) -> None:
+    """settings.LOGGING_CONFIG：按 dictConfig 配置，再把各 logger 的处理器移到后台线程"""
+    logging.config.dictConfig(logging_settings)
+    config = get_config()
+    if not config.log_queue:
+        return
+    _stop_all()
+    _listeners.clear()
+    for name in logging_settings.get("loggers", {}):
+        logger = logging.getLogger(name)
+        handlers = list(logger.handlers)
+        if not handlers:
+            continue
+        for handler in handlers:
+            if isinstance(handler, BatchFileHandler):
+                handler.deferred_flush = True
+            logger.removeHandler(handler)
+        queue_handler = NonBlockingQueueHandler(queue.Queue(config.log_queue_size))
+        logger.addHandler(queue_handler)
+        listener = BatchQueueListener(queue_handler, handlers, config.log_batch_size)
+        listener.start()
+        _listeners.append(listener)
+
+
+atexit.register(_stop_all)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+class BusinessExceptionLog:
+    """每个错误码第 1 次和之后每 traceback_every 次记录堆栈，其余只记一行"""
+
+    _names = {error_code.code: error_code.name for error_code in ErrorCode}
+
+    def __init__(self, logger: logging.Logger, traceback_every: int):
+        self.logger = logger
+        self.traceback_every = traceback_every
+        self._lock = threading.Lock()
+        self._counts: Dict[int, int] = {}
+
+    def log(self, request, exc) -> None:
+        code = exc.code
+        name = self._names.get(code, "UNKNOWN")
+        with self._lock:
+            count = self._counts.get(code, 0)
+            self._counts[code] = count + 1
+        BUSINESS_EXCEPTIONS.inc(code=str(code), name=name)
+        with_traceback = self.traceback_every > 0 and count % self.traceback_every == 0
+        method = getattr(request, "method", "-")
+        path = getattr(request, "path", "-")
+        self.logger.log(
+            logging.ERROR if code and code >= 50000 else logging.WARNING,
+            f"business_exception code={code} name={name} count={count + 1} "
+            f"{method} {path}: {exc.description}",
+            exc_info=exc if with_traceback else None,
+            extra={"error_code": code, "error_name": name},
+        )
+
+    def counts(self) -> Dict[int, int]:
+        with self._lock:
+            return dict(self._counts)
@@ -0,0 +1,205 @@
+"""
+数据库查询统计中间件
+    - 请求期间在每个数据库连接上挂一个 execute wrapper(connection.execute_wrapper，请求结束后移除，
+      管理命令、后台线程中的查询不受影响)，把语句耗时记到当前请求的 QueryStats(ContextVar，
+      同步视图和 sync_to_async 中的查询都能归到发起请求)
+    - 统计每个请求的查询条数、数据库总耗时、完全相同的重复语句和同一模板多次执行(N+1)
+    - 超过阈值时记录警告，并在响应中加入 Server-Timing 头
+    - 按接口汇总到 core.metrics 的直方图，由 /api/monitor/metrics 导出
+
+ReplicaPinMiddleware：读写分离(core.db_router)的请求状态；请求写过数据库时设置 db_pin cookie，
+同一客户端之后 db_replica_pin_seconds 秒内的读操作都走主库，能读到自己刚写入的数据
+"""
+
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connections
+from core.config import get_config
+from core.db_router import PIN_COOKIE, replicas, request_state
+from core.metrics import COUNT_BUCKETS, TIME_BUCKETS, registry
+
+config = get_config()
+logger = logging.getLogger("django")
+
+REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "请求处理耗时", TIME_BUCKETS
+)
+DB_QUERIES = registry.histogram(
+    "db_queries_per_request", "每个请求的数据库查询条数", COUNT_BUCKETS
+)
+DB_SECONDS = registry.histogram(
+    "db_time_per_request_seconds", "每个请求的数据库总耗时", TIME_BUCKETS
+)
+DUPLICATE_QUERIES = registry.counter(
+    "db_duplicate_queries_total", "语句和参数都相同的重复查询条数"
+)
+N_PLUS_ONE = registry.counter(
+    "db_n_plus_one_total", "同一 SQL 模板执行次数超过阈值的请求数"
+)
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Dict[Tuple[str, str], int] = Counter()
+        self.templates: Dict[str, int] = Counter()
+
+    def add(self, sql: str, params, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.templates[sql] += 1
+        self.statements[(sql, repr(params))] += 1
+
+    @property
+    def duplicates(self) -> int:
+        return sum(count - 1 for count in self.statements.values() if count > 1)
+
+    def repeated_templates(self, threshold: int) -> Dict[str, int]:
+        return {sql: n for sql, n in self.templates.items() if n >= threshold}
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add(sql, params, time.perf_counter() - start)
+
+
+@contextmanager
+def _recording():
+    """在当前上下文的所有连接上挂 wrapper，退出时移除(连接按需创建，未打开的也可以挂)"""
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(_record_query))
+        yield
+
+
+class QueryMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = config.query_metrics
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        stats, token, start = self._start()
+        try:
+            with _recording():
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, stats, start)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        stats, token, start = self._start()
+        # 连接按线程隔离，查询在 sync_to_async(thread_sensitive) 的线程中执行，wrapper 挂在该线程的连接上
+        recording = ExitStack()
+        await sync_to_async(recording.enter_context)(_recording())
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(recording.close)()
+            _current.reset(token)
+        return self._finish(request, response, stats, start)
+
+    @staticmethod
+    def _start():
+        stats = QueryStats()
+        return stats, _current.set(stats), time.perf_counter()
+
+    @staticmethod
+    def _finish(request, response, stats: QueryStats, start: float):
+        elapsed = time.perf_counter() - start
+        match = getattr(request, "resolver_match", None)
+        endpoint = match.route if match is not None else "unmatched"
+        labels = {"endpoint": endpoint, "method": request.method}
+
+        REQUEST_SECONDS.observe(elapsed, **labels)
+        DB_QUERIES.observe(stats.count, **labels)
+        DB_SECONDS.observe(stats.seconds, **labels)
+        duplicates = stats.duplicates
+        if duplicates:
+            DUPLICATE_QUERIES.inc(duplicates, **labels)
+        repeated = stats.repeated_templates(config.n_plus_one_threshold)
+        if repeated:
+            N_PLUS_ONE.inc(**labels)
+
+        if (
+            stats.count > config.query_count_warn
+            or stats.seconds * 1000 > config.query_time_warn_ms
+            or duplicates
+            or repeated
+        ):
+            worst = max(repeated.items(), key=lambda item: item[1], default=None)
+            logger.warning(
+                f"{request.method} {endpoint}: {stats.count} queries, "
+                f"{stats.seconds * 1000:.1f}ms in db, {duplicates} duplicates"
+                + (f", repeated {worst[1]}x: {worst[0][:200]}" if worst else "")
+            )
+
+        response["Server-Timing"] = (
+            f'db;dur={stats.seconds * 1000:.2f};desc="{stats.count} queries", '
+            f"app;dur={elapsed * 1000:.2f}"
+        )
+        return response
+
+
+class ReplicaPinMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = bool(replicas.aliases)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        with request_state(PIN_COOKIE in request.COOKIES) as state:
+            response = self.get_response(request)
+        return self._finish(response, state)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        with request_state(PIN_COOKIE in request.COOKIES) as state:
+            response = await self.get_response(request)
+        return self._finish(response, state)
+
+    @staticmethod
+    def _finish(response, state):
+        if state.wrote and config.db_replica_pin_seconds > 0:
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=config.db_replica_pin_seconds,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
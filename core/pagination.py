@@ -0,0 +1,42 @@
+# 游标(keyset)分页工具
+import base64
+import binascii
+import json
+from typing import Optional
+from core.constants import ErrorCode
+from core.exception.business_exception import BusinessException
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    """把每页条数限制在 [1, MAX_PAGE_SIZE] 之间"""
+    if not limit:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def encode_cursor(last_id: int) -> str:
+    """把上一页最后一条记录的 id 编码为不透明游标"""
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """解析游标，返回上一页最后一条记录的 id；游标为空返回 None
+    Raises:
+        BusinessException: 游标格式不正确
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))["id"]
+    except (ValueError, KeyError, TypeError, binascii.Error, UnicodeEncodeError):
+        last_id = None
+    if not isinstance(last_id, int) or last_id < 0:
+        raise BusinessException(
+            error_code=ErrorCode.PARAMS_ERROR, description="分页游标无效"
+        )
+    return last_id
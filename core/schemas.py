@@ -1,6 +1,6 @@
 # 数据校验层
 from ninja import Schema
-from typing import Optional, Any, Type, TypeVar
+from typing import Optional, Any, Dict, Type, TypeVar
 from pydantic.alias_generators import to_camel, to_snake
 from pydantic import ConfigDict
 from core.constants import ErrorCode
@@ -36,3 +36,19 @@ class ResponseBase(Schema):
             }
 
         return {"code": code, "message": message, "description": description}
+
+
+class CacheStatsResponse(ResponseBase):
+    # 各缓存的统计: size / maxsize / hits / misses / evictions / hit_rate
+    data: Dict[str, Dict[str, Any]]
+
+
+class DatabasePoolStatsResponse(ResponseBase):
+    # 各数据库别名的连接池统计: checkouts / waits / wait_seconds / timeouts /
+    # created / closed / size / idle / in_use
+    data: Dict[str, Dict[str, Any]]
+
+
+class ReplicaStatsResponse(ResponseBase):
+    # 各从库的探测结果: healthy / latency_ms / lag_seconds / error
+    data: Dict[str, Dict[str, Any]]
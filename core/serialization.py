@@ -0,0 +1,71 @@
+"""
+响应序列化的快速路径
+    - FastJSONRenderer：安装了 orjson 时用 orjson 编码，否则退回 ninja 默认的 json 编码；
+      orjson 不认识的类型和日期时间交给 NinjaJSONEncoder，输出与默认渲染器一致(只是没有多余空格)
+    - compile_serializer：按响应模型预先算好 "属性 -> 输出键" 的映射，把可信的数据对象(例如 SafetyUser)
+      直接转换为字典，跳过响应模型的逐条校验
+    - success_response：直接构造 ResponseBase.success 的响应体
+
+快速路径不做任何校验，只能用于服务层已经构造好的数据
+"""
+
+import json
+from operator import attrgetter
+from typing import Any, Callable, Dict, Optional, Type
+from django.http import HttpResponse
+from ninja.renderers import BaseRenderer
+from ninja.responses import NinjaJSONEncoder
+from pydantic import BaseModel
+
+# orjson 为可选依赖
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+CONTENT_TYPE = "application/json; charset=utf-8"
+
+_encoder = NinjaJSONEncoder()
+if orjson is not None:
+    # 日期时间交给 Django 的编码器(毫秒精度、UTC 写作 Z)，与默认渲染器保持一致
+    _ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def dumps(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, default=_encoder.default, option=_ORJSON_OPTIONS)
+    return json.dumps(data, cls=NinjaJSONEncoder).encode()
+
+
+class FastJSONRenderer(BaseRenderer):
+    media_type = "application/json"
+
+    def render(self, request, data: Any, *, response_status: int) -> Any:
+        return dumps(data)
+
+
+def compile_serializer(
+    schema: Type[BaseModel], by_alias: bool = False, source: Optional[type] = None
+) -> Callable[[Any], Dict[str, Any]]:
+    """返回把数据对象转换为 schema.model_dump(by_alias=by_alias) 同样结构的函数
+    source 为数据对象的模型类时，在编译时检查它提供了 schema 的全部字段
+    """
+    names = list(schema.model_fields)
+    keys = tuple(
+        (field.serialization_alias or field.alias or name) if by_alias else name
+        for name, field in schema.model_fields.items()
+    )
+    if source is not None:
+        missing = set(names) - set(getattr(source, "model_fields", ()))
+        if missing:
+            raise TypeError(f"{source.__name__} 缺少字段: {sorted(missing)}")
+    getter = attrgetter(*names)
+    if len(names) == 1:
+        return lambda obj: {keys[0]: getter(obj)}
+    return lambda obj: dict(zip(keys, getter(obj)))
+
+
+def success_response(data: Any, description: str = "") -> HttpResponse:
+    """与 ResponseBase.success(data) 经 ninja 渲染后的响应体相同"""
+    body = {"code": 0, "data": data, "message": "ok", "description": description}
+    return HttpResponse(dumps(body), content_type=CONTENT_TYPE)
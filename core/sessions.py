@@ -0,0 +1,97 @@
+"""
+带进程内缓存的数据库 session 引擎(SESSION_ENGINE = "core.sessions")
+读取 session 时先查 TTL LRU 缓存，命中时省去 django_session 的查询和反序列化；
+写入/删除 session 时同步更新缓存。缓存按进程维护，其他进程登出或删除用户后，
+本进程最多在 session_cache_ttl 秒内仍使用旧数据
+"""
+
+import copy
+from typing import Any, Dict, Optional
+from django.contrib.sessions.backends import db
+from django.utils import timezone
+from core.cache import TTLCache
+from core.config import get_config
+
+config = get_config()
+
+session_cache = TTLCache(config.session_cache_size, config.session_cache_ttl)
+
+
+def invalidate_user_sessions(user_id: int) -> int:
+    """删除某个用户已登录 session 的缓存，返回删除的条数"""
+
+    def belongs_to_user(session_key, data) -> bool:
+        user = data.get(config.user_login_state)
+        # 登录时保存的是 SafetyUser.model_dump()，用户 id 的键为 user_id
+        return isinstance(user, dict) and user.get("user_id") == user_id
+
+    return session_cache.delete_where(belongs_to_user)
+
+
+class SessionStore(db.SessionStore):
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._expire_date = None
+
+    def _remaining(self) -> Optional[float]:
+        # 缓存不能比 session 本身活得更久
+        if self._expire_date is None:
+            return None
+        return (self._expire_date - timezone.now()).total_seconds()
+
+    def _cache_get(self) -> Optional[Dict[str, Any]]:
+        if self.session_key is None:
+            return None
+        data = session_cache.get(self.session_key)
+        # 返回副本，请求中修改 session 不会影响缓存
+        return copy.deepcopy(data) if data is not None else None
+
+    def _cache_set(self, data: Dict[str, Any]) -> None:
+        if self.session_key is not None:
+            session_cache.set(self.session_key, copy.deepcopy(data), self._remaining())
+
+    def _get_session_from_db(self):
+        s = super()._get_session_from_db()
+        self._expire_date = s.expire_date if s else None
+        return s
+
+    async def _aget_session_from_db(self):
+        s = await super()._aget_session_from_db()
+        self._expire_date = s.expire_date if s else None
+        return s
+
+    def load(self):
+        data = self._cache_get()
+        if data is not None:
+            return data
+        data = super().load()
+        if data:
+            self._cache_set(data)
+        return data
+
+    async def aload(self):
+        data = self._cache_get()
+        if data is not None:
+            return data
+        data = await super().aload()
+        if data:
+            self._cache_set(data)
+        return data
+
+    def save(self, must_create=False):
+        super().save(must_create)
+        self._expire_date = self.get_expiry_date()
+        self._cache_set(self._session)
+
+    async def asave(self, must_create=False):
+        await super().asave(must_create)
+        self._expire_date = await self.aget_expiry_date()
+        self._cache_set(self._session)
+
+    def delete(self, session_key=None):
+        session_cache.delete(session_key or self.session_key)
+        super().delete(session_key)
+
+    async def adelete(self, session_key=None):
+        session_cache.delete(session_key or self.session_key)
+        await super().adelete(session_key)
@@ -0,0 +1,32 @@
+import random
+from core.bitmap import ARRAY_MAX, RoaringBitmap
+
+
+def test_bitmap_set_operations():
+    rng = random.Random(7)
+    # 同时覆盖稀疏(array)和稠密(int)两种桶
+    a = {rng.randrange(200000) for _ in range(30000)}
+    b = {rng.randrange(200000) for _ in range(500)}
+    ra, rb = RoaringBitmap(a), RoaringBitmap(b)
+
+    assert list(ra) == sorted(a)
+    assert list(ra & rb) == sorted(a & b)
+    assert list(ra | rb) == sorted(a | b)
+    assert list(ra - rb) == sorted(a - b)
+    assert list(rb - ra) == sorted(b - a)
+    assert len(ra) == len(a)
+    assert list(ra.iter_after(100000)) == sorted(x for x in a if x > 100000)
+
+
+def test_bitmap_incremental_updates():
+    bitmap = RoaringBitmap()
+    for value in range(ARRAY_MAX + 10):
+        bitmap.add(value * 2)
+    # 超过 ARRAY_MAX 后转为稠密桶
+    assert isinstance(bitmap._containers[0], int)
+    for value in range(20):
+        bitmap.discard(value * 2)
+    # 回落到 ARRAY_MAX 以下后转回稀疏桶
+    assert not isinstance(bitmap._containers[0], int)
+    assert 40 in bitmap and 38 not in bitmap and 41 not in bitmap
+    assert len(bitmap) == ARRAY_MAX - 10
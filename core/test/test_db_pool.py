@@ -0,0 +1,112 @@
+import threading
+import time
+import pytest
+from django.db import OperationalError, connections
+from django.db.backends.sqlite3 import base as sqlite3_base
+from core import db_pool
+from core.db_pool import ConnectionPool, PooledDatabaseWrapperMixin
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.broken = False
+
+    def close(self):
+        self.closed = True
+
+
+def fake_ping(connection):
+    if connection.broken:
+        raise OSError("server has gone away")
+
+
+def make_pool(**kwargs) -> ConnectionPool:
+    options = dict(max_size=2, timeout=1, max_lifetime=60, max_idle=60)
+    options.update(kwargs)
+    return ConnectionPool("test", FakeConnection, fake_ping, **options)
+
+
+def test_reuses_released_connections():
+    pool = make_pool()
+    first = pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first
+    second = pool.acquire()
+    assert second is not first
+    stats = pool.stats()
+    assert stats["created"] == 2 and stats["checkouts"] == 3
+    assert stats["in_use"] == 2 and stats["idle"] == 0
+
+
+def test_bounded_size_waits_then_times_out():
+    pool = make_pool(max_size=1, timeout=0.05)
+    held = pool.acquire()
+    with pytest.raises(OperationalError):
+        pool.acquire()
+    assert pool.stats()["timeouts"] == 1
+
+    pool.timeout = 5
+    timer = threading.Timer(0.05, pool.release, (held,))
+    timer.start()
+    assert pool.acquire() is held
+    timer.join()
+    stats = pool.stats()
+    assert stats["waits"] == 1 and stats["wait_seconds"] > 0
+    assert stats["size"] == 1
+
+
+def test_broken_idle_and_old_connections_are_replaced():
+    pool = make_pool(max_idle=0.01)
+    connection = pool.acquire()
+    pool.release(connection)
+    connection.broken = True
+    replacement = pool.acquire()
+    assert replacement is not connection and connection.closed
+
+    pool.release(replacement)
+    time.sleep(0.02)
+    assert pool.acquire() is not replacement and replacement.closed
+
+    pool = make_pool(max_lifetime=0)
+    connection = pool.acquire()
+    pool.release(connection)
+    assert connection.closed
+    stats = pool.stats()
+    assert stats["size"] == 0 and stats["closed"] == 1
+
+
+class PooledSQLiteWrapper(PooledDatabaseWrapperMixin, sqlite3_base.DatabaseWrapper):
+    pass
+
+
+def test_database_wrapper_returns_connections_to_pool(tmp_path, django_db_blocker):
+    settings_dict = {
+        **connections.settings["default"],
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": str(tmp_path / "pool.sqlite3"),
+    }
+    wrapper = PooledSQLiteWrapper(settings_dict, alias="pool_test")
+    try:
+        with django_db_blocker.unblock():
+            with wrapper.cursor() as cursor:
+                cursor.execute("CREATE TABLE t (v integer)")
+            raw = wrapper.connection
+            wrapper.close()
+            assert wrapper.connection is None
+
+            # 未提交的事务在归还时回滚
+            wrapper.set_autocommit(False)
+            assert wrapper.connection is raw
+            with wrapper.cursor() as cursor:
+                cursor.execute("INSERT INTO t VALUES (1)")
+            wrapper.close()
+            with wrapper.cursor() as cursor:
+                cursor.execute("SELECT COUNT(*) FROM t")
+                assert cursor.fetchone() == (0,)
+            assert wrapper.connection is raw
+            wrapper.close()
+        stats = db_pool.pool_stats()["pool_test"]
+        assert stats["created"] == 1 and stats["checkouts"] == 3
+    finally:
+        db_pool._pools.pop("pool_test").close_idle()
@@ -0,0 +1,172 @@
+import threading
+import time
+import pytest
+from django.db import connections, router
+from django.http import HttpResponse
+from django.test import RequestFactory
+from core import db_router
+from core.db_router import (
+    PIN_COOKIE,
+    PrimaryReplicaRouter,
+    ReplicaSet,
+    request_state,
+    use_primary,
+)
+from core.middleware import ReplicaPinMiddleware
+from users.models import Users as User
+
+
+@pytest.fixture
+def sqlite_replicas(tmp_path, django_db_blocker):
+    """两个 SQLite 文件充当从库，各有一个只存在于该库的用户；另有一个无法打开的从库"""
+    aliases = {"replica_a": tmp_path / "a.sqlite3", "replica_b": tmp_path / "b.sqlite3"}
+    aliases["replica_down"] = tmp_path / "missing" / "down.sqlite3"
+    for alias, path in aliases.items():
+        connections.settings[alias] = {
+            **connections.settings["default"],
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": str(path),
+        }
+    try:
+        with django_db_blocker.unblock():
+            for alias in ("replica_a", "replica_b"):
+                with connections[alias].schema_editor() as editor:
+                    editor.create_model(User)
+                # bulk_create 不触发信号，不影响进程内索引和缓存
+                User.objects.using(alias).bulk_create(
+                    [
+                        User(
+                            user_account=alias,
+                            user_password="x",
+                            user_status=0,
+                            user_role=0,
+                            is_delete=0,
+                        )
+                    ]
+                )
+            yield list(aliases)
+    finally:
+        for alias in aliases:
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+
+
+@pytest.fixture
+def replica_sets():
+    """创建 ReplicaSet，结束时停止探测线程"""
+    created = []
+
+    def make(aliases, check_interval=60, max_lag=2):
+        replica_set = ReplicaSet(aliases, check_interval, max_lag)
+        created.append(replica_set)
+        return replica_set
+
+    yield make
+    for replica_set in created:
+        replica_set.stop()
+
+
+def test_reads_go_to_healthy_replicas(sqlite_replicas, replica_sets, monkeypatch):
+    replica_set = replica_sets(sqlite_replicas)
+    replica_set.check()
+    monkeypatch.setattr(router, "routers", [PrimaryReplicaRouter(replica_set)])
+
+    accounts = set(User.objects.values_list("user_account", flat=True))
+    assert accounts in ({"replica_a"}, {"replica_b"})
+    stats = replica_set.stats()
+    assert stats["replica_a"]["healthy"] and stats["replica_b"]["healthy"]
+    assert not stats["replica_down"]["healthy"]
+    assert stats["replica_down"]["error"]
+
+    # 按耗时的倒数加权
+    replica_set._status["replica_a"].latency = 0.001
+    replica_set._status["replica_b"].latency = 0.001
+    assert {replica_set.choose() for _ in range(100)} == {"replica_a", "replica_b"}
+    replica_set._status["replica_b"].latency = 10.0
+    chosen = [replica_set.choose() for _ in range(200)]
+    assert chosen.count("replica_a") > 190
+
+
+def test_lagging_replica_is_skipped(sqlite_replicas, replica_sets, monkeypatch):
+    monkeypatch.setattr(
+        db_router,
+        "replication_lag",
+        lambda connection: 10.0 if connection.alias == "replica_b" else 0.0,
+    )
+    replica_set = replica_sets(sqlite_replicas)
+    replica_set.check()
+    assert {replica_set.choose() for _ in range(20)} == {"replica_a"}
+    assert replica_set.stats()["replica_b"]["lag_seconds"] == 10.0
+
+    # 复制停止(延迟未知)同样不可用；没有健康的从库时读主库
+    monkeypatch.setattr(db_router, "replication_lag", lambda connection: None)
+    replica_set.check()
+    assert replica_set.choose() is None
+    assert PrimaryReplicaRouter(replica_set).db_for_read(User) == "default"
+
+
+def test_replica_check_runs_in_background(sqlite_replicas, replica_sets, monkeypatch):
+    probing, release = threading.Event(), threading.Event()
+    check = ReplicaSet.check
+
+    def slow_check(self):
+        probing.set()
+        # 模拟宕机的从库等待连接超时
+        release.wait(10)
+        check(self)
+
+    monkeypatch.setattr(ReplicaSet, "check", slow_check)
+    replica_set = replica_sets(["replica_a"])
+    # 首次探测完成前不等待，读主库
+    start = time.monotonic()
+    assert replica_set.choose() is None
+    assert probing.wait(5)
+    assert replica_set.choose() is None
+    assert time.monotonic() - start < 5
+    release.set()
+    deadline = time.monotonic() + 5
+    while replica_set.choose() is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert replica_set.choose() == "replica_a"
+
+
+def test_primary_after_write_and_when_pinned(sqlite_replicas, replica_sets):
+    replica_set = replica_sets(["replica_a"])
+    replica_set.check()
+    replica_router = PrimaryReplicaRouter(replica_set)
+    assert replica_router.db_for_read(User) == "replica_a"
+    with use_primary():
+        assert replica_router.db_for_read(User) == "default"
+    with request_state(pinned=True):
+        assert replica_router.db_for_read(User) == "default"
+    with request_state() as state:
+        assert replica_router.db_for_read(User) == "replica_a"
+        assert replica_router.db_for_write(User) == "default"
+        assert state.wrote
+        assert replica_router.db_for_read(User) == "default"
+    assert replica_router.allow_migrate("replica_a", "users") is False
+
+    # 从库取出的实例写主库，其他库(分片)取出的实例写回原库
+    user = User(id=1)
+    user._state.db = "replica_a"
+    assert replica_router.db_for_write(User, instance=user) == "default"
+    user._state.db = "shard0"
+    assert replica_router.db_for_write(User, instance=user) == "shard0"
+    assert replica_router.db_for_read(User, instance=user) == "shard0"
+
+
+def test_pin_cookie_set_after_write():
+    def view(request):
+        PrimaryReplicaRouter(ReplicaSet([], 60, 2)).db_for_write(User)
+        return HttpResponse()
+
+    middleware = ReplicaPinMiddleware(view)
+    middleware.enabled = True
+    response = middleware(RequestFactory().post("/api/users/register"))
+    assert response.cookies[PIN_COOKIE]["max-age"] > 0
+
+    middleware = ReplicaPinMiddleware(lambda request: HttpResponse())
+    middleware.enabled = True
+    response = middleware(RequestFactory().get("/api/users/search"))
+    assert PIN_COOKIE not in response.cookies
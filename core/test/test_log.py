@@ -0,0 +1,84 @@
+import logging
+import queue
+from core.constants import ErrorCode
+from core.exception.business_exception import BusinessException
+from core.log import (
+    DROPPED,
+    BatchFileHandler,
+    BatchQueueListener,
+    BusinessExceptionLog,
+    NonBlockingQueueHandler,
+)
+
+
+def _logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def test_queue_listener_writes_batches(tmp_path):
+    path = tmp_path / "app.log"
+    file_handler = BatchFileHandler(path, encoding="utf-8")
+    file_handler.deferred_flush = True
+    queue_handler = NonBlockingQueueHandler(queue.Queue(100))
+    listener = BatchQueueListener(queue_handler, [file_handler], batch_size=2)
+    listener.start()
+    logger = _logger("test.core.log.batch", queue_handler)
+
+    for i in range(5):
+        logger.info("line %d", i)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("failed")
+    listener.stop()
+    file_handler.close()
+
+    text = path.read_text(encoding="utf-8")
+    assert [f"line {i}" for i in range(5)] == text.splitlines()[:5]
+    assert "Traceback" in text and "ValueError: boom" in text
+
+
+def test_full_queue_drops_instead_of_blocking():
+    queue_handler = NonBlockingQueueHandler(queue.Queue(1))
+    logger = _logger("test.core.log.full", queue_handler)
+    before = DROPPED._series.get((), 0)
+    for _ in range(3):
+        logger.info("dropped")
+    assert DROPPED._series[()] - before == 2
+
+
+class _Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def test_business_exception_traceback_sampling():
+    collect = _Collect()
+    business_log = BusinessExceptionLog(_logger("test.core.log.biz", collect), 2)
+    for error_code in (ErrorCode.USER_NOT_EXIST,) * 3 + (ErrorCode.PARAMS_ERROR,):
+        try:
+            raise BusinessException(error_code=error_code, description="密码输入错误")
+        except BusinessException as exc:
+            business_log.log(None, exc)
+
+    assert [record.exc_info is not None for record in collect.records] == [
+        True,
+        False,
+        True,
+        True,
+    ]
+    assert (
+        collect.records[1]
+        .getMessage()
+        .startswith("business_exception code=40102 name=USER_NOT_EXIST count=2")
+    )
+    assert collect.records[1].levelno == logging.WARNING
+    assert business_log.counts() == {40102: 3, 40000: 1}
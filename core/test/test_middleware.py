@@ -0,0 +1,82 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import AsyncClient
+from core.metrics import Registry
+from core.middleware import QueryStats
+from users.models import Users as User
+from users.service import UserServices
+
+
+def test_query_stats_duplicates():
+    stats = QueryStats()
+    for user_id in (1, 1, 2, 3, 4):
+        stats.add("SELECT * FROM users WHERE id = %s", (user_id,), 0.001)
+    assert stats.count == 5
+    assert stats.duplicates == 1
+    assert stats.repeated_templates(5) == {"SELECT * FROM users WHERE id = %s": 5}
+    assert stats.repeated_templates(6) == {}
+
+
+def test_prometheus_text_format():
+    registry = Registry()
+    histogram = registry.histogram("latency_seconds", "耗时", (0.1, 1.0))
+    histogram.observe(0.05, endpoint="api/users/login")
+    histogram.observe(0.5, endpoint="api/users/login")
+    registry.counter("hits_total", "命中").inc(2, endpoint='a"b')
+
+    lines = registry.render().splitlines()
+    assert 'hits_total{endpoint="a\\"b"} 2' in lines
+    assert 'latency_seconds_bucket{endpoint="api/users/login",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{endpoint="api/users/login",le="+Inf"} 2' in lines
+    assert 'latency_seconds_count{endpoint="api/users/login"} 2' in lines
+
+
+@pytest.mark.django_db(transaction=False)
+def test_server_timing_and_metrics_endpoint(client):
+    user_id = UserServices.user_register("metricsadmin", "12345678", "12345678", "mtrc")
+    User.objects.filter(id=user_id).update(user_role=1)
+
+    response = client.post(
+        "/api/users/login",
+        {"userAccount": "metricsadmin", "userPassword": "12345678"},
+        content_type="application/json",
+    )
+    assert response.status_code == 200
+    assert response["Server-Timing"].startswith("db;dur=")
+
+    response = client.get("/api/monitor/metrics")
+    assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+    body = response.content.decode()
+    assert (
+        'db_queries_per_request_count{endpoint="api/users/login",method="POST"}' in body
+    )
+
+
+@pytest.mark.django_db(transaction=False)
+def test_query_wrapper_removed_after_request(client):
+    UserServices.user_register("metricsuser", "12345678", "12345678", "mtru")
+    response = client.post(
+        "/api/users/login",
+        {"userAccount": "metricsuser", "userPassword": "12345678"},
+        content_type="application/json",
+    )
+    assert "queries" in response["Server-Timing"]
+    assert '"0 queries"' not in response["Server-Timing"]
+    # 请求之外(管理命令、后台线程)的查询不再经过统计 wrapper
+    assert connection.execute_wrappers == []
+
+
+@pytest.mark.django_db(transaction=False)
+def test_query_stats_under_asgi():
+    async def run():
+        return await AsyncClient().post(
+            "/api/users/login",
+            {"userAccount": "nobody01", "userPassword": "12345678"},
+            content_type="application/json",
+        )
+
+    response = async_to_sync(run)()
+    # 查询在 sync_to_async 的线程中执行，同样计入，请求结束后 wrapper 被移除
+    assert '"0 queries"' not in response["Server-Timing"]
+    assert connection.execute_wrappers == []
@@ -0,0 +1,60 @@
+import pytest
+from unittest.mock import patch
+from django.test import RequestFactory
+from core.cache import TTLCache
+from core.config import get_config
+from core.sessions import SessionStore, invalidate_user_sessions, session_cache
+from users.service import UserServices
+
+config = get_config()
+
+
+def test_ttl_cache_lru_and_expiry():
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # 淘汰最久未使用的 b
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+    with patch("core.cache.time.monotonic", return_value=10**9):
+        assert cache.get("a") is None
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 2
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.django_db(transaction=False)
+def test_cached_session_store(
+    django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    session_cache.clear()
+    user_id = UserServices.user_register("session01", "12345678", "12345678", "ses1")
+    # 通过登录写入 session，与线上保存的数据结构一致
+    request = RequestFactory().post("/api/users/login")
+    request.session = SessionStore()
+    UserServices.do_login(request, "session01", "12345678")
+    request.session.save()
+    session_key = request.session.session_key
+
+    # 新请求读取同一个 session 时命中缓存，不查询数据库
+    with django_assert_num_queries(0):
+        loaded = SessionStore(session_key)
+        assert loaded[config.user_login_state]["user_id"] == user_id
+    # 修改读取到的数据不影响缓存
+    loaded[config.user_login_state]["user_id"] = -1
+    assert SessionStore(session_key)[config.user_login_state]["user_id"] == user_id
+
+    # 删除用户(事务提交后)使其 session 缓存失效，回退到数据库
+    with django_capture_on_commit_callbacks(execute=True):
+        assert UserServices.delete_user(user_id)
+    assert session_cache.get(session_key) is None
+    assert invalidate_user_sessions(user_id) == 0
+    with django_assert_num_queries(1):
+        assert SessionStore(session_key)[config.user_login_state]["user_id"] == user_id
+
+    # 登出(flush)后缓存和数据库中都不存在
+    SessionStore(session_key).flush()
+    assert session_cache.get(session_key) is None
+    assert SessionStore(session_key).get(config.user_login_state) is None
@@ -0,0 +1,36 @@
+import time
+import pytest
+from core.throttle import ShardedTokenBucketBackend, ThrottleBackend
+
+
+def test_token_bucket_burst_and_refill():
+    backend = ShardedTokenBucketBackend(shards=4, max_keys=100)
+    assert [backend.consume("a", 3, 20) for _ in range(3)] == [0.0, 0.0, 0.0]
+    wait = backend.consume("a", 3, 20)
+    assert 0 < wait <= 0.05
+    # 其他 key 不受影响
+    assert backend.consume("b", 3, 20) == 0.0
+
+    time.sleep(wait + 0.01)
+    assert backend.consume("a", 3, 20) == 0.0
+    assert backend.stats()["rejected"] == 1
+
+
+def test_token_bucket_evicts_least_recently_used():
+    backend = ShardedTokenBucketBackend(shards=1, max_keys=2)
+    backend.consume("a", 1, 0.001)
+    backend.consume("b", 1, 0.001)
+    backend.consume("c", 1, 0.001)
+    assert backend.stats()["size"] == 2
+    # a 被淘汰后相当于重新装满
+    assert backend.consume("a", 1, 0.001) == 0.0
+    assert backend.consume("c", 1, 0.001) > 0
+
+
+def test_throttle_backend_must_implement_interface():
+    class Incomplete(ThrottleBackend):
+        def consume(self, key, capacity, rate, cost=1):
+            return 0.0
+
+    with pytest.raises(TypeError):
+        Incomplete()
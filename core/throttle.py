@@ -0,0 +1,113 @@
+"""
+令牌桶限流
+    - ShardedTokenBucketBackend：进程内令牌桶，按 key 的哈希分到多个分片，每个分片一把锁，
+      高并发下不同 key 很少争用同一把锁；每个分片按 LRU 保留有限个桶，被淘汰的桶相当于重新装满
+    - DjangoCacheThrottleBackend：使用 settings.CACHES 中的缓存(Redis 等)在多进程间共享，
+      以固定窗口计数近似令牌桶(窗口长度 = 容量 / 速率，窗口内最多 容量 次)
+"""
+
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict
+
+
+class ThrottleBackend(ABC):
+    # 为 True 时访问会阻塞(网络)，异步调用时需要切换到线程执行
+    blocking = False
+
+    @abstractmethod
+    def consume(self, key: str, capacity: float, rate: float, cost: float = 1) -> float:
+        """从 key 的桶中取 cost 个令牌；成功返回 0，否则返回需要等待的秒数
+        capacity 为桶容量(允许的突发次数)，rate 为每秒补充的令牌数
+        """
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class _Shard:
+    __slots__ = ("lock", "buckets")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> [剩余令牌, 上次更新时间]，末尾为最近使用
+        self.buckets: "OrderedDict[str, list]" = OrderedDict()
+
+
+class ShardedTokenBucketBackend(ThrottleBackend):
+    def __init__(self, shards: int = 64, max_keys: int = 100000):
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+        self._max_per_shard = max(1, max_keys // len(self._shards))
+        self.allowed = 0
+        self.rejected = 0
+
+    def consume(self, key: str, capacity: float, rate: float, cost: float = 1) -> float:
+        shard = self._shards[hash(key) % len(self._shards)]
+        now = time.monotonic()
+        with shard.lock:
+            bucket = shard.buckets.get(key)
+            if bucket is None:
+                tokens = capacity
+                bucket = shard.buckets[key] = [capacity, now]
+                while len(shard.buckets) > self._max_per_shard:
+                    shard.buckets.popitem(last=False)
+            else:
+                tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                shard.buckets.move_to_end(key)
+            if tokens >= cost:
+                bucket[0], bucket[1] = tokens - cost, now
+                self.allowed += 1
+                return 0.0
+            bucket[0], bucket[1] = tokens, now
+            self.rejected += 1
+        return (cost - tokens) / rate if rate > 0 else math.inf
+
+    def clear(self) -> None:
+        for shard in self._shards:
+            with shard.lock:
+                shard.buckets.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": sum(len(shard.buckets) for shard in self._shards),
+            "maxsize": self._max_per_shard * len(self._shards),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+        }
+
+
+class DjangoCacheThrottleBackend(ThrottleBackend):
+    blocking = True
+
+    def __init__(self, alias: str):
+        from django.core.cache import caches
+
+        self._cache = caches[alias]
+
+    def consume(self, key: str, capacity: float, rate: float, cost: float = 1) -> float:
+        if rate <= 0:
+            return math.inf
+        window = capacity / rate
+        now = time.time()
+        index = int(now // window)
+        cache_key = f"throttle:{key}:{index}"
+        timeout = math.ceil(window) + 1
+        self._cache.add(cache_key, 0, timeout=timeout)
+        try:
+            count = self._cache.incr(cache_key, int(cost))
+        except ValueError:
+            # add 与 incr 之间过期
+            self._cache.set(cache_key, int(cost), timeout=timeout)
+            count = int(cost)
+        if count <= capacity:
+            return 0.0
+        return (index + 1) * window - now
+
+    def clear(self) -> None:
+        self._cache.clear()
@@ -0,0 +1,21 @@
+from ninja import Router
+from .service import TagServices
+from .schemas import TagAncestorsResponse, TagSubtreeResponse, TagTreeResponse
+
+router = Router()
+
+
+# 标签数据全部来自进程内缓存的标签树，不访问数据库
+@router.get("/tree", response=TagTreeResponse, by_alias=True)
+def tag_tree(request) -> TagTreeResponse:
+    return TagTreeResponse.success(TagServices.tree())
+
+
+@router.get("/{tag_id}/subtree", response=TagSubtreeResponse, by_alias=True)
+def tag_subtree(request, tag_id: int) -> TagSubtreeResponse:
+    return TagSubtreeResponse.success(TagServices.subtree(tag_id))
+
+
+@router.get("/{tag_id}/ancestors", response=TagAncestorsResponse, by_alias=True)
+def tag_ancestors(request, tag_id: int) -> TagAncestorsResponse:
+    return TagAncestorsResponse.success(TagServices.ancestors(tag_id))
@@ -20,4 +20,3 @@ class Tags(models.Model):
         managed = False
         db_table = "tags"
         db_table_comment = "标签"
-
@@ -0,0 +1,30 @@
+# 数据校验层
+from typing import List, Optional
+from core.schemas import ResponseBase
+from users.schemas import ToCamel
+
+
+class TagData(ToCamel):
+    id: int
+    tag_name: Optional[str]
+    parent_id: Optional[int]
+    is_parent: Optional[int]
+    # 物化路径，由根到自身的 id 组成，例如 "1/5/9"
+    path: str
+    depth: int
+
+
+class TagTreeNodeData(TagData):
+    children: List["TagTreeNodeData"]
+
+
+class TagTreeResponse(ResponseBase):
+    data: List[TagTreeNodeData]
+
+
+class TagSubtreeResponse(ResponseBase):
+    data: TagTreeNodeData
+
+
+class TagAncestorsResponse(ResponseBase):
+    data: List[TagData]
@@ -0,0 +1,46 @@
+"""
+标签服务实现类
+"""
+
+from typing import Dict, List
+from core.config import get_config
+from core.constants import ErrorCode
+from core.exception.business_exception import BusinessException
+from .tree import TagTreeCache
+
+config = get_config()
+tag_tree_cache = TagTreeCache(ttl=config.tag_tree_ttl)
+
+
+class TagServices:
+
+    @staticmethod
+    def tree() -> List[Dict]:
+        """返回全部未删除标签组成的树(可能有多个根)"""
+        return tag_tree_cache.get().forest()
+
+    @staticmethod
+    def subtree(tag_id: int) -> Dict:
+        """返回以 tag_id 为根的子树
+        Raises:
+            BusinessException: 标签不存在或已删除
+        """
+        node = tag_tree_cache.get().get(tag_id)
+        if node is None:
+            raise BusinessException(
+                error_code=ErrorCode.PARAMS_ERROR, description="标签不存在"
+            )
+        return node.to_dict()
+
+    @staticmethod
+    def ancestors(tag_id: int) -> List[Dict]:
+        """返回由根到父标签的祖先列表，根标签返回空列表
+        Raises:
+            BusinessException: 标签不存在或已删除
+        """
+        ancestors = tag_tree_cache.get().ancestors(tag_id)
+        if ancestors is None:
+            raise BusinessException(
+                error_code=ErrorCode.PARAMS_ERROR, description="标签不存在"
+            )
+        return [node.to_dict(with_children=False) for node in ancestors]
@@ -0,0 +1,12 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Tags
+from .service import tag_tree_cache
+
+
+@receiver(post_save, sender=Tags)
+@receiver(post_delete, sender=Tags)
+def _on_tag_changed(sender, **kwargs) -> None:
+    # 任意标签变更都会影响路径，直接丢弃整棵树，下次访问时重建
+    transaction.on_commit(tag_tree_cache.invalidate)
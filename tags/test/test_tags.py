@@ -0,0 +1,50 @@
+import pytest
+from core.exception.business_exception import BusinessException
+from tags.models import Tags
+from tags.service import TagServices, tag_tree_cache
+from tags.tree import TagTree
+
+
+def make_tag(tag_id, parent_id):
+    return Tags(id=tag_id, tag_name=f"tag{tag_id}", parent_id=parent_id, is_delete=0)
+
+
+def test_tag_tree_paths():
+    tree = TagTree(
+        [
+            make_tag(1, None),
+            make_tag(2, 1),
+            make_tag(3, 2),
+            make_tag(4, 99),  # 父标签不存在
+            make_tag(5, 6),  # 5、6 互为父标签
+            make_tag(6, 5),
+        ]
+    )
+    assert tree.get(3).path == "1/2/3"
+    assert tree.get(3).depth == 2
+    assert [node.id for node in tree.ancestors(3)] == [1, 2]
+    assert tree.ancestors(1) == []
+    assert tree.ancestors(100) is None
+    assert [root.id for root in tree.roots] == [1, 4, 6]
+    assert tree.get(6).children[0].id == 5
+
+
+@pytest.mark.django_db(transaction=False)
+def test_tag_services():
+    tag_tree_cache.invalidate()
+    parent = Tags.objects.create(tag_name="测试父标签", is_parent=1, is_delete=0)
+    child = Tags.objects.create(
+        tag_name="测试子标签", parent_id=parent.id, is_parent=0, is_delete=0
+    )
+    Tags.objects.create(
+        tag_name="已删除标签", parent_id=parent.id, is_parent=0, is_delete=1
+    )
+
+    subtree = TagServices.subtree(parent.id)
+    assert [node["id"] for node in subtree["children"]] == [child.id]
+    assert TagServices.ancestors(child.id)[0]["id"] == parent.id
+
+    with pytest.raises(BusinessException) as exc:
+        TagServices.subtree(-1)
+    assert exc.value.description == "标签不存在"
+    tag_tree_cache.invalidate()
@@ -0,0 +1,139 @@
+"""
+标签层级树的进程内缓存
+整棵树在第一次访问时从 tags 表一次性构建，之后的树/子树/祖先查询都只读内存，
+标签变更时通过 post_save/post_delete 信号失效
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+from core.db_router import use_primary
+from .models import Tags
+
+logger = logging.getLogger("django")
+
+PATH_SEPARATOR = "/"
+
+
+class TagNode:
+    __slots__ = (
+        "id",
+        "tag_name",
+        "parent_id",
+        "is_parent",
+        "path",
+        "depth",
+        "children",
+    )
+
+    def __init__(self, tag: Tags):
+        self.id: int = tag.id
+        self.tag_name: Optional[str] = tag.tag_name
+        self.parent_id: Optional[int] = tag.parent_id
+        self.is_parent: Optional[int] = tag.is_parent
+        # 物化路径，例如 "1/5/9"，由根到自身的 id 组成
+        self.path: str = ""
+        self.depth: int = 0
+        self.children: List["TagNode"] = []
+
+    def to_dict(self, with_children: bool = True) -> Dict:
+        data = {
+            "id": self.id,
+            "tag_name": self.tag_name,
+            "parent_id": self.parent_id,
+            "is_parent": self.is_parent,
+            "path": self.path,
+            "depth": self.depth,
+        }
+        if with_children:
+            data["children"] = [child.to_dict() for child in self.children]
+        return data
+
+
+class TagTree:
+    """构建完成后只读的标签树快照"""
+
+    def __init__(self, tags: List[Tags]):
+        self.nodes: Dict[int, TagNode] = {tag.id: TagNode(tag) for tag in tags}
+        self.roots: List[TagNode] = []
+        self._forest: Optional[List[Dict]] = None
+        ordered = sorted(self.nodes.values(), key=lambda n: n.id)
+        for node in ordered:
+            self._resolve_path(node)
+        for node in ordered:
+            if node.depth == 0:
+                self.roots.append(node)
+            else:
+                self.nodes[node.parent_id].children.append(node)
+
+    def _resolve_path(self, node: TagNode) -> None:
+        """沿 parent_id 向上找到已计算路径的祖先(或根)，再向下补齐整条链的路径
+        父标签已删除/不存在的节点作为根；parent_id 成环时在环上断开
+        """
+        chain: List[TagNode] = []
+        seen = set()
+        current: Optional[TagNode] = node
+        while current is not None and not current.path and current.id not in seen:
+            seen.add(current.id)
+            chain.append(current)
+            current = self.nodes.get(current.parent_id) if current.parent_id else None
+        if current is not None and current.id in seen:
+            logger.warning(f"tag {chain[-1].id} is part of a parent_id cycle")
+            current = None
+        base_path = current.path if current is not None else None
+        base_depth = current.depth if current is not None else -1
+        for item in reversed(chain):
+            item.depth = base_depth + 1
+            item.path = (
+                f"{base_path}{PATH_SEPARATOR}{item.id}" if base_path else str(item.id)
+            )
+            base_path, base_depth = item.path, item.depth
+
+    def forest(self) -> List[Dict]:
+        """整棵树的字典形式，只生成一次"""
+        if self._forest is None:
+            self._forest = [root.to_dict() for root in self.roots]
+        return self._forest
+
+    def get(self, tag_id: int) -> Optional[TagNode]:
+        return self.nodes.get(tag_id)
+
+    def ancestors(self, tag_id: int) -> Optional[List[TagNode]]:
+        """由根到父节点的祖先列表，标签不存在时返回 None"""
+        node = self.nodes.get(tag_id)
+        if node is None:
+            return None
+        ids = node.path.split(PATH_SEPARATOR)[:-1]
+        return [self.nodes[int(ancestor_id)] for ancestor_id in ids]
+
+
+class TagTreeCache:
+    """线程安全的 TagTree 缓存
+    本进程内的标签变更通过信号立即失效；其他进程的变更在 ttl 秒后重新加载
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._tree: Optional[TagTree] = None
+        self._loaded_at = 0.0
+
+    def get(self) -> TagTree:
+        tree = self._tree
+        if tree is not None and not self._expired():
+            return tree
+        with self._lock:
+            if self._tree is None or self._expired():
+                with use_primary():
+                    self._tree = TagTree(list(Tags.objects.filter(is_delete=0)))
+                self._loaded_at = time.monotonic()
+                logger.info(f"tag tree built: {len(self._tree.nodes)} tags")
+            return self._tree
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._tree = None
+
+    def _expired(self) -> bool:
+        return bool(self.ttl) and time.monotonic() - self._loaded_at > self.ttl
@@ -1,17 +1,48 @@
+from functools import lru_cache
 from ninja import NinjaAPI
-from users.api import router as user_router
-from users.schemas import ResponseBase
 import logging
-from core.constants import ErrorCode
-from core.exception_handler import exception_handler
-
+from core.serialization import FastJSONRenderer
 
 logger = logging.getLogger("django")
-api = NinjaAPI(title="UserCenter API", version="1.0.0")
+VERSION = "1.0.0"
+
+
+@lru_cache(maxsize=None)
+def get_api() -> NinjaAPI:
+    """第一次调用时才导入各路由模块并构建 NinjaAPI
+    路由模块导入时会为每个接口构建参数/响应模型，推迟到第一次解析 /api/ 下的地址时
+    """
+    from users.api import router as user_router
+    from tags.api import router as tag_router
+    from core.api import router as monitor_router
+    from core.exception_handler import exception_handler
+
+    api = NinjaAPI(title="UserCenter API", version=VERSION, renderer=FastJSONRenderer())
+
+    # 挂载子路由
+    api.add_router("users/", user_router)
+    api.add_router("tags/", tag_router)
+    api.add_router("monitor/", monitor_router)
+
+    # 注册异常处理器
+    exception_handler(api)
+    return api
+
+
+class LazyURLConf:
+    """URLconf 对象：urlpatterns 在第一次被访问时才构建 NinjaAPI"""
+
+    # 与 NinjaAPI.urls 返回的 app_name / namespace 相同
+    app_name = "ninja"
+    namespace = f"api-{VERSION}"
 
-# 挂载子路由
-api.add_router("users/", user_router)
+    @property
+    def urlpatterns(self):
+        return get_api().urls[0]
 
 
-# 注册异常处理器
-exception_handler(api)
+def __getattr__(name):
+    # 兼容 from user_center.api import api
+    if name == "api":
+        return get_api()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -12,9 +12,9 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
-from core.config import ProjectConfig
+from core.config import get_config
 
-config = ProjectConfig()  # type: ignore
+config = get_config()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -48,6 +48,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    # 放在靠前的位置，统计尽量完整的请求耗时和所有查询
+    "core.middleware.QueryMetricsMiddleware",
+    # 在 SessionMiddleware 之外，session 的读写也按读写分离路由
+    "core.middleware.ReplicaPinMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -59,6 +63,9 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = "user_center.urls"
 
+# 在数据库 session 前加一层进程内缓存
+SESSION_ENGINE = "core.sessions"
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
@@ -83,7 +90,10 @@ WSGI_APPLICATION = "user_center.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.mysql",
+        # 连接池(core.db_pool)：请求结束时连接归还到池中，而不是断开
+        "ENGINE": (
+            "core.backends.mysql" if config.db_pool else "django.db.backends.mysql"
+        ),
         "NAME": config.db_name,  # 数据库名称
         "USER": config.db_user,  # 数据库用户名
         "PASSWORD": config.db_password,  # 数据库密码
@@ -96,6 +106,37 @@ DATABASES = {
     }
 }
 
+# 从库(core.db_router)：与主库相同的账号和库名，测试中直接使用主库
+DATABASE_REPLICAS = []
+for address in filter(None, map(str.strip, config.db_replicas.split(","))):
+    host, _, port = address.partition(":")
+    alias = f"replica{len(DATABASE_REPLICAS) + 1}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": port or config.db_port,
+        "OPTIONS": {"connect_timeout": config.db_replica_connect_timeout},
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+# users 表分片(users.sharding)：与主库相同的账号，库名默认与主库相同，测试时各自建库
+USER_SHARDS = []
+for address in filter(None, map(str.strip, config.user_shards.split(","))):
+    location, _, name = address.partition("/")
+    host, _, port = location.partition(":")
+    alias = f"shard{len(USER_SHARDS)}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "NAME": name or config.db_name,
+        "HOST": host,
+        "PORT": port or config.db_port,
+        "TEST": {},
+    }
+    USER_SHARDS.append(alias)
+
+DATABASE_ROUTERS = ["core.db_router.PrimaryReplicaRouter"]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -147,7 +188,8 @@ CORS_ALLOW_ALL_ORIGINS = True
 #     "https://your-frontend-domain.com",
 # ]
 
-# 日志配置
+# 日志配置：由 core.log.configure 把各 logger 的处理器移到后台线程(见 core/log.py)
+LOGGING_CONFIG = "core.log.configure"
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -164,7 +206,7 @@ LOGGING = {
     "handlers": {
         "file": {
             "level": "INFO",
-            "class": "logging.FileHandler",
+            "class": "core.log.BatchFileHandler",
             "filename": os.path.join(BASE_DIR, "logs/django.log"),
             "formatter": "verbose",
         },
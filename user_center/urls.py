@@ -16,11 +16,11 @@ Including another URLconf
 """
 
 from django.contrib import admin
-from .api import api
+from .api import LazyURLConf
 
 from django.urls import path
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("api/", api.urls),
+    path("api/", (LazyURLConf(), LazyURLConf.app_name, LazyURLConf.namespace)),
 ]
@@ -1,6 +1,8 @@
-from ninja import Router, Schema
+from ninja import Query, Router, Schema
 from .service import UserServices
-from typing import Optional, Union, List, Dict
+from typing import Optional, Union, List, Dict, Literal
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
 from .schemas import (
     UserLoginRequest,
     UserRegisterRequest,
@@ -8,44 +10,100 @@ from .schemas import (
     UserRegisterResponse,
     DeleteResponse,
     SearchResponse,
+    UserSearchQuery,
+    TagSearchQuery,
+    MatchResponse,
+    BatchRegisterResponse,
+    BulkDeleteRequest,
+    BulkDeleteResponse,
+    UserStatsResponse,
 )  # 导入请求和响应类，作为数据校验层
-from core.config import ProjectConfig
-
+from core.config import get_config
+from core.constants import ErrorCode
+from core.exception.business_exception import BusinessException
+from core.serialization import success_response
+from .export import aiter_lines
+from .serializers import match_list, search_page
 
 router = Router()
 user_service = UserServices()
-config = ProjectConfig()  # type: ignore
+config = get_config()
+EMPTY_PAGE = {"records": [], "next_cursor": None}
+
+
+def search_response(page) -> Union[SearchResponse, HttpResponse]:
+    # 快速路径跳过响应模型对每条记录的二次校验，输出与 SearchResponse 相同
+    if config.fast_serialization:
+        return success_response(search_page(page))
+    return SearchResponse.success(page)
 
 
 # 通过装饰器指定了响应格式
-@router.post("/register", response=Union[UserRegisterResponse, int], by_alias=True)
-def user_register(request, data: UserRegisterRequest):  # 通过传参定义了请求体
-    # 这里不做data 是否为 none 的判断
-    # 因为框架 shcema 部分会进行判断，如果确实直接返回错误
-    user_account = data.user_account
-    user_password = data.user_password
-    check_password = data.check_password
-    planet_code = data.planet_code
-    # 注册
-    user_id = user_service.user_register(
-        user_account, user_password, check_password, planet_code
-    )
-    result = {"user_id": user_id} if user_id != -1 else -1
-
-    return UserRegisterResponse.success(result)
-
-
-@router.post("/login", response=UserLoginResponse, by_alias=True)
-def user_login(request, data: UserLoginRequest) -> UserLoginResponse:
-    user_account = data.user_account
-    user_password = data.user_password
-    user = user_service.do_login(
-        request,
-        user_account,
-        user_password,
-    )
-
-    return UserLoginResponse.success(user)
+# async_mode 开启时，注册/登录/查询/删除使用 async def 处理函数，
+# 在 ASGI 下等待数据库期间不会占用线程池
+if not config.async_mode:
+
+    @router.post("/register", response=Union[UserRegisterResponse, int], by_alias=True)
+    def user_register(request, data: UserRegisterRequest):  # 通过传参定义了请求体
+        # 这里不做data 是否为 none 的判断
+        # 因为框架 shcema 部分会进行判断，如果确实直接返回错误
+        user_account = data.user_account
+        user_password = data.user_password
+        check_password = data.check_password
+        planet_code = data.planet_code
+        # 注册
+        user_id = user_service.user_register(
+            user_account, user_password, check_password, planet_code
+        )
+        result = {"user_id": user_id} if user_id != -1 else -1
+
+        return UserRegisterResponse.success(result)
+
+    @router.post("/login", response=UserLoginResponse, by_alias=True)
+    def user_login(request, data: UserLoginRequest) -> UserLoginResponse:
+        user_account = data.user_account
+        user_password = data.user_password
+        user = user_service.do_login(
+            request,
+            user_account,
+            user_password,
+        )
+
+        return UserLoginResponse.success(user)
+
+else:
+
+    @router.post("/register", response=Union[UserRegisterResponse, int], by_alias=True)
+    async def user_register(request, data: UserRegisterRequest):
+        user_id = await user_service.auser_register(
+            data.user_account, data.user_password, data.check_password, data.planet_code
+        )
+        result = {"user_id": user_id} if user_id != -1 else -1
+
+        return UserRegisterResponse.success(result)
+
+    @router.post("/login", response=UserLoginResponse, by_alias=True)
+    async def user_login(request, data: UserLoginRequest) -> UserLoginResponse:
+        user = await user_service.ado_login(
+            request,
+            data.user_account,
+            data.user_password,
+        )
+
+        return UserLoginResponse.success(user)
+
+
+@router.post("/register/batch", response=BatchRegisterResponse, by_alias=True)
+def batch_register(request, data: List[UserRegisterRequest]) -> BatchRegisterResponse:
+    # 1. 仅管理员可批量注册
+    if not is_admin(request):
+        raise BusinessException(
+            error_code=ErrorCode.NO_AUTH, description="仅管理员可批量注册"
+        )
+    # 2. 批量注册，逐条返回结果
+    results = UserServices.batch_register(data)
+
+    return BatchRegisterResponse.success(results)
 
 
 @router.post("/logout", response=int)
@@ -53,28 +111,141 @@ def user_logout(request) -> int:
     return user_service.do_logout(request)
 
 
-@router.get("/search", response=SearchResponse)
-def search_user(request, user_name: Optional[str] = None) -> SearchResponse:
-    # 1.鉴权
+if not config.async_mode:
+
+    @router.get("/search", response=SearchResponse)
+    def search_user(request, filters: Query[UserSearchQuery]) -> SearchResponse:
+        # 1.鉴权
+        if not is_admin(request):
+            return SearchResponse.success(EMPTY_PAGE)
+        # 2.查询符合要求的用户(一页)
+        page = UserServices.list(**filters.model_dump())
+
+        return search_response(page)
+
+    @router.get("/delete", response=DeleteResponse)
+    def delete_user(request, user_id: int) -> DeleteResponse:
+        # 1. 鉴权
+        if not is_admin(request):
+            return DeleteResponse.success({"response": False})
+        # 2. 数据校验，确保有效id
+        if user_id <= 0:
+            return DeleteResponse.success({"response": False})
+        # 3. 删除用户
+        data = {"response": UserServices.delete_user(user_id)}
+        return DeleteResponse.success(data)
+
+else:
+
+    @router.get("/search", response=SearchResponse)
+    async def search_user(request, filters: Query[UserSearchQuery]) -> SearchResponse:
+        if not await ais_admin(request):
+            return SearchResponse.success(EMPTY_PAGE)
+        page = await UserServices.alist(**filters.model_dump())
+
+        return search_response(page)
+
+    @router.get("/delete", response=DeleteResponse)
+    async def delete_user(request, user_id: int) -> DeleteResponse:
+        if not await ais_admin(request) or user_id <= 0:
+            return DeleteResponse.success({"response": False})
+        data = {"response": await UserServices.adelete_user(user_id)}
+        return DeleteResponse.success(data)
+
+
+@router.post("/delete/batch", response=BulkDeleteResponse, by_alias=True)
+def bulk_delete_users(request, data: BulkDeleteRequest) -> BulkDeleteResponse:
+    # 1. 仅管理员可批量删除
+    if not is_admin(request):
+        raise BusinessException(
+            error_code=ErrorCode.NO_AUTH, description="仅管理员可批量删除"
+        )
+    # 2. 逻辑删除，由 purge_deleted_users 命令定期物理删除
+    affected = UserServices.bulk_set_deleted(data.user_ids, deleted=True)
+
+    return BulkDeleteResponse.success({"affected": affected})
+
+
+@router.post("/restore/batch", response=BulkDeleteResponse, by_alias=True)
+def bulk_restore_users(request, data: BulkDeleteRequest) -> BulkDeleteResponse:
     if not is_admin(request):
-        return SearchResponse.success([])
-    # 2.查询符合要求的用户
-    users = UserServices.list(user_name)
+        raise BusinessException(
+            error_code=ErrorCode.NO_AUTH, description="仅管理员可批量恢复"
+        )
+    affected = UserServices.bulk_set_deleted(data.user_ids, deleted=False)
+
+    return BulkDeleteResponse.success({"affected": affected})
 
-    return SearchResponse.success(users)
+
+@router.get("/stats", response=UserStatsResponse, by_alias=True)
+def user_stats(request) -> UserStatsResponse:
+    if not is_admin(request):
+        raise BusinessException(
+            error_code=ErrorCode.NO_AUTH, description="仅管理员可查看统计"
+        )
+    # 读取维护的计数，耗时与用户数无关
+    return UserStatsResponse.success(UserServices.stats())
 
 
-@router.get("/delete", response=DeleteResponse)
-def delete_user(request, user_id: int) -> DeleteResponse:
-    # 1. 鉴权
+@router.get("/search/tags", response=SearchResponse)
+def search_user_by_tags(request, filters: Query[TagSearchQuery]) -> SearchResponse:
+    # 1. 鉴权：与 /search 相同，仅管理员可查询(结果含电话、邮箱，不带标签时可遍历全部用户)
     if not is_admin(request):
-        return DeleteResponse.success({"response": False})
-    # 2. 数据校验，确保有效id
-    if user_id <= 0:
-        return DeleteResponse.success({"response": False})
-    # 3. 删除用户
-    data = {"response": UserServices.delete_user(user_id)}
-    return DeleteResponse.success(data)
+        return SearchResponse.success(EMPTY_PAGE)
+    # 2. 按标签组合查询(标签位图索引)
+    page = UserServices.search_by_tags(**filters.model_dump())
+
+    return search_response(page)
+
+
+@router.get("/match", response=MatchResponse, by_alias=True)
+def match_users(
+    request,
+    num: int = Query(10, ge=1, le=100),
+    metric: Literal["jaccard", "cosine"] = "jaccard",
+) -> MatchResponse:
+    # 1. 需要登录，以当前登录用户的标签做匹配
+    login_user = get_login_user(request)
+    # 2. 取相似度最高的 num 个用户
+    users = UserServices.match_users(login_user["user_id"], num, metric)
+
+    if config.fast_serialization:
+        return success_response(match_list(users))
+    return MatchResponse.success(users)
+
+
+EXPORT_CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+@router.get("/export")
+def export_users(
+    request, format: Literal["ndjson", "csv"] = "ndjson", after_id: Optional[int] = None
+):
+    # 仅管理员可导出
+    if not is_admin(request):
+        raise BusinessException(
+            error_code=ErrorCode.NO_AUTH, description="仅管理员可导出"
+        )
+    # 逐行流式输出，内存占用与表大小无关；ASGI 下需要异步迭代器，否则会先读完整个导出
+    lines = UserServices.export(format, after_id)
+    if isinstance(request, ASGIRequest):
+        lines = aiter_lines(lines)
+    response = StreamingHttpResponse(lines, content_type=EXPORT_CONTENT_TYPES[format])
+    response["Content-Disposition"] = f'attachment; filename="users.{format}"'
+    return response
+
+
+def get_login_user(request) -> Dict:
+    """返回 session 中的登录用户，未登录时抛出 NOT_LOGIN"""
+    safety_user = request.session.get(config.user_login_state)
+    if safety_user is None:
+        raise BusinessException(
+            error_code=ErrorCode.NOT_LOGIN, description="用户未登录"
+        )
+    return safety_user
 
 
 def is_admin(request):
@@ -86,6 +257,16 @@ def is_admin(request):
     except KeyError:
         safety_user = None
 
+    return _is_admin_user(safety_user)
+
+
+async def ais_admin(request):
+    # 异步读取 session，避免在事件循环中同步访问 session 存储
+    safety_user = await request.session.aget(config.user_login_state)
+    return _is_admin_user(safety_user)
+
+
+def _is_admin_user(safety_user) -> bool:
     # 判断用户是否登录，以及是否为管理员
     if safety_user == None or safety_user["user_role"] != config.admin_role:
         return False
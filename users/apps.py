@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "users"
+
+    def ready(self):
+        # 注册 post_save/post_delete 信号和进程内索引的监听
+        from . import signals, ngram_index, tag_index, unique_filter  # noqa: F401
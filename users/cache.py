@@ -0,0 +1,261 @@
+"""
+按用户 id 缓存脱敏后的 SafetyUser(读穿透)
+    - 每个用户有一个版本戳，写操作都会更换版本戳(save/delete 经信号，
+      UserServices 中的 update/bulk_create 显式调用 bump)；缓存条目记录写入时的版本戳，
+      与当前版本戳不一致即视为未命中。读取方在查数据库之前取得版本戳，
+      因此与写操作并发时写回的旧数据也不会被读到。写回缓存的数据从主库读取，
+      从库的复制延迟会让新版本戳对应旧数据
+    - 后端可插拔：进程内 LRU(local)，或 Django cache 框架中配置的任意缓存(文件、Redis 等共享存储)
+    - get_many 对未命中的 id 只发一条 IN 查询
+"""
+
+import itertools
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional
+from asgiref.sync import sync_to_async
+from django.db.models.signals import post_delete, post_save
+from core.cache import TTLCache
+from core.config import get_config
+from core.db_router import use_primary
+from .models import Users as User
+from .schemas import SafetyUser
+from .sharding import user_shards
+from .signals import users_changed
+
+config = get_config()
+
+_stamp_counter = itertools.count()
+
+
+def _new_stamp() -> int:
+    # 纳秒时间戳 + 进程内计数，保证单调且不会与被淘汰前的旧版本戳重复
+    return time.time_ns() + next(_stamp_counter)
+
+
+class CacheBackend(ABC):
+    """缓存后端接口，值需要可被 pickle(共享存储)"""
+
+    # 为 True 时访问会阻塞(网络/磁盘)，异步调用时需要切换到线程执行
+    blocking = False
+
+    @abstractmethod
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]: ...
+
+    @abstractmethod
+    def set_many(self, mapping: Dict[str, Any]) -> None: ...
+
+    @abstractmethod
+    def add(self, key: str, value: Any) -> None:
+        """key 不存在时写入"""
+
+    @abstractmethod
+    def delete_many(self, keys: Iterable[str]) -> None: ...
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class LocalMemoryBackend(CacheBackend):
+    """进程内 TTL LRU，只能感知本进程的写操作，其他进程的修改在 ttl 秒后可见"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize, ttl)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        result = {}
+        for key in keys:
+            value = self._cache.get(key)
+            if value is not None:
+                result[key] = value
+        return result
+
+    def set_many(self, mapping: Dict[str, Any]) -> None:
+        for key, value in mapping.items():
+            self._cache.set(key, value)
+
+    def add(self, key: str, value: Any) -> None:
+        if self._cache.get(key) is None:
+            self._cache.set(key, value)
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self._cache.delete(key)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+
+class DjangoCacheBackend(CacheBackend):
+    """使用 settings.CACHES 中的某个缓存，多进程共享版本戳和条目"""
+
+    blocking = True
+
+    def __init__(self, alias: str, ttl: float):
+        from django.core.cache import caches
+
+        self._cache = caches[alias]
+        self.ttl = ttl
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        return self._cache.get_many(list(keys))
+
+    def set_many(self, mapping: Dict[str, Any]) -> None:
+        self._cache.set_many(mapping, timeout=self.ttl)
+
+    def add(self, key: str, value: Any) -> None:
+        self._cache.add(key, value, timeout=self.ttl)
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        self._cache.delete_many(list(keys))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+class SafetyUserCache:
+    """SafetyUser 读穿透缓存，返回的对象在多个请求间共享，调用方不应修改"""
+
+    def __init__(self, backend: Optional[CacheBackend]):
+        self.backend = backend
+
+    @staticmethod
+    def _version_key(user_id: int) -> str:
+        return f"safety_user:v:{user_id}"
+
+    @staticmethod
+    def _entry_key(user_id: int) -> str:
+        return f"safety_user:{user_id}"
+
+    def _lookup(self, ids: List[int]):
+        """返回 (命中的用户, 未命中的 id 及其当前版本戳)"""
+        backend = self.backend
+        keys = [self._version_key(i) for i in ids] + [self._entry_key(i) for i in ids]
+        found = backend.get_many(keys)
+        hits: Dict[int, SafetyUser] = {}
+        versions: Dict[int, int] = {}
+        unversioned: List[int] = []
+        for user_id in ids:
+            version = found.get(self._version_key(user_id))
+            entry = found.get(self._entry_key(user_id))
+            if version is None:
+                unversioned.append(user_id)
+            elif entry is not None and entry[0] == version:
+                hits[user_id] = entry[1]
+            else:
+                versions[user_id] = version
+        if unversioned:
+            # 首次读取时初始化版本戳；并发初始化时以先写入的为准，所以再读一次
+            for user_id in unversioned:
+                backend.add(self._version_key(user_id), _new_stamp())
+            found = backend.get_many(self._version_key(i) for i in unversioned)
+            for user_id in unversioned:
+                version = found.get(self._version_key(user_id))
+                if version is not None:
+                    versions[user_id] = version
+        return hits, versions
+
+    def _store(self, users: Dict[int, SafetyUser], versions: Dict[int, int]) -> None:
+        self.backend.set_many(
+            {
+                self._entry_key(user_id): (versions[user_id], user)
+                for user_id, user in users.items()
+                if user_id in versions
+            }
+        )
+
+    @staticmethod
+    def _convert(rows: Iterable[User]) -> Dict[int, SafetyUser]:
+        from .service import UserServices
+
+        return {user.id: UserServices.convert_safety_user(user) for user in rows}
+
+    def get_many(self, ids: Iterable[int]) -> Dict[int, SafetyUser]:
+        """返回 {id: SafetyUser}，不存在(或已删除)的 id 不在结果中"""
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return {}
+        if self.backend is None:
+            return self._convert(user_shards.fetch(User.objects.all(), ids))
+        hits, versions = self._lookup(ids)
+        missing = [user_id for user_id in ids if user_id not in hits]
+        if missing:
+            with use_primary():
+                loaded = self._convert(user_shards.fetch(User.objects.all(), missing))
+            self._store(loaded, versions)
+            hits.update(loaded)
+        return hits
+
+    async def aget_many(self, ids: Iterable[int]) -> Dict[int, SafetyUser]:
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return {}
+        if self.backend is None:
+            return self._convert(
+                await sync_to_async(user_shards.fetch)(User.objects.all(), ids)
+            )
+        if self.backend.blocking:
+            hits, versions = await sync_to_async(self._lookup)(ids)
+        else:
+            hits, versions = self._lookup(ids)
+        missing = [user_id for user_id in ids if user_id not in hits]
+        if missing:
+            with use_primary():
+                loaded = self._convert(
+                    await sync_to_async(user_shards.fetch)(User.objects.all(), missing)
+                )
+            if self.backend.blocking:
+                await sync_to_async(self._store)(loaded, versions)
+            else:
+                self._store(loaded, versions)
+            hits.update(loaded)
+        return hits
+
+    def get(self, user_id: int) -> Optional[SafetyUser]:
+        return self.get_many([user_id]).get(user_id)
+
+    def bump(self, ids: Iterable[int]) -> None:
+        """更换版本戳并删除条目，写操作后调用"""
+        ids = list(ids)
+        if not ids or self.backend is None:
+            return
+        self.backend.set_many({self._version_key(i): _new_stamp() for i in ids})
+        self.backend.delete_many(self._entry_key(i) for i in ids)
+
+    async def abump(self, ids: Iterable[int]) -> None:
+        if self.backend is not None and self.backend.blocking:
+            await sync_to_async(self.bump)(ids)
+        else:
+            self.bump(ids)
+
+    def on_saved(self, sender, instance: User, **kwargs) -> None:
+        # 兜底：绕过 UserServices 的写入(后台、脚本)也会经信号更换版本戳
+        self.bump([instance.id])
+
+    def on_users_changed(self, sender, users=(), removed_ids=(), **kwargs) -> None:
+        # 事务提交后再换一次：提交前并发读取写回的旧数据随之失效
+        self.bump([user.id for user in users] + list(removed_ids))
+
+
+def _make_backend() -> Optional[CacheBackend]:
+    """safety_user_cache 配置: local / none / django:<CACHES 中的别名>"""
+    kind = config.safety_user_cache
+    if kind == "none":
+        return None
+    if kind.startswith("django:"):
+        return DjangoCacheBackend(kind.split(":", 1)[1], config.safety_user_cache_ttl)
+    return LocalMemoryBackend(
+        config.safety_user_cache_size, config.safety_user_cache_ttl
+    )
+
+
+safety_user_cache = SafetyUserCache(_make_backend())
+post_save.connect(safety_user_cache.on_saved, sender=User, dispatch_uid="safety_user")
+post_delete.connect(safety_user_cache.on_saved, sender=User, dispatch_uid="safety_user")
+users_changed.connect(safety_user_cache.on_users_changed, dispatch_uid="safety_user")
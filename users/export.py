@@ -0,0 +1,111 @@
+"""
+用户数据流式导出(NDJSON / CSV)
+"""
+
+import csv
+import heapq
+import itertools
+import json
+from operator import itemgetter
+from typing import AsyncIterator, Dict, Iterator, Optional
+from asgiref.sync import sync_to_async
+from .models import Users as User
+from .sharding import user_shards
+
+# 导出字段与 SafetyUser 保持一致，key 为导出列名，value 为数据库字段
+EXPORT_FIELDS = {
+    "user_account": "user_account",
+    "user_name": "user_name",
+    "user_id": "id",
+    "avatar_url": "avatar_url",
+    "gender": "gender",
+    "phone": "phone",
+    "email": "email",
+    "user_status": "user_status",
+    "user_role": "user_role",
+    "planet_code": "planet_code",
+}
+# 与 convert_safety_user 一致：这些字段为空时保留 null，其余字段为空时输出空字符串
+NULLABLE = {"avatar_url", "gender", "phone", "email"}
+# 每批从数据库读取的行数
+EXPORT_CHUNK_SIZE = 2000
+# ASGI 下每次切换到同步线程取出的行数
+ASYNC_BATCH_LINES = 500
+
+
+def iter_export_rows(
+    after_id: Optional[int] = None, chunk_size: int = EXPORT_CHUNK_SIZE
+) -> Iterator[Dict]:
+    """按 id 升序逐批读取未删除用户
+    每批是一次独立的 keyset 查询(id > 上一批最后的 id)，
+    MySQL 驱动不支持服务端游标，这样可以保证内存占用与表大小无关
+    Args:
+        after_id: 只导出 id 大于该值的用户，用于断点续传
+        chunk_size: 每批行数
+    """
+    columns = list(EXPORT_FIELDS.values())
+    # 分片时每个分片各自按 id 分批读取，再按 id 归并
+    shards = [
+        _iter_shard(queryset, after_id or 0, chunk_size)
+        for queryset in user_shards.each(User.objects.order_by("id").values(*columns))
+    ]
+    for row in heapq.merge(*shards, key=itemgetter("id")):
+        yield {
+            name: (row[field] if row[field] is not None or name in NULLABLE else "")
+            for name, field in EXPORT_FIELDS.items()
+        }
+
+
+def _iter_shard(queryset, last_id: int, chunk_size: int) -> Iterator[Dict]:
+    while True:
+        count = 0
+        for row in queryset.filter(id__gt=last_id)[:chunk_size].iterator(
+            chunk_size=chunk_size
+        ):
+            count += 1
+            last_id = row["id"]
+            yield row
+        if count < chunk_size:
+            return
+
+
+def iter_ndjson(rows: Iterator[Dict]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + "\n"
+
+
+class _Echo:
+    """csv.writer 需要一个带 write 方法的对象，这里直接把写入的行返回"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_csv(rows: Iterator[Dict]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(list(EXPORT_FIELDS.keys()))
+    for row in rows:
+        yield writer.writerow(["" if v is None else v for v in row.values()])
+
+
+async def aiter_lines(lines: Iterator[str]) -> AsyncIterator[str]:
+    """把逐行输出包装成异步迭代器，供 ASGI 下的 StreamingHttpResponse 使用
+    ASGI 下 Django 用 sync_to_async(list) 一次性消费同步迭代器，整个导出会先缓存在内存中；
+    这里每次在同一个同步线程(数据库连接所在的线程)中取出 ASYNC_BATCH_LINES 行
+    """
+    take = sync_to_async(
+        lambda: "".join(itertools.islice(lines, ASYNC_BATCH_LINES)),
+        thread_sensitive=True,
+    )
+    try:
+        while True:
+            # 每行都不为空，取不到内容表示已经结束
+            chunk = await take()
+            if not chunk:
+                return
+            yield chunk
+    finally:
+        # 客户端断开时也结束同步生成器
+        close = getattr(lines, "close", None)
+        if close is not None:
+            await sync_to_async(close, thread_sensitive=True)()
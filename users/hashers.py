@@ -0,0 +1,306 @@
+"""
+密码加密
+    - 可插拔的加密算法：新密码默认使用 PBKDF2(可选 scrypt)，兼容历史的加盐 MD5
+    - 加密/校验在有界的线程池(或进程池)中执行，同步和异步处理函数都可以等待结果
+    - 批量注册的加密在单独的小池中执行，不占用登录、注册的工作线程
+    - 登录校验通过后，若密文使用的是旧算法或旧参数，返回 needs_update 以便透明地重新加密
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import secrets
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from core.config import get_config
+from core.constants import ErrorCode
+from core.exception.business_exception import BusinessException
+
+config = get_config()
+SEPARATOR = "$"
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+class PasswordHasher(ABC):
+    """加密算法基类，密文格式为 "<algorithm>$<参数...>"
+    子类必须可以被 pickle，以便在进程池中执行
+    """
+
+    algorithm: str = ""
+
+    @abstractmethod
+    def encode(self, password: str) -> str: ...
+
+    @abstractmethod
+    def verify(self, password: str, encoded: str) -> bool: ...
+
+    def must_update(self, encoded: str) -> bool:
+        """密文参数(如迭代次数)与当前配置不一致时返回 True"""
+        return False
+
+
+class SaltedMD5Hasher(PasswordHasher):
+    """历史算法：md5(全局盐 + 密码) 的十六进制串，没有算法前缀，仅用于校验旧数据"""
+
+    algorithm = "salted_md5"
+
+    def __init__(self, salt: str):
+        self.salt = salt
+
+    def encode(self, password: str) -> str:
+        return hashlib.md5((self.salt + password).encode("utf-8")).hexdigest()
+
+    def verify(self, password: str, encoded: str) -> bool:
+        return hmac.compare_digest(self.encode(password), encoded)
+
+
+class PBKDF2Hasher(PasswordHasher):
+    algorithm = "pbkdf2_sha256"
+
+    def __init__(self, iterations: int):
+        self.iterations = iterations
+
+    def encode(
+        self,
+        password: str,
+        salt: Optional[str] = None,
+        iterations: Optional[int] = None,
+    ) -> str:
+        salt = salt or secrets.token_hex(16)
+        iterations = iterations or self.iterations
+        digest = hashlib.pbkdf2_hmac(
+            "sha256", password.encode("utf-8"), salt.encode("ascii"), iterations
+        )
+        return SEPARATOR.join((self.algorithm, str(iterations), salt, _b64(digest)))
+
+    def verify(self, password: str, encoded: str) -> bool:
+        _, iterations, salt, _ = encoded.split(SEPARATOR, 3)
+        return hmac.compare_digest(
+            self.encode(password, salt, int(iterations)), encoded
+        )
+
+    def must_update(self, encoded: str) -> bool:
+        return int(encoded.split(SEPARATOR, 2)[1]) != self.iterations
+
+
+class ScryptHasher(PasswordHasher):
+    algorithm = "scrypt"
+
+    def __init__(self, n: int, r: int, p: int):
+        self.n, self.r, self.p = n, r, p
+
+    def encode(
+        self,
+        password: str,
+        salt: Optional[str] = None,
+        params: Optional[Tuple[int, int, int]] = None,
+    ) -> str:
+        salt = salt or secrets.token_hex(16)
+        n, r, p = params or (self.n, self.r, self.p)
+        digest = hashlib.scrypt(
+            password.encode("utf-8"),
+            salt=salt.encode("ascii"),
+            n=n,
+            r=r,
+            p=p,
+            maxmem=256 * n * r + 1024 * 1024,
+            dklen=32,
+        )
+        return SEPARATOR.join(
+            (self.algorithm, str(n), str(r), str(p), salt, _b64(digest))
+        )
+
+    def verify(self, password: str, encoded: str) -> bool:
+        _, n, r, p, salt, _ = encoded.split(SEPARATOR, 5)
+        return hmac.compare_digest(
+            self.encode(password, salt, (int(n), int(r), int(p))), encoded
+        )
+
+    def must_update(self, encoded: str) -> bool:
+        _, n, r, p, _ = encoded.split(SEPARATOR, 4)
+        return (int(n), int(r), int(p)) != (self.n, self.r, self.p)
+
+
+HASHERS: Dict[str, PasswordHasher] = {
+    hasher.algorithm: hasher
+    for hasher in (
+        SaltedMD5Hasher(config.salt),
+        PBKDF2Hasher(config.pbkdf2_iterations),
+        ScryptHasher(config.scrypt_n, config.scrypt_r, config.scrypt_p),
+    )
+}
+
+
+def get_hasher(algorithm: str) -> PasswordHasher:
+    try:
+        return HASHERS[algorithm]
+    except KeyError:
+        raise ValueError(f"unknown password hasher: {algorithm}")
+
+
+def identify_hasher(encoded: str) -> Optional[PasswordHasher]:
+    """根据密文识别算法，没有前缀的视为历史的加盐 MD5"""
+    if SEPARATOR not in encoded:
+        return HASHERS[SaltedMD5Hasher.algorithm]
+    return HASHERS.get(encoded.split(SEPARATOR, 1)[0])
+
+
+def _encode(hasher: PasswordHasher, password: str) -> str:
+    return hasher.encode(password)
+
+
+def _verify(hasher: PasswordHasher, password: str, encoded: str) -> bool:
+    try:
+        return hasher.verify(password, encoded)
+    except ValueError:
+        # 密文格式损坏时视为不匹配
+        return False
+
+
+class HashingPool:
+    """有界的加密执行池
+    超过 max_pending 个任务排队时直接拒绝，避免加密请求无限堆积拖垮整个进程
+    PBKDF2 / scrypt 在 hashlib 中计算时会释放 GIL，默认使用线程池即可并行
+    """
+
+    def __init__(self, kind: str, workers: int, max_pending: int):
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    executor_class = (
+                        ProcessPoolExecutor
+                        if self.kind == "process"
+                        else ThreadPoolExecutor
+                    )
+                    self._executor = executor_class(max_workers=self.workers)
+        return self._executor
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise BusinessException(
+                    error_code=ErrorCode.SYSTEM_ERROR,
+                    description="系统繁忙，请稍后重试",
+                )
+            self._pending += 1
+
+    def _release(self, _future=None) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def submit(self, fn: Callable, *args):
+        self._acquire()
+        try:
+            future = self.executor.submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def run(self, fn: Callable, *args):
+        return self.submit(fn, *args).result()
+
+    async def arun(self, fn: Callable, *args):
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def map(self, fn: Callable, *iterables: Iterable) -> List:
+        """批量执行，同时在途的任务不超过 workers 个，不受 max_pending 限制"""
+        args_list = list(zip(*iterables))
+        results: List = []
+        for start in range(0, len(args_list), self.workers):
+            window = [
+                self.executor.submit(fn, *args)
+                for args in args_list[start : start + self.workers]
+            ]
+            results.extend(future.result() for future in window)
+        return results
+
+
+hashing_pool = HashingPool(
+    config.hash_pool, config.hash_workers, config.hash_max_pending
+)
+# 批量加密使用单独的小池，登录、注册始终有空闲的工作线程
+batch_hashing_pool = HashingPool(
+    config.hash_pool, config.batch_hash_workers, config.hash_max_pending
+)
+
+
+def make_password(password: str) -> str:
+    """用当前配置的算法加密(在加密池中执行)"""
+    return hashing_pool.run(_encode, get_hasher(config.password_hasher), password)
+
+
+async def amake_password(password: str) -> str:
+    return await hashing_pool.arun(
+        _encode, get_hasher(config.password_hasher), password
+    )
+
+
+def make_passwords(passwords: Iterable[str]) -> List[str]:
+    """批量加密，用于批量注册(在批量加密池中执行)"""
+    passwords = list(passwords)
+    hasher = get_hasher(config.password_hasher)
+    return batch_hashing_pool.map(_encode, [hasher] * len(passwords), passwords)
+
+
+_dummy_encoded: Dict[str, str] = {}
+
+
+def _dummy() -> Tuple[PasswordHasher, str]:
+    """当前算法和参数下的一个固定密文，用于校验不存在的账号"""
+    hasher = get_hasher(config.password_hasher)
+    encoded = _dummy_encoded.get(hasher.algorithm)
+    if encoded is None or hasher.must_update(encoded):
+        encoded = _dummy_encoded[hasher.algorithm] = hasher.encode(
+            secrets.token_hex(16)
+        )
+    return hasher, encoded
+
+
+def _check(
+    hasher: Optional[PasswordHasher], encoded: str, valid: bool
+) -> Tuple[bool, bool]:
+    if not valid:
+        return False, False
+    current = get_hasher(config.password_hasher)
+    return True, hasher is not current or hasher.must_update(encoded)
+
+
+def check_password(password: str, encoded: Optional[str]) -> Tuple[bool, bool]:
+    """校验密码
+    Returns:
+        (是否匹配, 是否需要用当前算法重新加密)
+    """
+    hasher = identify_hasher(encoded) if encoded else None
+    if hasher is None:
+        # 账号不存在(或密文无法识别)时同样计算一次，响应时间不暴露账号是否存在
+        hasher, dummy = _dummy()
+        hashing_pool.run(_verify, hasher, password, dummy)
+        return False, False
+    return _check(hasher, encoded, hashing_pool.run(_verify, hasher, password, encoded))
+
+
+async def acheck_password(password: str, encoded: Optional[str]) -> Tuple[bool, bool]:
+    hasher = identify_hasher(encoded) if encoded else None
+    if hasher is None:
+        hasher, dummy = _dummy()
+        await hashing_pool.arun(_verify, hasher, password, dummy)
+        return False, False
+    valid = await hashing_pool.arun(_verify, hasher, password, encoded)
+    return _check(hasher, encoded, valid)
@@ -0,0 +1,153 @@
+"""
+进程内用户索引(n-gram、标签位图、标签矩阵)与数据库的同步
+    - 本进程的写入通过 users_changed 信号实时更新
+    - 其他进程、seed / bulk_create、直接写库新增的用户：每隔 user_index_refresh 秒按
+      id > 已见最大 id 追赶一次(与 users/unique_filter.py 相同，走主键范围查询)
+    - 其他进程的改名、改标签、删除不改变 id，追赶不到：每隔 user_index_rebuild 秒在后台线程全量重建，
+      重建期间继续使用旧索引，本进程在重建期间的写入在新索引替换后重放。索引的过期时间因此有上限
+    - 分片时各进程按块领取 id，其他进程较小的 id 可能晚于已见最大 id 写入而被跳过，同样由重建兜底
+"""
+
+import logging
+import threading
+import time
+from typing import List, Optional, Tuple
+from django.db import connections
+from django.db.models import Max
+from core.config import get_config
+from core.db_router import use_primary
+from .models import Users as User
+from .sharding import user_shards
+
+config = get_config()
+logger = logging.getLogger("django")
+
+
+class SyncedIndex:
+    """子类实现 build() / upsert(user_id, value) / remove(user_id)，
+    并设置 field(upsert 使用的 users 字段)；build() 在 self._lock 下替换索引并设置 _built
+    """
+
+    field = ""
+
+    def __init__(
+        self,
+        refresh_interval: float = config.user_index_refresh,
+        rebuild_interval: float = config.user_index_rebuild,
+    ):
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.RLock()
+        self._built = False
+        self._max_id = 0
+        # 手动标记为已构建的索引(测试)不立即追赶或重建
+        self._built_at = self._refreshed_at = time.monotonic()
+        self._rebuilding = False
+        # 重建期间收到的变更，新索引替换后重放
+        self._replay: Optional[List[Tuple]] = None
+
+    @property
+    def built(self) -> bool:
+        return self._built
+
+    def _needs_rebuild(self) -> bool:
+        """需要在查询前同步重建(子类可扩展，例如失效行过多)"""
+        return not self._built
+
+    def ensure_built(self) -> None:
+        if self._needs_rebuild():
+            with self._lock:
+                if self._needs_rebuild():
+                    self._rebuild()
+            return
+        now = time.monotonic()
+        if self.rebuild_interval > 0 and now - self._built_at >= self.rebuild_interval:
+            self._rebuild_in_background()
+        elif (
+            self.refresh_interval > 0
+            and now - self._refreshed_at >= self.refresh_interval
+        ):
+            with self._lock:
+                if time.monotonic() - self._refreshed_at >= self.refresh_interval:
+                    self._catch_up()
+
+    @use_primary()
+    def _rebuild(self) -> None:
+        with self._lock:
+            self._replay = []
+        try:
+            # 先取最大 id：构建期间新增的行由下一次追赶读取(upsert 可以重复执行)
+            max_id = _max_id()
+            self.build()
+            with self._lock:
+                for users, removed_ids in self._replay:
+                    self._apply(users, removed_ids)
+                self._max_id = max_id
+                self._built_at = self._refreshed_at = time.monotonic()
+        finally:
+            self._replay = None
+
+    def _rebuild_in_background(self) -> None:
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(
+            target=self._background_rebuild,
+            name=f"{type(self).__name__}-rebuild",
+            daemon=True,
+        ).start()
+
+    def _background_rebuild(self) -> None:
+        try:
+            self._rebuild()
+        except Exception:
+            logger.exception(f"{type(self).__name__} rebuild failed")
+            # 失败后等下一个周期再试，期间继续使用旧索引
+            self._built_at = time.monotonic()
+        finally:
+            # 本线程的连接不会在请求结束时关闭(或归还连接池)
+            connections.close_all()
+            with self._lock:
+                self._rebuilding = False
+
+    @use_primary()
+    def _catch_up(self) -> None:
+        """读取 id 大于已见最大 id 的行；已逻辑删除的行从索引中移除"""
+        rows = user_shards.iterate(
+            User.all_objects.filter(id__gt=self._max_id)
+            .values_list("id", "is_delete", self.field)
+            .order_by()
+        )
+        for user_id, is_delete, value in rows:
+            if is_delete:
+                self.remove(user_id)
+            else:
+                self.upsert(user_id, value)
+            self._max_id = max(self._max_id, user_id)
+        self._refreshed_at = time.monotonic()
+
+    def _apply(self, users, removed_ids) -> None:
+        for user in users:
+            self.upsert(user.id, getattr(user, self.field))
+        for user_id in removed_ids:
+            self.remove(user_id)
+
+    def on_users_changed(self, sender, users=(), removed_ids=(), **kwargs) -> None:
+        # 尚未构建时无需维护，构建时会读取最新数据
+        if not self._built:
+            return
+        with self._lock:
+            self._apply(users, removed_ids)
+            if self._replay is not None:
+                self._replay.append((list(users), list(removed_ids)))
+
+
+def _max_id() -> int:
+    return max(
+        (
+            queryset.aggregate(max_id=Max("id"))["max_id"] or 0
+            for queryset in user_shards.each(User.all_objects)
+        ),
+        default=0,
+    )
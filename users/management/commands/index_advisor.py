@@ -0,0 +1,268 @@
+"""
+索引建议：执行 UserServices 的典型调用并捕获其 SQL，对每条语句做 EXPLAIN，
+标记全表(全索引)扫描，并按 WHERE / ORDER BY 中的列给出可评审的 CREATE INDEX 语句
+
+users / tags 表是 managed = False，Django 不会为其建索引，需要人工评审后执行输出的 DDL。
+捕获在一个最终回滚的事务中进行，不会修改数据；支持 MySQL(EXPLAIN) 和 SQLite(EXPLAIN QUERY PLAN)
+配置了分片(USER_SHARDS)时拒绝执行：users 的写入在各分片提交，主库的事务无法回滚，
+语句也不经过主库连接，无法捕获；请对单个分片库单独执行
+"""
+
+import io
+import re
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from django.apps import apps
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from core.exception.business_exception import BusinessException
+from tags.tree import TagTreeCache
+from users import service
+from users.cache import safety_user_cache
+from users.service import UserServices
+from users.sharding import user_shards
+from users.unique_filter import account_filter, planet_code_filter
+
+# 取值很少的列：单独建索引没有意义，只作为组合索引的前缀
+LOW_CARDINALITY = {"is_delete", "is_parent", "user_status", "user_role", "gender"}
+PROBE_ACCOUNT = "idxadvisorprobe"
+PROBE_PASSWORD = "idxadvisorpass"
+# 星球编号最长 5 位
+PROBE_PLANET_CODE = "idx~"
+
+_COLUMN = r'[`"](\w+)[`"]\.[`"](\w+)[`"]'
+_PREDICATE = re.compile(_COLUMN + r"\s*(=|IN\b|>=|<=|>|<|LIKE\b)", re.IGNORECASE)
+_ORDER_BY = re.compile(r"\bORDER BY\s+" + _COLUMN, re.IGNORECASE)
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Query:
+    def __init__(self, scenario: str, sql: str, params):
+        self.scenario = scenario
+        self.sql = sql
+        self.params = params
+        self.plan: List[str] = []
+        self.full_scans: List[str] = []
+
+
+def _scenarios() -> List[Tuple[str, Callable[[], object]]]:
+    now = timezone.now()
+    return [
+        (
+            "register",
+            lambda: UserServices.user_register(
+                PROBE_ACCOUNT, PROBE_PASSWORD, PROBE_PASSWORD, PROBE_PLANET_CODE
+            ),
+        ),
+        ("login", lambda: UserServices.do_login(None, PROBE_ACCOUNT, "wrongpassword")),
+        (
+            "batch_register",
+            lambda: UserServices._existing_values("planet_code", [PROBE_PLANET_CODE]),
+        ),
+        ("list", lambda: UserServices.list(limit=20)),
+        ("list_by_name", lambda: UserServices.list("probe", limit=20)),
+        (
+            "list_by_filters",
+            lambda: UserServices.list(
+                user_role=0, create_time_start=now - timedelta(days=7), limit=20
+            ),
+        ),
+        ("bulk_delete", lambda: UserServices.bulk_set_deleted([1, 2], deleted=True)),
+        (
+            "purge_deleted_users",
+            lambda: call_command(
+                "purge_deleted_users", dry_run=True, stdout=io.StringIO()
+            ),
+        ),
+        # 用新的缓存实例加载，不影响进程内共享的标签树
+        ("tag_tree", lambda: TagTreeCache().get()),
+    ]
+
+
+@contextmanager
+def _bypass_in_process_indexes():
+    """关闭进程内的布隆过滤器、n-gram 索引和 SafetyUser 缓存，确保语句真正发往数据库"""
+    saved = (
+        account_filter.enabled,
+        planet_code_filter.enabled,
+        service.config.user_name_index,
+        safety_user_cache.backend,
+    )
+    account_filter.enabled = planet_code_filter.enabled = False
+    service.config.user_name_index = False
+    safety_user_cache.backend = None
+    try:
+        yield
+    finally:
+        (
+            account_filter.enabled,
+            planet_code_filter.enabled,
+            service.config.user_name_index,
+            safety_user_cache.backend,
+        ) = saved
+
+
+def capture_queries(
+    scenarios: List[Tuple[str, Callable[[], object]]],
+) -> List[Query]:
+    """在回滚的事务中执行各场景，返回去重后的 SELECT / UPDATE / DELETE 语句"""
+    queries: Dict[str, Query] = {}
+    current = [""]
+
+    def wrapper(execute, sql, params, many, context):
+        verb = sql.lstrip().split(None, 1)[0].upper()
+        if verb in ("SELECT", "UPDATE", "DELETE") and sql not in queries:
+            queries[sql] = Query(current[0], sql, params)
+        return execute(sql, params, many, context)
+
+    with _bypass_in_process_indexes(), connection.execute_wrapper(wrapper):
+        try:
+            with transaction.atomic():
+                for name, run in scenarios:
+                    current[0] = name
+                    try:
+                        run()
+                    except BusinessException:
+                        # 例如登录失败，只关心已经发出的语句
+                        pass
+                raise _Rollback
+        except _Rollback:
+            pass
+    return list(queries.values())
+
+
+def explain(query: Query) -> None:
+    """填充 query.plan 和 query.full_scans(全表/全索引扫描的表名)"""
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + query.sql, query.params)
+            for row in cursor.fetchall():
+                detail = row[-1]
+                query.plan.append(detail)
+                match = re.match(r"SCAN (?:TABLE )?(\w+)", detail)
+                if match and " USING " not in detail:
+                    query.full_scans.append(match.group(1))
+        else:
+            cursor.execute("EXPLAIN " + query.sql, query.params)
+            columns = [col[0].lower() for col in cursor.description]
+            for values in cursor.fetchall():
+                row = dict(zip(columns, values))
+                query.plan.append(
+                    f"table={row.get('table')} type={row.get('type')} "
+                    f"key={row.get('key')} rows={row.get('rows')} "
+                    f"extra={row.get('extra')}"
+                )
+                # ALL 为全表扫描，index 为全索引扫描
+                if row.get("type") in ("ALL", "index"):
+                    query.full_scans.append(row.get("table"))
+
+
+def suggest_columns(sql: str, table: str) -> Optional[Tuple[str, ...]]:
+    """按 "低基数等值列 + 其他等值列 + 一个范围/排序列" 组合索引列，没有可选择列时返回 None
+    LIKE(前置通配)无法使用 B-tree 索引，不参与组合
+    """
+    where = re.split(r"\b(?:ORDER BY|LIMIT)\b", sql, maxsplit=1, flags=re.I)[0]
+    low, equal, ranges = [], [], []
+    for table_name, column, operator in _PREDICATE.findall(where):
+        if table_name != table or column == "id":
+            continue
+        operator = operator.upper()
+        if operator == "LIKE":
+            continue
+        if operator in ("=", "IN"):
+            target = low if column in LOW_CARDINALITY else equal
+        else:
+            target = ranges
+        if column not in target:
+            target.append(column)
+    order = _ORDER_BY.search(sql)
+    if order and order.group(1) == table and order.group(2) != "id":
+        ranges.append(order.group(2))
+    if not equal and not ranges:
+        return None
+    low.sort(key=lambda column: column != "is_delete")
+    return tuple(low + equal + ranges[:1])
+
+
+def existing_indexes(table: str) -> List[Tuple[Tuple[str, ...], bool]]:
+    """返回表上已有的索引 [(列, 是否唯一)]"""
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return [
+        (tuple(info["columns"]), bool(info.get("unique") or info.get("primary_key")))
+        for info in constraints.values()
+        if info.get("index") or info.get("unique") or info.get("primary_key")
+    ]
+
+
+def create_index_sql(table: str, columns: Tuple[str, ...], unique=False) -> str:
+    quote = connection.ops.quote_name
+    prefix = "uniq" if unique else "idx"
+    name = f"{prefix}_{table}_{'_'.join(columns)}"[:64]
+    return (
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX {quote(name)} ON {quote(table)} "
+        f"({', '.join(quote(column) for column in columns)});"
+    )
+
+
+class Command(BaseCommand):
+    help = "对 UserServices 发出的 SQL 做 EXPLAIN，标记全表扫描并输出建议的索引 DDL"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", help="把建议的 DDL 另外写入该文件")
+
+    def handle(self, *args, output=None, **options):
+        if user_shards.enabled:
+            raise CommandError(
+                "配置了 USER_SHARDS 时无法回滚分片中的写入，请在未分片的配置下对分片库执行"
+            )
+        tables = {
+            model._meta.db_table
+            for model in apps.get_models()
+            if not model._meta.managed and model._meta.app_label in ("users", "tags")
+        }
+        suggestions: Dict[Tuple[str, Tuple[str, ...]], List[str]] = {}
+        queries = capture_queries(_scenarios())
+        for query in queries:
+            explain(query)
+            flag = " [全表扫描: " + ", ".join(query.full_scans) + "]"
+            self.stdout.write(
+                f"-- {query.scenario}{flag if query.full_scans else ''}\n"
+                f"--   {query.sql}\n"
+                + "".join(f"--   | {line}\n" for line in query.plan)
+            )
+            for table in set(query.full_scans) & tables:
+                columns = suggest_columns(query.sql, table)
+                if columns:
+                    suggestions.setdefault((table, columns), []).append(query.scenario)
+                elif " LIKE " in query.sql.upper():
+                    self.stdout.write(
+                        "--   前置通配的 LIKE 无法使用索引，"
+                        "用户名查询由进程内 n-gram 索引缩小候选集\n"
+                    )
+
+        ddl = []
+        existing = {table: existing_indexes(table) for table in tables}
+        for (table, columns), scenarios in sorted(suggestions.items()):
+            if any(index[: len(columns)] == columns for index, _ in existing[table]):
+                continue
+            ddl.append(f"-- 用于: {', '.join(sorted(set(scenarios)))}")
+            ddl.append(create_index_sql(table, columns))
+        # 注册查重的最终兜底依赖唯一索引(见 users/unique_filter.py)；
+        # 唯一索引也覆盖逻辑删除的行，已删除用户的账号不能再被注册
+        for column in ("user_account", "planet_code"):
+            if ((column,), True) not in existing.get("users", [((column,), True)]):
+                ddl.append(f"-- 唯一性兜底: 执行前需清理 {column} 的重复数据")
+                ddl.append(create_index_sql("users", (column,), unique=True))
+
+        text = "\n".join(ddl) + "\n" if ddl else "-- 没有需要新增的索引\n"
+        self.stdout.write("-- 建议的索引(请评审后在数据库中执行)\n" + text)
+        if output:
+            with open(output, "w", encoding="utf-8") as file:
+                file.write(text)
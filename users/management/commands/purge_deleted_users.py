@@ -0,0 +1,67 @@
+"""
+物理删除逻辑删除超过 N 天的用户
+按主键小批量删除，每批单独提交并在批次之间休眠，避免长事务和长时间持有行锁；
+可以随时中断，下次运行从剩余的行继续
+"""
+
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from users.models import Users as User
+from users.sharding import user_shards
+from users.stats import user_stats
+
+
+class Command(BaseCommand):
+    help = "物理删除 is_delete=1 且 update_time 早于 N 天前的用户(update_time 为空的行不处理)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30, help="逻辑删除后保留的天数")
+        parser.add_argument(
+            "--batch-size", type=int, default=500, help="每批删除的行数"
+        )
+        parser.add_argument(
+            "--sleep", type=float, default=0.1, help="批次之间的休眠秒数"
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="只统计待删除的行数，不删除"
+        )
+
+    def handle(self, *args, days, batch_size, sleep, dry_run, **options):
+        if days < 0 or batch_size <= 0:
+            raise CommandError("--days 不能为负数，--batch-size 必须大于 0")
+        deadline = timezone.now() - timedelta(days=days)
+        # 分片时逐个分片处理
+        shards = user_shards.each(
+            User.all_objects.filter(is_delete=1, update_time__lt=deadline)
+        )
+
+        if dry_run:
+            count = sum(expired.count() for expired in shards)
+            self.stdout.write(f"待删除 {count} 个用户")
+            return
+
+        total = 0
+        for expired in shards:
+            last_id = 0
+            while True:
+                # 按主键顺序取一批 id，再按主键删除，锁定范围只有这一批行
+                ids = list(
+                    expired.filter(id__gt=last_id)
+                    .order_by("id")
+                    .values_list("id", flat=True)[:batch_size]
+                )
+                if not ids:
+                    break
+                # 取 id 与删除之间可能被恢复，删除时重新带上条件
+                batch = expired.filter(id__in=ids)
+                with user_stats.atomic():
+                    deleted, _ = batch.delete()
+                    user_stats.purged(deleted, using=batch.db)
+                total += deleted
+                last_id = ids[-1]
+                if sleep:
+                    time.sleep(sleep)
+
+        self.stdout.write(self.style.SUCCESS(f"已删除 {total} 个用户"))
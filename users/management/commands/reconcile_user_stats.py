@@ -0,0 +1,30 @@
+"""
+按真实的 COUNT 校正用户统计计数(users/stats.py)
+计数由 UserServices 的写入维护，Django admin、直接改库等途径的写入会造成偏差，建议由 cron 定期运行
+"""
+
+from django.core.management.base import BaseCommand
+from users.stats import user_stats
+
+
+class Command(BaseCommand):
+    help = "按真实的 COUNT 校正 user_stats 表中的用户统计计数"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-age",
+            type=float,
+            default=None,
+            help="距上次校正不到这么多秒时跳过(默认总是校正)",
+        )
+
+    def handle(self, *args, max_age, **options):
+        drift = user_stats.reconcile(max_age=max_age)
+        if drift is None:
+            self.stdout.write("最近已校正，跳过")
+        elif drift:
+            for name, delta in sorted(drift.items()):
+                self.stdout.write(f"{name}: {delta:+d}")
+            self.stdout.write(self.style.WARNING(f"已校正 {len(drift)} 个计数"))
+        else:
+            self.stdout.write(self.style.SUCCESS("计数与真实值一致"))
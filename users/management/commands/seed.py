@@ -0,0 +1,253 @@
+"""
+生成压测 / 基准测试用的 users 和 tags 数据
+    - tags：按 --tag-parents 个父标签、每个父标签 --tags-per-parent 个子标签生成层级，已存在的同名标签直接复用
+    - users：账号(前缀 + 序号)和星球编号(base36)唯一，跳过库中已存在的值；标签列表按 Zipf 分布从子标签中抽取
+    - 所有用户共用一个密码密文(只加密一次)，按块 bulk_create，每块一个事务；配置了分片时与注册相同，按账号写入各分片并分配全局 id
+
+同一个 --seed 在同样的库状态下生成完全相同的数据。bulk_create 不触发 post_save，
+其他进程的进程内索引和布隆过滤器按 id 增量追上(见 users/unique_filter.py)
+"""
+
+import itertools
+import json
+import random
+import time
+from bisect import bisect_right
+from datetime import timedelta
+from typing import Iterator, List, Sequence, Set
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from tags.models import Tags
+from users.hashers import make_password
+from users.models import Users as User
+from users.sharding import user_shards
+from users.stats import user_stats
+
+SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何林罗高"
+GIVEN_NAMES = "伟芳娜敏静丽强磊洋艳勇军杰娟涛明超秀霞平刚桂英华玉兰"
+TAG_CATEGORIES = ("语言", "方向", "年级", "城市", "兴趣", "身份", "状态", "技能")
+# 星球编号最长 5 位
+MAX_PLANET_CODE = 36**5
+
+
+def base36(value: int) -> str:
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    text = ""
+    while True:
+        value, rem = divmod(value, 36)
+        text = digits[rem] + text
+        if not value:
+            return text
+
+
+def zipf_cum_weights(n: int, s: float) -> List[float]:
+    """排名 1..n 的 Zipf 累计权重(第 k 名的权重为 1/k^s)"""
+    return list(itertools.accumulate(1 / rank**s for rank in range(1, n + 1)))
+
+
+def sample_tags(
+    rng: random.Random,
+    names: Sequence[str],
+    cum_weights: Sequence[float],
+    max_tags: int,
+) -> List[str]:
+    """按 Zipf 分布抽取 0..max_tags 个不重复的标签"""
+    total = cum_weights[-1]
+    picked = {
+        names[bisect_right(cum_weights, rng.random() * total)]
+        for _ in range(rng.randint(0, max_tags))
+    }
+    return sorted(picked)
+
+
+def unused(candidates: Iterator[str], existing: Set[str]) -> Iterator[str]:
+    return (value for value in candidates if value not in existing)
+
+
+class Command(BaseCommand):
+    help = "生成压测用的用户和标签数据(确定性，按块 bulk_create)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10000, help="生成的用户数")
+        parser.add_argument("--seed", type=int, default=42, help="随机种子")
+        parser.add_argument("--prefix", default="seed", help="账号前缀(字母数字)")
+        parser.add_argument("--password", default="12345678", help="所有用户的密码")
+        parser.add_argument("--tag-parents", type=int, default=8, help="父标签数")
+        parser.add_argument(
+            "--tags-per-parent", type=int, default=25, help="每个父标签的子标签数"
+        )
+        parser.add_argument(
+            "--max-tags", type=int, default=6, help="每个用户最多的标签数"
+        )
+        parser.add_argument(
+            "--zipf", type=float, default=1.1, help="标签热度的 Zipf 指数"
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=5000, help="每个事务写入的行数"
+        )
+
+    def handle(self, *args, **options):
+        if (
+            options["users"] < 0
+            or options["batch_size"] <= 0
+            or options["tag_parents"] <= 0
+            or options["tags_per_parent"] <= 0
+        ):
+            raise CommandError("--users 不能为负数，其他数量参数必须大于 0")
+        if not options["prefix"].isalnum():
+            raise CommandError("--prefix 只能包含字母和数字")
+        if len(options["password"]) < 8:
+            raise CommandError("--password 至少 8 位")
+
+        rng = random.Random(options["seed"])
+        started = time.perf_counter()
+        tag_names = self.seed_tags(
+            options["prefix"], options["tag_parents"], options["tags_per_parent"]
+        )
+        # 热门标签分散到不同父标签下
+        rng.shuffle(tag_names)
+        created = self.seed_users(
+            rng,
+            options["users"],
+            options["prefix"],
+            options["password"],
+            tag_names,
+            zipf_cum_weights(len(tag_names), options["zipf"]),
+            options["max_tags"],
+            options["batch_size"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"已生成 {created} 个用户、{len(tag_names)} 个子标签，"
+                f"耗时 {time.perf_counter() - started:.1f}s"
+            )
+        )
+
+    def seed_tags(self, prefix: str, parents: int, per_parent: int) -> List[str]:
+        """创建缺失的父/子标签，返回子标签名列表"""
+        now = timezone.now()
+        parent_names = [
+            f"{TAG_CATEGORIES[p % len(TAG_CATEGORIES)]}{p}-{prefix}"
+            for p in range(parents)
+        ]
+        with transaction.atomic():
+            existing = dict(
+                Tags.objects.filter(tag_name__in=parent_names).values_list(
+                    "tag_name", "id"
+                )
+            )
+            Tags.objects.bulk_create(
+                Tags(
+                    tag_name=name,
+                    is_parent=1,
+                    is_delete=0,
+                    create_time=now,
+                    update_time=now,
+                )
+                for name in parent_names
+                if name not in existing
+            )
+            # MySQL 的 bulk_create 不回填主键，按名称查回 id
+            parent_ids = dict(
+                Tags.objects.filter(tag_name__in=parent_names).values_list(
+                    "tag_name", "id"
+                )
+            )
+            children = {
+                f"{parent}-{c}": parent_ids[parent]
+                for parent in parent_names
+                for c in range(per_parent)
+            }
+            existing = set(
+                Tags.objects.filter(tag_name__in=list(children)).values_list(
+                    "tag_name", flat=True
+                )
+            )
+            Tags.objects.bulk_create(
+                (
+                    Tags(
+                        tag_name=name,
+                        parent_id=parent_id,
+                        is_parent=0,
+                        is_delete=0,
+                        create_time=now,
+                        update_time=now,
+                    )
+                    for name, parent_id in children.items()
+                    if name not in existing
+                ),
+                batch_size=1000,
+            )
+        return list(children)
+
+    def seed_users(
+        self,
+        rng: random.Random,
+        count: int,
+        prefix: str,
+        password: str,
+        tag_names: List[str],
+        cum_weights: List[float],
+        max_tags: int,
+        batch_size: int,
+    ) -> int:
+        # 只加载可能冲突的已有值(分片时读取所有分片)
+        existing_accounts = set(
+            user_shards.iterate(
+                User.all_objects.filter(user_account__startswith=prefix)
+                .values_list("user_account", flat=True)
+                .order_by(),
+                chunk_size=10000,
+            )
+        )
+        existing_codes = set(
+            user_shards.iterate(
+                User.all_objects.exclude(planet_code=None)
+                .values_list("planet_code", flat=True)
+                .order_by(),
+                chunk_size=10000,
+            )
+        )
+        if count > MAX_PLANET_CODE - len(existing_codes):
+            raise CommandError("5 位以内的星球编号不足")
+        accounts = unused(
+            (f"{prefix}{n:07d}" for n in itertools.count()), existing_accounts
+        )
+        codes = unused((base36(n) for n in itertools.count(1)), existing_codes)
+
+        encoded = make_password(password)
+        now = timezone.now()
+        created = 0
+        while created < count:
+            users = []
+            for _ in range(min(batch_size, count - created)):
+                account = next(accounts)
+                create_time = now - timedelta(seconds=rng.randrange(365 * 86400))
+                tags = sample_tags(rng, tag_names, cum_weights, max_tags)
+                users.append(
+                    User(
+                        user_account=account,
+                        user_name=rng.choice(SURNAMES)
+                        + "".join(rng.choices(GIVEN_NAMES, k=rng.randint(1, 2))),
+                        user_password=encoded,
+                        gender=rng.randint(0, 1),
+                        phone=f"1{rng.randrange(3 * 10**9, 10**10):010d}",
+                        email=f"{account}@example.com",
+                        user_status=0,
+                        user_role=0,
+                        is_delete=0,
+                        planet_code=next(codes),
+                        tags=json.dumps(tags, ensure_ascii=False) if tags else None,
+                        create_time=create_time,
+                        update_time=create_time,
+                    )
+                )
+            # 分片时按账号写入各分片，分配全局 id 并登记星球编号
+            with user_stats.atomic():
+                user_shards.bulk_create(users)
+                user_stats.created(users)
+            created += len(users)
+            if created % (batch_size * 20) == 0 or created == count:
+                self.stdout.write(f"{created}/{count}")
+        return created
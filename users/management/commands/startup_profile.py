@@ -0,0 +1,147 @@
+"""
+冷启动分析：在新的解释器进程中(python -X importtime)依次执行 django.setup、读取配置、
+导入 URLconf、构建 NinjaAPI 和 OpenAPI schema，报告各阶段耗时和导入最慢的模块
+
+多次运行取中位数；--output 把结果写成 JSON，便于比较不同版本的启动耗时
+"""
+
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+PROJECT_PACKAGES = {"core", "users", "tags", "user_center"}
+
+# 子进程中执行，输出各阶段耗时(秒)的 JSON；importtime 的结果写到 stderr
+_CHILD = """
+import json, time
+from importlib import import_module
+phases = {}
+start = time.perf_counter()
+import django
+django.setup()
+phases["django.setup"] = time.perf_counter() - start
+
+from core.config import ProjectConfig
+start = time.perf_counter()
+for _ in range(5):
+    ProjectConfig()
+phases["ProjectConfig()"] = (time.perf_counter() - start) / 5
+
+from django.conf import settings
+start = time.perf_counter()
+import_module(settings.ROOT_URLCONF)
+phases["URLconf"] = time.perf_counter() - start
+
+from user_center.api import get_api
+start = time.perf_counter()
+api = get_api()
+api.urls
+phases["NinjaAPI"] = time.perf_counter() - start
+
+start = time.perf_counter()
+api.get_openapi_schema()
+phases["OpenAPI schema"] = time.perf_counter() - start
+print(json.dumps(phases))
+"""
+
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+
+def parse_importtime(text: str) -> Dict[str, Tuple[int, int]]:
+    """解析 -X importtime 的输出，返回 {模块: (自身微秒, 累计微秒)}"""
+    modules = {}
+    for line in text.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            modules[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return modules
+
+
+def run_child() -> Tuple[float, Dict[str, float], Dict[str, Tuple[int, int]]]:
+    env = dict(os.environ)
+    env.setdefault("DJANGO_SETTINGS_MODULE", settings.SETTINGS_MODULE)
+    base_dir = str(settings.BASE_DIR)
+    env["PYTHONPATH"] = os.pathsep.join(
+        path for path in (base_dir, env.get("PYTHONPATH")) if path
+    )
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD],
+        cwd=base_dir,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    total = time.perf_counter() - start
+    if result.returncode != 0:
+        raise CommandError("子进程启动失败:\n" + result.stderr[-2000:])
+    phases = json.loads(result.stdout.strip().splitlines()[-1])
+    return total, phases, parse_importtime(result.stderr)
+
+
+class Command(BaseCommand):
+    help = "在新进程中测量启动各阶段和模块导入的耗时"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=3, help="运行次数(取中位数)")
+        parser.add_argument("--top", type=int, default=20, help="列出最慢的模块数")
+        parser.add_argument(
+            "--project-only", action="store_true", help="只列出本项目的模块"
+        )
+        parser.add_argument("--output", help="把结果写入 JSON 文件")
+
+    def handle(self, *args, runs, top, project_only, output, **options):
+        if runs <= 0:
+            raise CommandError("--runs 必须大于 0")
+        samples = [run_child() for _ in range(runs)]
+
+        def median_ms(values: List[float]) -> float:
+            return round(statistics.median(values) * 1000, 2)
+
+        phases = {"process": median_ms([total for total, _, _ in samples])}
+        for name in samples[0][1]:
+            phases[name] = median_ms([sample[1][name] for sample in samples])
+        modules = {
+            name: round(statistics.median(s[2][name][1] for s in samples) / 1000, 2)
+            for name in samples[0][2]
+            if all(name in s[2] for s in samples)
+        }
+        packages: Dict[str, float] = {}
+        for name, (self_us, _) in samples[0][2].items():
+            package = name.split(".", 1)[0]
+            packages[package] = packages.get(package, 0) + self_us / 1000
+
+        self.stdout.write(f"启动阶段(ms，{runs} 次中位数)")
+        for name, value in phases.items():
+            self.stdout.write(f"  {name:<20} {value:>10.2f}")
+
+        candidates = [
+            (name, value)
+            for name, value in modules.items()
+            if not project_only or name.split(".", 1)[0] in PROJECT_PACKAGES
+        ]
+        candidates.sort(key=lambda item: item[1], reverse=True)
+        self.stdout.write("导入最慢的模块(累计 ms)")
+        for name, value in candidates[:top]:
+            self.stdout.write(f"  {name:<48} {value:>10.2f}")
+
+        ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+        self.stdout.write("按顶层包汇总的导入耗时(自身 ms)")
+        for name, value in ranked[:top]:
+            self.stdout.write(f"  {name:<48} {value:>10.2f}")
+
+        if output:
+            with open(output, "w", encoding="utf-8") as file:
+                json.dump(
+                    {"runs": runs, "phases": phases, "modules": modules},
+                    file,
+                    indent=2,
+                    sort_keys=True,
+                )
@@ -0,0 +1,187 @@
+"""
+按标签相似度匹配用户(向量化 top-K)
+每个用户的标签集合看作一个稀疏 0/1 向量，按标签列保存倒排的行号数组；
+给定查询用户的标签，用 np.bincount 一次求出所有用户与其交集大小，
+再向量化计算 Jaccard / 余弦相似度，最后用 argpartition 选出 top-K
+"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+from core.db_router import use_primary
+from core.lazy import lazy_import
+from .models import Users as User
+from .index_sync import SyncedIndex
+from .sharding import user_shards
+from .signals import users_changed
+from .tag_index import parse_tags
+
+# numpy 为可选依赖，未安装时 tag_matcher 为 None，匹配接口返回系统错误；
+# 导入 numpy 较慢，推迟到第一次构建/写入矩阵时
+np = lazy_import("numpy")
+
+logger = logging.getLogger("django")
+
+METRICS = ("jaccard", "cosine")
+# 失效行(更新/删除留下的旧行)占比超过该值时，下次查询前重建矩阵
+COMPACT_RATIO = 0.5
+COMPACT_MIN_ROWS = 10000
+
+
+class TagMatcher(SyncedIndex):
+    """线程安全的进程内标签矩阵，首次查询时从数据库构建，与数据库的同步见 users/index_sync.py
+
+    矩阵只追加：用户更新时旧行标记为失效并追加新行，删除时只标记失效，
+    失效行过多时整体重建
+    """
+
+    field = "tags"
+
+    def __init__(self):
+        super().__init__()
+        self._reset(capacity=0)
+
+    def _reset(self, capacity: int = 1024) -> None:
+        self._columns: Dict[str, int] = {}
+        # 每个标签列命中的行号：已合并的 ndarray + 尚未合并的新增行
+        self._postings: List["np.ndarray"] = []
+        self._pending: List[List[int]] = []
+        self._row_of: Dict[int, int] = {}
+        # capacity 为 0 时不分配数组(也不触发 numpy 导入)，第一次追加行时再分配
+        self._user_ids = self._sizes = self._alive = None
+        if capacity:
+            self._user_ids = np.zeros(capacity, dtype=np.int64)
+            self._sizes = np.zeros(capacity, dtype=np.int32)
+            self._alive = np.zeros(capacity, dtype=bool)
+        self._rows = 0
+        self._dead = 0
+
+    @use_primary()
+    def build(self) -> None:
+        """从 users 表全量构建矩阵"""
+        user_ids: List[int] = []
+        sizes: List[int] = []
+        postings: Dict[str, List[int]] = {}
+        rows = user_shards.iterate(User.objects.values_list("id", "tags"))
+        for row, (user_id, raw) in enumerate(rows):
+            tags = parse_tags(raw)
+            user_ids.append(user_id)
+            sizes.append(len(tags))
+            for tag in tags:
+                postings.setdefault(tag, []).append(row)
+        with self._lock:
+            self._reset(capacity=max(len(user_ids), 1024))
+            n = len(user_ids)
+            self._user_ids[:n] = user_ids
+            self._sizes[:n] = sizes
+            self._alive[:n] = True
+            self._row_of = {user_id: row for row, user_id in enumerate(user_ids)}
+            self._rows = n
+            for tag, tag_rows in postings.items():
+                self._columns[tag] = len(self._postings)
+                self._postings.append(np.asarray(tag_rows, dtype=np.int32))
+                self._pending.append([])
+            self._built = True
+        logger.info(f"tag matcher built: {n} users, {len(postings)} tags")
+
+    def _needs_rebuild(self) -> bool:
+        return not self._built or self._needs_compact()
+
+    def _needs_compact(self) -> bool:
+        return (
+            self._dead >= COMPACT_MIN_ROWS and self._dead > self._rows * COMPACT_RATIO
+        )
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._built = False
+
+    def upsert(self, user_id: int, raw_tags: Optional[str]) -> None:
+        with self._lock:
+            self._kill(user_id)
+            self._append(user_id, parse_tags(raw_tags))
+
+    def remove(self, user_id: int) -> None:
+        with self._lock:
+            self._kill(user_id)
+
+    def _kill(self, user_id: int) -> None:
+        row = self._row_of.pop(user_id, None)
+        if row is not None:
+            self._alive[row] = False
+            self._dead += 1
+
+    def _append(self, user_id: int, tags: Tuple[str, ...]) -> None:
+        row = self._rows
+        if self._user_ids is None:
+            self._reset()
+        elif row == len(self._user_ids):
+            capacity = row * 2
+            self._user_ids = np.resize(self._user_ids, capacity)
+            self._sizes = np.resize(self._sizes, capacity)
+            self._alive = np.resize(self._alive, capacity)
+        self._user_ids[row] = user_id
+        self._sizes[row] = len(tags)
+        self._alive[row] = True
+        self._row_of[user_id] = row
+        self._rows += 1
+        for tag in tags:
+            column = self._columns.get(tag)
+            if column is None:
+                column = self._columns[tag] = len(self._postings)
+                self._postings.append(np.zeros(0, dtype=np.int32))
+                self._pending.append([])
+            self._pending[column].append(row)
+
+    def _posting(self, column: int) -> "np.ndarray":
+        pending = self._pending[column]
+        if pending:
+            self._postings[column] = np.concatenate(
+                (self._postings[column], np.asarray(pending, dtype=np.int32))
+            )
+            self._pending[column] = []
+        return self._postings[column]
+
+    def top_k(
+        self,
+        raw_tags: Optional[str],
+        k: int,
+        exclude_user_id: Optional[int] = None,
+        metric: str = "jaccard",
+    ) -> List[Tuple[int, float]]:
+        """返回与给定标签最相似的 k 个用户 (user_id, score)，按相似度降序
+        没有任何共同标签的用户不会出现在结果中
+        """
+        query = parse_tags(raw_tags)
+        self.ensure_built()
+        with self._lock:
+            columns = [self._columns[tag] for tag in query if tag in self._columns]
+            if not columns or k <= 0:
+                return []
+            n = self._rows
+            hits = np.concatenate([self._posting(column) for column in columns])
+            # 交集大小：每一行在查询标签列中出现的次数
+            intersection = np.bincount(hits, minlength=n)
+            candidates = np.flatnonzero(intersection[:n])
+            candidates = candidates[self._alive[candidates]]
+            if exclude_user_id is not None and exclude_user_id in self._row_of:
+                candidates = candidates[candidates != self._row_of[exclude_user_id]]
+            if candidates.size == 0:
+                return []
+
+            common = intersection[candidates].astype(np.float64)
+            sizes = self._sizes[candidates].astype(np.float64)
+            if metric == "cosine":
+                scores = common / np.sqrt(len(query) * sizes)
+            else:
+                scores = common / (len(query) + sizes - common)
+
+            # argpartition 只做 O(n) 的部分排序，再对 k 个结果排序
+            k = min(k, candidates.size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.lexsort((self._user_ids[candidates[top]], -scores[top]))]
+            return [(int(self._user_ids[candidates[i]]), float(scores[i])) for i in top]
+
+
+tag_matcher = TagMatcher() if np is not None else None
+if tag_matcher is not None:
+    users_changed.connect(tag_matcher.on_users_changed, dispatch_uid="tag_matcher")
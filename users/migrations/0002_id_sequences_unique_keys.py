@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IdSequence",
+            fields=[
+                (
+                    "name",
+                    models.CharField(
+                        db_comment="序列名",
+                        max_length=64,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("next_value", models.BigIntegerField(db_comment="下一个未分配的序号")),
+            ],
+            options={
+                "db_table": "id_sequences",
+                "db_table_comment": "全局 id 序列",
+            },
+        ),
+        migrations.CreateModel(
+            name="UniqueKey",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        db_comment="id", primary_key=True, serialize=False
+                    ),
+                ),
+                ("key_type", models.CharField(db_comment="唯一值类型", max_length=32)),
+                ("key_value", models.CharField(db_comment="唯一值", max_length=255)),
+                (
+                    "user_id",
+                    models.BigIntegerField(db_comment="所属用户 id", db_index=True),
+                ),
+            ],
+            options={
+                "db_table": "unique_keys",
+                "db_table_comment": "跨分片唯一值",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("key_type", "key_value"), name="unique_keys_type_value"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_id_sequences_unique_keys"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        db_comment="id", primary_key=True, serialize=False
+                    ),
+                ),
+                ("name", models.CharField(db_comment="计数名", max_length=64)),
+                ("slot", models.SmallIntegerField(db_comment="槽位")),
+                ("value", models.BigIntegerField(db_comment="计数值", default=0)),
+            ],
+            options={
+                "db_table": "user_stats",
+                "db_table_comment": "用户统计计数",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("name", "slot"), name="user_stats_name_slot"
+                    )
+                ],
+            },
+        ),
+    ]
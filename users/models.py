@@ -42,3 +42,50 @@ class Users(models.Model):
         managed = False
         db_table = "users"
         db_table_comment = "用户"
+
+
+class IdSequence(models.Model):
+    """全局 id 序列(users.sharding)，分片后 users 的 id 由这里按块分配"""
+
+    name = models.CharField(primary_key=True, max_length=64, db_comment="序列名")
+    next_value = models.BigIntegerField(db_comment="下一个未分配的序号")
+
+    class Meta:
+        db_table = "id_sequences"
+        db_table_comment = "全局 id 序列"
+
+
+class UniqueKey(models.Model):
+    """跨分片的唯一值登记(users.sharding)，例如星球编号"""
+
+    id = models.BigAutoField(primary_key=True, db_comment="id")
+    key_type = models.CharField(max_length=32, db_comment="唯一值类型")
+    key_value = models.CharField(max_length=255, db_comment="唯一值")
+    user_id = models.BigIntegerField(db_index=True, db_comment="所属用户 id")
+
+    class Meta:
+        db_table = "unique_keys"
+        db_table_comment = "跨分片唯一值"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["key_type", "key_value"], name="unique_keys_type_value"
+            )
+        ]
+
+
+class UserStat(models.Model):
+    """用户统计计数(users.stats)，每个计数分成若干槽位，读取时按名称求和"""
+
+    id = models.BigAutoField(primary_key=True, db_comment="id")
+    name = models.CharField(max_length=64, db_comment="计数名")
+    slot = models.SmallIntegerField(db_comment="槽位")
+    value = models.BigIntegerField(default=0, db_comment="计数值")
+
+    class Meta:
+        db_table = "user_stats"
+        db_table_comment = "用户统计计数"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["name", "slot"], name="user_stats_name_slot"
+            )
+        ]
@@ -0,0 +1,131 @@
+"""
+用户名 n-gram 倒排索引
+user_name__icontains 会生成前置通配的 LIKE，无法使用索引只能全表扫描；
+这里在进程内维护 n-gram -> 用户 id 集合，先用索引求出候选 id，再回表按主键查询
+"""
+
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+from core.db_router import use_primary
+from .models import Users as User
+from .index_sync import SyncedIndex
+from .sharding import user_shards
+from .signals import users_changed
+
+logger = logging.getLogger("django")
+
+# 候选集超过该值时，说明查询词很常见，LIMIT 很快就能扫到足够的行，直接回退 LIKE
+MAX_CANDIDATES = 10000
+
+
+def ngrams(text: str, n: int) -> Set[str]:
+    text = text.lower()
+    return {text[i : i + n] for i in range(len(text) - n + 1)}
+
+
+class NgramIndex(SyncedIndex):
+    """线程安全的进程内 n-gram 索引，首次查询时从数据库构建
+
+    每个进程各自维护一份，与数据库的同步见 users/index_sync.py；
+    其他进程的改名在下一次重建前仍是旧值，因此查询结果仍需回表用 icontains 校验
+    """
+
+    field = "user_name"
+
+    def __init__(self, n: int = 3):
+        super().__init__()
+        self.n = n
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+        self._names: Dict[int, str] = {}
+
+    @use_primary()
+    def build(self) -> None:
+        """从 users 表全量构建索引"""
+        postings: Dict[str, Set[int]] = defaultdict(set)
+        names: Dict[int, str] = {}
+        rows = user_shards.iterate(
+            User.objects.exclude(user_name__isnull=True)
+            .exclude(user_name="")
+            .values_list("id", "user_name")
+        )
+        for user_id, user_name in rows:
+            names[user_id] = user_name.lower()
+            for gram in ngrams(user_name, self.n):
+                postings[gram].add(user_id)
+        with self._lock:
+            self._postings, self._names, self._built = postings, names, True
+        logger.info(f"user_name n-gram index built: {len(names)} users")
+
+    def invalidate(self) -> None:
+        """丢弃索引，下次查询时重新构建(例如绕过 ORM 批量导入数据后)"""
+        with self._lock:
+            self._postings, self._names, self._built = defaultdict(set), {}, False
+
+    def upsert(self, user_id: int, user_name: Optional[str]) -> None:
+        with self._lock:
+            self._remove(user_id)
+            if user_name:
+                self._names[user_id] = user_name.lower()
+                for gram in ngrams(user_name, self.n):
+                    self._postings[gram].add(user_id)
+
+    def remove(self, user_id: int) -> None:
+        with self._lock:
+            self._remove(user_id)
+
+    def _remove(self, user_id: int) -> None:
+        old = self._names.pop(user_id, None)
+        if old is None:
+            return
+        for gram in ngrams(old, self.n):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(user_id)
+                if not ids:
+                    del self._postings[gram]
+
+    def search(self, query: str) -> Optional[List[int]]:
+        """返回用户名包含 query 的用户 id(升序)
+        query 短于 n 时索引无法回答，返回 None，由调用方回退到数据库查询
+        """
+        grams = ngrams(query, self.n)
+        if not grams:
+            return None
+        self.ensure_built()
+        needle = query.lower()
+        with self._lock:
+            # 从最短的倒排表开始求交集
+            postings = sorted(
+                (self._postings.get(gram, set()) for gram in grams), key=len
+            )
+            candidates = set(postings[0])
+            for ids in postings[1:]:
+                candidates &= ids
+                if not candidates:
+                    break
+            # n-gram 全部命中不代表是连续子串，需要再确认一次
+            return sorted(
+                user_id for user_id in candidates if needle in self._names[user_id]
+            )
+
+    def rank(self, query: str, user_ids: List[int]) -> List[Tuple[int, float]]:
+        """按 n-gram 集合的 Jaccard 相似度从高到低排序"""
+        grams = ngrams(query, self.n)
+        with self._lock:
+            scored = []
+            for user_id in user_ids:
+                name = self._names.get(user_id)
+                if name is None:
+                    continue
+                name_grams = ngrams(name, self.n)
+                union = len(grams | name_grams)
+                scored.append(
+                    (user_id, len(grams & name_grams) / union if union else 0.0)
+                )
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored
+
+
+user_name_index = NgramIndex()
+users_changed.connect(user_name_index.on_users_changed, dispatch_uid="user_name_index")
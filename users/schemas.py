@@ -1,11 +1,13 @@
 # 数据校验层
 from ninja import Schema
-from typing import Optional, Any, List, Type, TypeVar
+from typing import Optional, Any, Dict, List, Type, TypeVar
+from datetime import datetime
 from pydantic.alias_generators import to_camel, to_snake
 from pydantic import Field, ConfigDict
 from core.constants import ErrorCode
 from core.types import ExceptionResponse
 from core.schemas import ResponseBase
+from core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 
 class SafetyUser(Schema):
@@ -44,6 +46,20 @@ class UserRegisterResponse(ResponseBase):
     data: UserRegisterResponseData
 
 
+class BatchRegisterItemData(ToCamel):
+    # 在请求列表中的下标
+    index: int
+    user_account: str
+    success: bool
+    user_id: Optional[int] = Field(None, alias="id")
+    # 失败原因，成功时为空
+    description: str = ""
+
+
+class BatchRegisterResponse(ResponseBase):
+    data: List[BatchRegisterItemData]
+
+
 class UserLoginRequest(RequestBase):
     user_account: str = Field(..., alias="userAccount")
     user_password: str = Field(..., alias="userPassword")
@@ -58,6 +74,20 @@ class UserLoginResponse(ResponseBase):
     data: Optional[UserLoginResponseData]
 
 
+class MatchUser(SafetyUser):
+    # 与当前用户的标签相似度，范围 (0, 1]
+    score: float
+
+
+class MatchUserData(ToCamel, MatchUser):
+    user_name: str = Field(..., alias="username")
+    user_id: int = Field(..., alias="id")
+
+
+class MatchResponse(ResponseBase):
+    data: List[MatchUserData]
+
+
 class DeleteResponseData(ToCamel):
     response: bool
 
@@ -66,5 +96,64 @@ class DeleteResponse(ResponseBase):
     data: DeleteResponseData
 
 
+class BulkDeleteRequest(RequestBase):
+    user_ids: List[int] = Field(..., alias="ids")
+
+
+class BulkDeleteResponseData(ToCamel):
+    # 实际修改的行数(已是目标状态或不存在的 id 不计入)
+    affected: int
+
+
+class BulkDeleteResponse(ResponseBase):
+    data: BulkDeleteResponseData
+
+
+class UserStatsData(ToCamel):
+    total: int
+    active: int
+    deleted: int
+    # 未删除用户按角色、按状态的人数
+    by_role: Dict[int, int]
+    by_status: Dict[int, int]
+    # 上次按真实 COUNT 校正的时间，为空表示尚未校正
+    reconciled_at: Optional[datetime] = None
+
+
+class UserStatsResponse(ResponseBase):
+    data: UserStatsData
+
+
+class UserSearchQuery(Schema):
+    user_name: Optional[str] = None
+    user_status: Optional[int] = None
+    user_role: Optional[int] = None
+    gender: Optional[int] = None
+    create_time_start: Optional[datetime] = None
+    create_time_end: Optional[datetime] = None
+    # 上一页返回的 next_cursor，为空表示从第一页开始
+    cursor: Optional[str] = None
+    limit: int = Field(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+    # 按用户名相似度排序(只返回最相似的一页)
+    rank: bool = False
+
+
+class TagSearchQuery(Schema):
+    # 必须同时拥有的标签
+    all_tags: List[str] = Field(default_factory=list)
+    # 至少拥有其中一个的标签
+    any_tags: List[str] = Field(default_factory=list)
+    # 不能拥有的标签
+    none_tags: List[str] = Field(default_factory=list)
+    cursor: Optional[str] = None
+    limit: int = Field(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+
+
+class SearchPageData(ToCamel):
+    records: List[UserLoginResponseData]
+    # 为空表示没有下一页
+    next_cursor: Optional[str] = None
+
+
 class SearchResponse(ResponseBase):
-    data: List[UserLoginResponseData]
+    data: SearchPageData
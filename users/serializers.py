@@ -0,0 +1,25 @@
+"""
+列表类接口的预编译序列化函数(见 core.serialization)
+记录来自服务层(SafetyUser / MatchUser)，输出与对应响应模型 model_dump 的结果相同
+"""
+
+from typing import Any, Dict, List
+from core.serialization import compile_serializer
+from .schemas import MatchUser, MatchUserData, SafetyUser, UserLoginResponseData
+
+# /search、/search/tags 不使用别名(by_alias=False)
+search_record = compile_serializer(UserLoginResponseData, source=SafetyUser)
+# /match 使用别名(by_alias=True)
+match_record = compile_serializer(MatchUserData, by_alias=True, source=MatchUser)
+
+
+def search_page(page) -> Dict[str, Any]:
+    """UserPage -> SearchPageData 的字典形式"""
+    return {
+        "records": [search_record(user) for user in page["records"]],
+        "next_cursor": page["next_cursor"],
+    }
+
+
+def match_list(users: List[MatchUser]) -> List[Dict[str, Any]]:
+    return [match_record(user) for user in users]
@@ -6,21 +6,65 @@ from .models import Users as User
 from django.forms.models import model_to_dict
 from django.contrib.auth import logout
 from django.utils import timezone
-from core.config import ProjectConfig
+from core.config import get_config
 from django.http import HttpRequest
-from typing import Optional, Union, TypedDict, List
-from .schemas import SafetyUser
+from typing import Optional, Union, TypedDict, Dict, List, Iterator, Iterable
+from .schemas import SafetyUser, MatchUser, UserRegisterRequest
+from .signals import notify_users_changed
+from .hashers import (
+    acheck_password,
+    amake_password,
+    check_password,
+    make_password,
+    make_passwords,
+)
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from .export import iter_csv, iter_export_rows, iter_ndjson
+from .ngram_index import MAX_CANDIDATES, user_name_index
+from .tag_index import normalize_tag, parse_tags, user_tag_index
+from .matcher import METRICS, tag_matcher
+from .unique_filter import account_filter, planet_code_filter
+from .cache import safety_user_cache
+from .throttle import login_throttle
+from .sharding import user_shards
+from .stats import user_stats
 from core.exception.business_exception import BusinessException
 from core.constants import ErrorCode
+from core.pagination import (
+    DEFAULT_PAGE_SIZE,
+    clamp_limit,
+    decode_cursor,
+    encode_cursor,
+)
+from datetime import datetime
 import re
-import hashlib
 import logging
 import math
+from operator import attrgetter
 
-config = ProjectConfig()  # type: ignore
+config = get_config()
 logger = logging.getLogger("django")
 SALT = config.salt
 USER_LOGIN_STATE = config.user_login_state
+# 批量注册单次最多条数(慢速加密下数秒内完成)、每条 IN 查询/INSERT 的行数
+MAX_BATCH_REGISTER = 100
+BATCH_CHUNK_SIZE = 500
+# 批量逻辑删除/恢复单次最多条数
+MAX_BULK_DELETE = 10000
+
+
+class UserPage(TypedDict):
+    records: List[SafetyUser]
+    next_cursor: Optional[str]
+
+
+class BatchRegisterResult(TypedDict):
+    index: int
+    user_account: str
+    success: bool
+    user_id: Optional[int]
+    description: str
 
 
 class UserServices:
@@ -44,76 +88,252 @@ class UserServices:
             int: 成功返回用户ID，失败返回-1
         """
         # 1. 校验
-        # 1.1 校验符合长度，不为空
-        if not all([user_account, user_password, check_password, planet_code]):
-            raise BusinessException(
-                error_code=ErrorCode.PARAMS_ERROR, description="参数为空"
-            )
+        UserServices._check_register_params(
+            user_account, user_password, check_password, planet_code
+        )
 
-        if len(user_account) < 4:
+        # 1.4 账户不能重复(布隆过滤器判断一定不存在时跳过查询)
+        if (
+            account_filter.might_contain(user_account)
+            and user_shards.for_account(User.objects, user_account)
+            .filter(user_account=user_account)
+            .exists()
+        ):
             raise BusinessException(
-                error_code=ErrorCode.PARAMS_ERROR, description="用户账号过短"
+                error_code=ErrorCode.PARAMS_ERROR, description="重复用户名"
             )
 
-        if len(user_password) < 8 or len(check_password) < 8:
-            raise BusinessException(
-                error_code=ErrorCode.PARAMS_ERROR, description="用户密码过短"
+        # 1.5 星球编号不能重复
+        if planet_code_filter.might_contain(planet_code) and any(
+            queryset.exists()
+            for queryset in user_shards.each(
+                User.objects.filter(planet_code=planet_code)
             )
-
-        if len(planet_code) > 5:
+        ):
             raise BusinessException(
-                error_code=ErrorCode.PARAMS_ERROR, description="星球编号过长"
+                error_code=ErrorCode.PARAMS_ERROR, description="重复星球编号"
             )
 
-        # 1.2 账户不能包含特殊字符
-        valid_pattern = r"[^a-zA-Z0-9]"
-        if re.search(valid_pattern, user_account):
-            raise BusinessException(
-                error_code=ErrorCode.PARAMS_ERROR, description="用户名含特殊字符"
-            )
+        # 2. 加密(在加密池中执行)
+        encrypt_password = make_password(user_password)
 
-        # 1.3 密码和校验密码相同
-        if not user_password == check_password:
-            raise BusinessException(
-                error_code=ErrorCode.PARAMS_ERROR, description="密码和校验密码不一致"
+        # 3. 插入数据，并发注册或其他进程的写入由唯一索引兜底
+        user = UserServices._build_user(
+            user_account, encrypt_password, planet_code, user_status
+        )
+        try:
+            UserServices._create_user(user)
+        except IntegrityError as exc:
+            # 已逻辑删除的账号同样占用唯一索引
+            exists = (
+                user_shards.for_account(User.all_objects, user_account)
+                .filter(user_account=user_account)
+                .exists()
             )
+            raise UserServices._duplicate_error(exists) from exc
+
+        if user.id:
+            return user.id
+        else:
+            return -1
+
+    @staticmethod
+    async def auser_register(
+        user_account: str,
+        user_password: str,
+        check_password: str,
+        planet_code: str,
+        user_status: int = 0,
+    ) -> int:
+        """用户注册服务(异步版本，参数与返回值同 user_register)"""
+        # 1. 校验
+        UserServices._check_register_params(
+            user_account, user_password, check_password, planet_code
+        )
 
-        # 1.4 账户不能重复
-        exists = User.objects.filter(user_account=user_account).exists()
-        if exists:
+        # 1.4 账户不能重复(布隆过滤器判断一定不存在时跳过查询)
+        if (
+            await account_filter.amight_contain(user_account)
+            and await user_shards.for_account(User.objects, user_account)
+            .filter(user_account=user_account)
+            .aexists()
+        ):
             raise BusinessException(
                 error_code=ErrorCode.PARAMS_ERROR, description="重复用户名"
             )
 
         # 1.5 星球编号不能重复
-        exists = User.objects.filter(planet_code=planet_code).exists()
-        if exists:
+        if await planet_code_filter.amight_contain(planet_code) and any(
+            [
+                await queryset.aexists()
+                for queryset in user_shards.each(
+                    User.objects.filter(planet_code=planet_code)
+                )
+            ]
+        ):
             raise BusinessException(
                 error_code=ErrorCode.PARAMS_ERROR, description="重复星球编号"
             )
 
-        # 2. 加密
-        md5 = hashlib.md5()
-        salt_pass = SALT + user_password
-        md5.update(salt_pass.encode("utf-8"))
-        encrypt_password = md5.hexdigest()
+        # 2. 加密(等待加密池，不阻塞事件循环)
+        encrypt_password = await amake_password(user_password)
 
         # 3. 插入数据
-        user = User()
-        user.user_account = user_account
-        user.user_password = encrypt_password
-        user.user_status = user_status or 0
-        user.is_delete = 0
-        user.user_role = 0
-        user.planet_code = planet_code
-        user.create_time = timezone.now()
-        user.update_time = timezone.now()
-        user.save()
+        user = UserServices._build_user(
+            user_account, encrypt_password, planet_code, user_status
+        )
+        try:
+            await sync_to_async(UserServices._create_user)(user)
+        except IntegrityError as exc:
+            exists = (
+                await user_shards.for_account(User.all_objects, user_account)
+                .filter(user_account=user_account)
+                .aexists()
+            )
+            raise UserServices._duplicate_error(exists) from exc
 
-        if user.id:
-            return user.id
-        else:
-            return -1
+        return user.id or -1
+
+    @staticmethod
+    def batch_register(items: List[UserRegisterRequest]) -> List[BatchRegisterResult]:
+        """批量注册
+        与 user_register 的校验规则相同，但：
+            - 参数校验和批次内查重全部在内存完成
+            - 账号、星球编号与数据库的查重各用一条 IN 查询(按 BATCH_CHUNK_SIZE 分块)
+            - 密码加密并行执行
+            - 按 BATCH_CHUNK_SIZE 分块 bulk_create，一块写入失败不影响其他块
+        Args:
+            items: 注册请求列表，最多 MAX_BATCH_REGISTER 条
+        Returns:
+            List[BatchRegisterResult]: 与 items 一一对应的注册结果
+        """
+        if not items:
+            raise BusinessException(
+                error_code=ErrorCode.NULL_ERROR, description="参数为空"
+            )
+        if len(items) > MAX_BATCH_REGISTER:
+            raise BusinessException(
+                error_code=ErrorCode.PARAMS_ERROR,
+                description=f"单次最多注册 {MAX_BATCH_REGISTER} 个用户",
+            )
+
+        results: List[BatchRegisterResult] = [
+            {
+                "index": index,
+                "user_account": item.user_account,
+                "success": False,
+                "user_id": None,
+                "description": "",
+            }
+            for index, item in enumerate(items)
+        ]
+
+        def fail(index: int, description: str) -> None:
+            results[index]["description"] = description
+
+        # 1. 内存校验：参数规则 + 批次内重复
+        pending: List[int] = []
+        accounts, planet_codes = set(), set()
+        for index, item in enumerate(items):
+            try:
+                UserServices._check_register_params(
+                    item.user_account,
+                    item.user_password,
+                    item.check_password,
+                    item.planet_code,
+                )
+            except BusinessException as exc:
+                fail(index, exc.description)
+                continue
+            if item.user_account in accounts:
+                fail(index, "重复用户名")
+                continue
+            if item.planet_code in planet_codes:
+                fail(index, "重复星球编号")
+                continue
+            accounts.add(item.user_account)
+            planet_codes.add(item.planet_code)
+            pending.append(index)
+
+        # 2. 数据库查重：布隆过滤器判断可能存在的值，每个字段再用一条 IN 查询确认
+        existing_accounts = UserServices._existing_values(
+            "user_account", filter(account_filter.might_contain, accounts)
+        )
+        existing_codes = UserServices._existing_values(
+            "planet_code", filter(planet_code_filter.might_contain, planet_codes)
+        )
+        valid: List[int] = []
+        for index in pending:
+            if items[index].user_account in existing_accounts:
+                fail(index, "重复用户名")
+            elif items[index].planet_code in existing_codes:
+                fail(index, "重复星球编号")
+            else:
+                valid.append(index)
+        if not valid:
+            return results
+
+        # 3. 在加密池中并行加密
+        passwords = make_passwords(items[index].user_password for index in valid)
+
+        # 4. 分块批量插入
+        created_ids: List[int] = []
+        for start in range(0, len(valid), BATCH_CHUNK_SIZE):
+            chunk = valid[start : start + BATCH_CHUNK_SIZE]
+            users = [
+                UserServices._build_user(
+                    items[index].user_account,
+                    passwords[start + offset],
+                    items[index].planet_code,
+                    0,
+                )
+                for offset, index in enumerate(chunk)
+            ]
+            try:
+                with user_stats.atomic():
+                    user_shards.bulk_create(users)
+                    user_stats.created(users)
+            except IntegrityError:
+                logger.warning("batch register chunk failed", exc_info=True)
+                for index in chunk:
+                    fail(index, "写入失败")
+                continue
+            for user in users:
+                account_filter.add(user.user_account)
+                planet_code_filter.add(user.planet_code)
+            # MySQL 的 bulk_create 不回填主键，需要按账号查回 id
+            if any(user.id is None for user in users):
+                id_of = dict(
+                    User.objects.filter(
+                        user_account__in=[user.user_account for user in users]
+                    ).values_list("user_account", "id")
+                )
+            else:
+                id_of = {user.user_account: user.id for user in users}
+            for index in chunk:
+                user_id = id_of.get(items[index].user_account)
+                results[index]["success"] = user_id is not None
+                results[index]["user_id"] = user_id
+                created_ids.append(user_id)
+
+        # bulk_create 不触发 post_save，手动更换缓存版本戳并通知进程内索引
+        created_ids = [user_id for user_id in created_ids if user_id]
+        safety_user_cache.bump(created_ids)
+        notify_users_changed(created_ids)
+        return results
+
+    @staticmethod
+    def _existing_values(field: str, values) -> set:
+        """返回 values 中已存在于数据库的值，按 BATCH_CHUNK_SIZE 分块做 IN 查询"""
+        values = list(values)
+        existing = set()
+        for start in range(0, len(values), BATCH_CHUNK_SIZE):
+            chunk = values[start : start + BATCH_CHUNK_SIZE]
+            for queryset in user_shards.each(
+                User.objects.filter(**{f"{field}__in": chunk})
+            ):
+                existing.update(queryset.values_list(field, flat=True))
+        return existing
 
     @staticmethod
     def do_login(
@@ -142,56 +362,81 @@ class UserServices:
             如果登录失败返回None
         """
         # 1. 校验
-        if not all([user_account, user_password]):
-            raise BusinessException(
-                error_code=ErrorCode.PARAMS_ERROR, description="参数为空"
-            )
+        UserServices._check_login_params(user_account, user_password)
+        # 1.1 按账号和 IP 限流，超出时不再访问数据库
+        login_throttle.check(request, user_account)
 
-        if len(user_account) < 4:
+        # 2.校验密码和数据库中的密文对比
+        # 密文带随机盐，只能先按账号查出用户，再在加密池中校验
+        user = (
+            user_shards.for_account(User.objects, user_account)
+            .filter(user_account=user_account)
+            .order_by("id")
+            .first()
+        )
+        valid, needs_update = check_password(
+            user_password, user.user_password if user else None
+        )
+        if not valid:
+            logger.info("user login failed user account can't match with user password")
             raise BusinessException(
-                error_code=ErrorCode.PARAMS_ERROR, description="用户账户过短"
+                error_code=ErrorCode.USER_NOT_EXIST, description="密码输入错误"
             )
+        # 旧算法(加盐 MD5)或旧参数的密文，登录成功后透明升级
+        if needs_update:
+            UserServices._upgrade_password(user, make_password(user_password))
 
-        if len(user_password) < 8:
-            raise BusinessException(
-                error_code=ErrorCode.PARAMS_ERROR, description="用户密码过短"
-            )
+        # 3. 用户数据脱敏
+        safety_user = UserServices.convert_safety_user(user)
 
-        # 账户不能包含特殊字符
-        valid_pattern = r"[^a-zA-Z0-9]"
-        if re.search(valid_pattern, user_account):
-            raise BusinessException(
-                error_code=ErrorCode.PARAMS_ERROR,
-                description="用户名不允许含有特殊字符",
-            )
+        # 4.记录用户登入状态
+        # session 只能保存可 JSON 序列化的数据，is_admin 按字典读取
+        if request != None:
+            request.session[USER_LOGIN_STATE] = safety_user.model_dump()
+
+        return safety_user  # type: SafetyUser
+
+    @staticmethod
+    async def ado_login(
+        request: HttpRequest,
+        user_account: str,
+        user_password: str,
+    ) -> Optional[SafetyUser]:
+        """用户登录服务(异步版本，参数与返回值同 do_login)"""
+        # 1. 校验
+        UserServices._check_login_params(user_account, user_password)
+        await login_throttle.acheck(request, user_account)
 
         # 2.校验密码和数据库中的密文对比
-        # 加密
-        md5 = hashlib.md5()
-        salt_pass = (SALT + user_password).encode("utf8")
-        md5.update(salt_pass)
-        encrypt_password = md5.hexdigest()
-
-        # 检测用户在数据库中存不存在
-        if not User.objects.filter(
-            user_account=user_account, user_password=encrypt_password
-        ).exists():
+        user = (
+            await user_shards.for_account(User.objects, user_account)
+            .filter(user_account=user_account)
+            .order_by("id")
+            .afirst()
+        )
+        valid, needs_update = await acheck_password(
+            user_password, user.user_password if user else None
+        )
+        if not valid:
             logger.info("user login failed user account can't match with user password")
             raise BusinessException(
                 error_code=ErrorCode.USER_NOT_EXIST, description="密码输入错误"
             )
-        user = User.objects.get(
-            user_account=user_account, user_password=encrypt_password
-        )
+        if needs_update:
+            new_password = await amake_password(user_password)
+            await user_shards.for_id(User.objects, user.id).filter(
+                id=user.id, user_password=user.user_password
+            ).aupdate(user_password=new_password, update_time=timezone.now())
+            await safety_user_cache.abump([user.id])
 
         # 3. 用户数据脱敏
         safety_user = UserServices.convert_safety_user(user)
 
         # 4.记录用户登入状态
         if request != None:
-            request.session["USER_LOGIN_STATE"] = safety_user
+            await request.session.aset(USER_LOGIN_STATE, safety_user.model_dump())
 
-        return safety_user  # type: SafetyUser
+        return safety_user
 
     @staticmethod
     def do_logout(request: HttpRequest) -> int:
@@ -211,32 +456,273 @@ class UserServices:
         )
 
     @staticmethod
-    def list(user_name: Optional[str]) -> List[Optional[SafetyUser]]:
+    def list(
+        user_name: Optional[str] = None,
+        *,
+        user_status: Optional[int] = None,
+        user_role: Optional[int] = None,
+        gender: Optional[int] = None,
+        create_time_start: Optional[datetime] = None,
+        create_time_end: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        rank: bool = False,
+    ) -> UserPage:
         """
-        根据用户名模糊查询用户列表
+        根据用户名模糊查询用户列表，按 id 做游标(keyset)分页
         Args:
             user_name: 要查询的用户名(支持模糊匹配)
+            user_status: 按状态过滤(可选)
+            user_role: 按角色过滤(可选)
+            gender: 按性别过滤(可选)
+            create_time_start: 创建时间下界，包含(可选)
+            create_time_end: 创建时间上界，包含(可选)
+            cursor: 上一页返回的 next_cursor，为空表示第一页
+            limit: 每页条数，最大 MAX_PAGE_SIZE
+            rank: 按用户名相似度排序，只返回最相似的一页(不分页)
         Returns:
-            List[SafetyUser]: 脱敏后的用户信息列表，可能为空列表
+            UserPage: records 为脱敏后的用户信息列表(可能为空)，
+                next_cursor 为下一页游标，没有下一页时为 None
         """
-        # 1.检查是否为None或纯空格
-        if not user_name or user_name.isspace():
-            # 1.1. 如果纯空，获取所以用户信息
-            users = User.objects.all()
-        else:
-            # 2. 查询符合条件的
-            users = User.objects.filter(user_name__icontains=user_name)  #
+        limit = clamp_limit(limit)
+        users = UserServices._list_queryset(
+            user_name,
+            user_status=user_status,
+            user_role=user_role,
+            gender=gender,
+            create_time_start=create_time_start,
+            create_time_end=create_time_end,
+            after_id=decode_cursor(cursor),
+        )
+        if rank and user_name:
+            return UserServices._to_ranked_page(
+                user_shards.merged(users, MAX_CANDIDATES, key=attrgetter("id")),
+                user_name,
+                limit,
+            )
+        # 只查 id，多取一条用来判断是否还有下一页；用户数据从缓存读取
+        # 分片时每个分片各取 limit + 1 个 id，归并后取前 limit + 1 个
+        ids = user_shards.merged(users.values_list("id", flat=True), limit + 1)
+        return UserServices._to_page(
+            ids, safety_user_cache.get_many(ids[:limit]), limit
+        )
+
+    @staticmethod
+    async def alist(
+        user_name: Optional[str] = None,
+        *,
+        user_status: Optional[int] = None,
+        user_role: Optional[int] = None,
+        gender: Optional[int] = None,
+        create_time_start: Optional[datetime] = None,
+        create_time_end: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        rank: bool = False,
+    ) -> UserPage:
+        """根据用户名模糊查询用户列表(异步版本，参数与返回值同 list)"""
+        limit = clamp_limit(limit)
+        users = UserServices._list_queryset(
+            user_name,
+            user_status=user_status,
+            user_role=user_role,
+            gender=gender,
+            create_time_start=create_time_start,
+            create_time_end=create_time_end,
+            after_id=decode_cursor(cursor),
+        )
+        if rank and user_name:
+            return UserServices._to_ranked_page(
+                await sync_to_async(user_shards.merged)(
+                    users, MAX_CANDIDATES, key=attrgetter("id")
+                ),
+                user_name,
+                limit,
+            )
+        ids = await sync_to_async(user_shards.merged)(
+            users.values_list("id", flat=True), limit + 1
+        )
+        records = await safety_user_cache.aget_many(ids[:limit])
+        return UserServices._to_page(ids, records, limit)
+
+    @staticmethod
+    def search_by_tags(
+        all_tags: Iterable[str] = (),
+        any_tags: Iterable[str] = (),
+        none_tags: Iterable[str] = (),
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> UserPage:
+        """
+        按标签组合查询用户，由标签位图索引求出 id 后按主键回表，按 id 游标分页
+        Args:
+            all_tags: 必须同时拥有的标签(AND)
+            any_tags: 至少拥有其中一个的标签(OR)
+            none_tags: 不能拥有的标签(NOT)
+            cursor: 上一页返回的 next_cursor，为空表示第一页
+            limit: 每页条数，最大 MAX_PAGE_SIZE
+        Returns:
+            UserPage: 脱敏后的用户列表和下一页游标
+        """
+        limit = clamp_limit(limit)
+        after_id = decode_cursor(cursor)
+        matched = user_tag_index.query(all_tags, any_tags, none_tags)
 
-        # 3. 数据脱敏
-        return [UserServices.convert_safety_user(user) for user in users]
+        # 多取一个 id，用来判断是否还有下一页
+        ids = []
+        for user_id in matched.iter_after(after_id if after_id is not None else -1):
+            ids.append(user_id)
+            if len(ids) > limit:
+                break
+        has_more = len(ids) > limit
+        ids = ids[:limit]
+
+        # 索引只在本进程增量更新，回表后再按数据库中的标签校验一次
+        all_set = {normalize_tag(tag) for tag in all_tags if tag.strip()}
+        any_set = {normalize_tag(tag) for tag in any_tags if tag.strip()}
+        none_set = {normalize_tag(tag) for tag in none_tags if tag.strip()}
+        records = []
+        users = user_shards.fetch(User.objects.all(), ids)
+        for user in sorted(users, key=attrgetter("id")):
+            tags = set(parse_tags(user.tags))
+            if (
+                all_set <= tags
+                and (not any_set or any_set & tags)
+                and not none_set & tags
+            ):
+                records.append(UserServices.convert_safety_user(user))
+
+        next_cursor = encode_cursor(ids[-1]) if has_more else None
+        return {"records": records, "next_cursor": next_cursor}
+
+    @staticmethod
+    def match_users(user_id: int, num: int, metric: str = "jaccard") -> List[MatchUser]:
+        """
+        按标签相似度推荐与指定用户最相似的用户
+        Args:
+            user_id: 当前用户 id
+            num: 返回的用户数量
+            metric: 相似度算法，jaccard 或 cosine
+        Returns:
+            List[MatchUser]: 按相似度降序的脱敏用户列表，不包含自己和没有共同标签的用户
+        """
+        if tag_matcher is None:
+            raise BusinessException(
+                error_code=ErrorCode.SYSTEM_ERROR,
+                description="未安装 numpy，无法匹配用户",
+            )
+        if metric not in METRICS:
+            raise BusinessException(
+                error_code=ErrorCode.PARAMS_ERROR, description="不支持的相似度算法"
+            )
+        # 以数据库中最新的标签为准
+        tags = (
+            user_shards.for_id(User.objects, user_id)
+            .filter(id=user_id)
+            .values_list("tags", flat=True)
+            .first()
+        )
+        if not tags:
+            return []
+
+        ranked = tag_matcher.top_k(tags, num, exclude_user_id=user_id, metric=metric)
+        users = safety_user_cache.get_many(matched_id for matched_id, _ in ranked)
+        # 缓存中的 SafetyUser 已经校验过，直接构造不再重复校验
+        return [
+            MatchUser.model_construct(**dict(users[matched_id]), score=score)
+            for matched_id, score in ranked
+            if matched_id in users
+        ]
+
+    @staticmethod
+    def export(export_format: str, after_id: Optional[int] = None) -> Iterator[str]:
+        """
+        流式导出未删除用户(脱敏字段)，按 id 升序
+        Args:
+            export_format: ndjson 或 csv
+            after_id: 只导出 id 大于该值的用户，中断后传入已收到的最后一个 user_id 续传
+        Returns:
+            Iterator[str]: 逐行输出的文本，供 StreamingHttpResponse 使用
+        """
+        if after_id is not None and after_id < 0:
+            raise BusinessException(
+                error_code=ErrorCode.PARAMS_ERROR, description="after_id 不能为负数"
+            )
+        rows = iter_export_rows(after_id)
+        if export_format == "csv":
+            return iter_csv(rows)
+        if export_format == "ndjson":
+            return iter_ndjson(rows)
+        raise BusinessException(
+            error_code=ErrorCode.PARAMS_ERROR, description="不支持的导出格式"
+        )
 
     @staticmethod
     def delete_user(user_id) -> bool:
         try:
-            return User.objects.get(id=user_id).delete()[0] > 0
+            user = user_shards.for_id(User.objects, user_id).get(id=user_id)
         except User.DoesNotExist:
             logger.warning(f"尝试删除不存在的用户ID: {user_id}")
             return False
+        return UserServices._delete_user(user)
+
+    @staticmethod
+    async def adelete_user(user_id) -> bool:
+        try:
+            user = await user_shards.for_id(User.objects, user_id).aget(id=user_id)
+        except User.DoesNotExist:
+            logger.warning(f"尝试删除不存在的用户ID: {user_id}")
+            return False
+        return await sync_to_async(UserServices._delete_user)(user)
+
+    @staticmethod
+    def bulk_set_deleted(user_ids: Iterable[int], deleted: bool = True) -> int:
+        """批量逻辑删除(deleted=True)或恢复(deleted=False)
+        按 BATCH_CHUNK_SIZE 分块，每块一条 UPDATE ... WHERE id IN (...)，
+        只更新状态确实需要变化的行
+        Args:
+            user_ids: 用户 id 列表，最多 MAX_BULK_DELETE 个
+            deleted: True 为逻辑删除，False 为恢复
+        Returns:
+            int: 实际修改的行数
+        """
+        user_ids = sorted({user_id for user_id in user_ids if user_id > 0})
+        if not user_ids:
+            raise BusinessException(
+                error_code=ErrorCode.NULL_ERROR, description="参数为空"
+            )
+        if len(user_ids) > MAX_BULK_DELETE:
+            raise BusinessException(
+                error_code=ErrorCode.PARAMS_ERROR,
+                description=f"单次最多处理 {MAX_BULK_DELETE} 个用户",
+            )
+
+        old_value, new_value = (0, 1) if deleted else (1, 0)
+        now = timezone.now()
+        affected = 0
+        for start in range(0, len(user_ids), BATCH_CHUNK_SIZE):
+            chunk = user_ids[start : start + BATCH_CHUNK_SIZE]
+            for queryset in user_shards.by_ids(
+                User.all_objects.filter(is_delete=old_value), chunk
+            ):
+                # 锁住要修改的行，按它们的角色和状态调整统计计数(select_for_update 的查询走主库或分片)
+                locked = queryset.select_for_update()
+                with transaction.atomic(using=locked.db):
+                    rows = list(locked.values_list("user_role", "user_status"))
+                    if not rows:
+                        continue
+                    affected += locked.update(is_delete=new_value, update_time=now)
+                    user_stats.deleted_changed(rows, deleted, using=locked.db)
+
+        # update 不触发 post_save，手动更换缓存版本戳并通知进程内索引
+        safety_user_cache.bump(user_ids)
+        notify_users_changed(user_ids)
+        return affected
+
+    @staticmethod
+    def stats() -> Dict:
+        """用户统计(读取维护的计数，不扫描用户表)"""
+        return user_stats.snapshot()
 
     @staticmethod
     def convert_safety_user(user: User) -> Optional[SafetyUser]:
@@ -255,3 +741,183 @@ class UserServices:
             user_role=user.user_role,
             planet_code=user.planet_code or "",
         )
+
+    @staticmethod
+    def _check_register_params(
+        user_account: str,
+        user_password: str,
+        check_password: str,
+        planet_code: str,
+    ) -> None:
+        """注册参数校验(不访问数据库)，不合法时抛出 BusinessException"""
+        # 1.1 校验符合长度，不为空
+        if not all([user_account, user_password, check_password, planet_code]):
+            raise BusinessException(
+                error_code=ErrorCode.PARAMS_ERROR, description="参数为空"
+            )
+
+        if len(user_account) < 4:
+            raise BusinessException(
+                error_code=ErrorCode.PARAMS_ERROR, description="用户账号过短"
+            )
+
+        if len(user_password) < 8 or len(check_password) < 8:
+            raise BusinessException(
+                error_code=ErrorCode.PARAMS_ERROR, description="用户密码过短"
+            )
+
+        if len(planet_code) > 5:
+            raise BusinessException(
+                error_code=ErrorCode.PARAMS_ERROR, description="星球编号过长"
+            )
+
+        # 1.2 账户不能包含特殊字符
+        valid_pattern = r"[^a-zA-Z0-9]"
+        if re.search(valid_pattern, user_account):
+            raise BusinessException(
+                error_code=ErrorCode.PARAMS_ERROR, description="用户名含特殊字符"
+            )
+
+        # 1.3 密码和校验密码相同
+        if not user_password == check_password:
+            raise BusinessException(
+                error_code=ErrorCode.PARAMS_ERROR, description="密码和校验密码不一致"
+            )
+
+    @staticmethod
+    def _duplicate_error(account_exists: bool) -> BusinessException:
+        """插入时违反唯一索引：账号已存在则是重复用户名，否则是重复星球编号"""
+        return BusinessException(
+            error_code=ErrorCode.PARAMS_ERROR,
+            description="重复用户名" if account_exists else "重复星球编号",
+        )
+
+    @staticmethod
+    def _check_login_params(user_account: str, user_password: str) -> None:
+        """登录参数校验(不访问数据库)，不合法时抛出 BusinessException"""
+        if not all([user_account, user_password]):
+            raise BusinessException(
+                error_code=ErrorCode.PARAMS_ERROR, description="参数为空"
+            )
+
+        if len(user_account) < 4:
+            raise BusinessException(
+                error_code=ErrorCode.PARAMS_ERROR, description="用户账户过短"
+            )
+
+        if len(user_password) < 8:
+            raise BusinessException(
+                error_code=ErrorCode.PARAMS_ERROR, description="用户密码过短"
+            )
+
+        # 账户不能包含特殊字符
+        valid_pattern = r"[^a-zA-Z0-9]"
+        if re.search(valid_pattern, user_account):
+            raise BusinessException(
+                error_code=ErrorCode.PARAMS_ERROR,
+                description="用户名不允许含有特殊字符",
+            )
+
+    @staticmethod
+    def _upgrade_password(user: User, encrypt_password: str) -> None:
+        """用新密文替换旧密文；带上旧密文做条件更新，避免覆盖并发修改的密码"""
+        user_shards.for_id(User.objects, user.id).filter(
+            id=user.id, user_password=user.user_password
+        ).update(user_password=encrypt_password, update_time=timezone.now())
+        user.user_password = encrypt_password
+        safety_user_cache.bump([user.id])
+
+    @staticmethod
+    def _create_user(user: User) -> None:
+        """写入新用户并更新统计计数，重复时抛出 IntegrityError"""
+        with user_stats.atomic():
+            user_shards.create(user)
+            user_stats.created([user])
+
+    @staticmethod
+    def _delete_user(user: User) -> bool:
+        """物理删除用户并更新统计计数"""
+        with user_stats.atomic():
+            deleted = user.delete()[0] > 0
+            if deleted:
+                user_stats.removed([user])
+        return deleted
+
+    @staticmethod
+    def _build_user(
+        user_account: str, encrypt_password: str, planet_code: str, user_status: int
+    ) -> User:
+        user = User()
+        user.user_account = user_account
+        user.user_password = encrypt_password
+        user.user_status = user_status or 0
+        user.is_delete = 0
+        user.user_role = 0
+        user.planet_code = planet_code
+        user.create_time = timezone.now()
+        user.update_time = timezone.now()
+        return user
+
+    @staticmethod
+    def _list_queryset(
+        user_name: Optional[str],
+        *,
+        user_status: Optional[int] = None,
+        user_role: Optional[int] = None,
+        gender: Optional[int] = None,
+        create_time_start: Optional[datetime] = None,
+        create_time_end: Optional[datetime] = None,
+        after_id: Optional[int] = None,
+    ):
+        users = User.objects.all()
+        # 1.检查是否为None或纯空格，纯空时不按用户名过滤
+        if user_name and not user_name.isspace():
+            # 2. 查询符合条件的
+            users = users.filter(user_name__icontains=user_name)
+            # 2.1 先用 n-gram 索引求出候选 id，使数据库按主键回表而不是全表扫描
+            candidates = UserServices._user_name_candidates(user_name)
+            if candidates is not None:
+                users = users.filter(id__in=candidates)
+        if user_status is not None:
+            users = users.filter(user_status=user_status)
+        if user_role is not None:
+            users = users.filter(user_role=user_role)
+        if gender is not None:
+            users = users.filter(gender=gender)
+        if create_time_start is not None:
+            users = users.filter(create_time__gte=create_time_start)
+        if create_time_end is not None:
+            users = users.filter(create_time__lte=create_time_end)
+        # 3. keyset 分页：只取上一页最后一个 id 之后的数据，走主键索引
+        if after_id is not None:
+            users = users.filter(id__gt=after_id)
+        return users.order_by("id")
+
+    @staticmethod
+    def _user_name_candidates(user_name: str) -> Optional[List[int]]:
+        """返回 None 表示索引不可用，需要直接用 LIKE 查询"""
+        if not config.user_name_index:
+            return None
+        candidates = user_name_index.search(user_name)
+        if candidates is None or len(candidates) > MAX_CANDIDATES:
+            return None
+        return candidates
+
+    @staticmethod
+    def _to_ranked_page(users: List[User], user_name: str, limit: int) -> UserPage:
+        ranked = user_name_index.rank(user_name, [user.id for user in users])
+        order = {user_id: i for i, (user_id, _) in enumerate(ranked)}
+        users.sort(key=lambda user: order.get(user.id, len(order)))
+        records = [UserServices.convert_safety_user(user) for user in users[:limit]]
+        return {"records": records, "next_cursor": None}
+
+    @staticmethod
+    def _to_page(ids: List[int], users: Dict[int, SafetyUser], limit: int) -> UserPage:
+        """ids 为按 id 升序多取一条的结果，users 为其中前 limit 个的脱敏数据
+        查询 id 之后被删除的用户不在 users 中，直接跳过
+        """
+        has_more = len(ids) > limit
+        ids = ids[:limit]
+        records = [users[user_id] for user_id in ids if user_id in users]
+        next_cursor = encode_cursor(ids[-1]) if has_more else None
+        return {"records": records, "next_cursor": next_cursor}
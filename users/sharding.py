@@ -0,0 +1,225 @@
+"""
+users 表水平分片
+    - settings.USER_SHARDS 列出分片库的别名，用户按账号(小写，与 MySQL 不区分大小写的排序规则一致)
+      的哈希分布到各分片；为空时不分片，下面的方法都直接使用 default 库
+    - id 全局唯一：序号由主库的 id_sequences 表按块分配(每个进程每次领取 user_id_block 个)，
+      id = 序号 << SHARD_BITS | 分片下标，由 id 直接算出所在分片，按 id 排序与分配顺序一致
+    - 星球编号跨分片唯一：写入分片前先在主库的 unique_keys 表登记(唯一索引)，删除用户时释放
+    - 按 id 分页的查询在每个分片各取一页，按 id 归并(scatter-gather)；user_shard_workers > 0 时并发查询
+
+分片库只需要 users 表(与原表结构相同，id 不自增)。已有数据迁移到分片时需要按上面的规则重新分配 id
+"""
+
+import hashlib
+import heapq
+import itertools
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, transaction
+from django.db.models import F, QuerySet
+from django.db.models.signals import post_delete
+from core.config import get_config
+from .models import IdSequence, UniqueKey, Users as User
+
+config = get_config()
+
+# id 的低位存分片下标，最多 256 个分片
+SHARD_BITS = 8
+SHARD_MASK = (1 << SHARD_BITS) - 1
+PLANET_CODE = "planet_code"
+
+
+class IdAllocator:
+    """按块从 id_sequences 表领取序号；块在提交后才使用，不能在主库的事务中领取"""
+
+    def __init__(self, name: str, block_size: int):
+        self.name = name
+        self.block_size = max(1, block_size)
+        self._lock = threading.Lock()
+        self._next = self._end = 0
+
+    def next(self) -> int:
+        with self._lock:
+            if self._next >= self._end:
+                self._next, self._end = self._take_block()
+            value = self._next
+            self._next += 1
+            return value
+
+    def _take_block(self) -> Tuple[int, int]:
+        sequences = IdSequence.objects.using(DEFAULT_DB_ALIAS).filter(name=self.name)
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            # UPDATE 先锁住这一行，并发领取的进程得到不重叠的块
+            if not sequences.update(next_value=F("next_value") + self.block_size):
+                IdSequence.objects.using(DEFAULT_DB_ALIAS).get_or_create(
+                    name=self.name, defaults={"next_value": 1}
+                )
+                sequences.update(next_value=F("next_value") + self.block_size)
+            end = sequences.values_list("next_value", flat=True).get()
+        return end - self.block_size, end
+
+
+class UserShards:
+    def __init__(self, aliases: Iterable[str], block_size: int, workers: int):
+        self.aliases = list(aliases)
+        if len(self.aliases) > SHARD_MASK + 1:
+            raise ValueError(f"最多支持 {SHARD_MASK + 1} 个分片")
+        self.ids = IdAllocator("users", block_size)
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.aliases)
+
+    def shard_index(self, user_account: str) -> int:
+        digest = hashlib.blake2b(user_account.lower().encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big") % len(self.aliases)
+
+    def alias_for_id(self, user_id: int) -> Optional[str]:
+        index = user_id & SHARD_MASK
+        return self.aliases[index] if index < len(self.aliases) else None
+
+    # 查询路由：未分片时原样返回，queryset 可以是 User.objects / User.all_objects 或其上的查询
+    def for_account(self, queryset, user_account: str) -> QuerySet:
+        queryset = queryset.all()
+        if not self.aliases:
+            return queryset
+        return queryset.using(self.aliases[self.shard_index(user_account)])
+
+    def for_id(self, queryset, user_id: int) -> QuerySet:
+        queryset = queryset.all()
+        if not self.aliases:
+            return queryset
+        alias = self.alias_for_id(user_id)
+        return queryset.using(alias) if alias else queryset.none()
+
+    def each(self, queryset) -> List[QuerySet]:
+        """每个分片一个 queryset"""
+        queryset = queryset.all()
+        if not self.aliases:
+            return [queryset]
+        return [queryset.using(alias) for alias in self.aliases]
+
+    def by_ids(self, queryset, ids: Iterable[int]) -> List[QuerySet]:
+        """按所在分片分组的 id__in 查询"""
+        ids = list(ids)
+        if not self.aliases:
+            return [queryset.filter(id__in=ids)]
+        groups = defaultdict(list)
+        for user_id in ids:
+            alias = self.alias_for_id(user_id)
+            if alias is not None:
+                groups[alias].append(user_id)
+        return [
+            queryset.using(alias).filter(id__in=group)
+            for alias, group in groups.items()
+        ]
+
+    # scatter-gather
+    def gather(self, querysets: Iterable[Any], evaluate: Callable = list) -> List:
+        """对每个 queryset 执行 evaluate，按传入顺序返回结果"""
+        querysets = list(querysets)
+        if len(querysets) <= 1 or self.workers <= 0:
+            return [evaluate(queryset) for queryset in querysets]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers, "user-shard")
+
+        def run(queryset):
+            try:
+                return evaluate(queryset)
+            finally:
+                # 工作线程的连接不会在请求结束时关闭(或归还连接池)
+                connections[queryset.db].close()
+
+        return list(self._executor.map(run, querysets))
+
+    def fetch(self, queryset, ids: Iterable[int]) -> List:
+        """按 id 从各分片取回行，顺序不定"""
+        return list(
+            itertools.chain.from_iterable(self.gather(self.by_ids(queryset, ids)))
+        )
+
+    def merged(self, queryset, limit: int, key: Optional[Callable] = None) -> List:
+        """queryset 按 id 升序：每个分片取前 limit 条，按 key(默认为值本身)归并后取前 limit 条"""
+        parts = self.gather(part[:limit] for part in self.each(queryset))
+        if len(parts) == 1:
+            return parts[0]
+        return list(itertools.islice(heapq.merge(*parts, key=key), limit))
+
+    def iterate(self, queryset, chunk_size: int = 5000) -> Iterator:
+        """依次遍历各分片的全部行(用于全量构建进程内索引)"""
+        return itertools.chain.from_iterable(
+            part.iterator(chunk_size=chunk_size) for part in self.each(queryset)
+        )
+
+    # 写入
+    def create(self, user: User) -> None:
+        """分配 id、登记星球编号后写入账号所在的分片(触发 post_save)；重复时抛出 IntegrityError"""
+        if not self.aliases:
+            with transaction.atomic():
+                user.save()
+            return
+        alias = self._assign([user])[0][0]
+        try:
+            with transaction.atomic(using=alias):
+                user.save(using=alias, force_insert=True)
+        except IntegrityError:
+            self.release([user.id])
+            raise
+
+    def bulk_create(self, users: List[User]) -> None:
+        """全部写入或全部不写入；写入分片失败时删除已写入的行并释放登记的星球编号"""
+        if not self.aliases:
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+            return
+        written: List[Tuple[str, List[int]]] = []
+        try:
+            for alias, group in self._assign(users):
+                with transaction.atomic(using=alias):
+                    User.objects.using(alias).bulk_create(group)
+                written.append((alias, [user.id for user in group]))
+        except IntegrityError:
+            for alias, ids in written:
+                User.all_objects.using(alias).filter(id__in=ids).delete()
+            self.release([user.id for user in users])
+            raise
+
+    def _assign(self, users: List[User]) -> List[Tuple[str, List[User]]]:
+        """分配 id 并在主库登记星球编号，返回按分片分组的用户"""
+        groups = defaultdict(list)
+        for user in users:
+            index = self.shard_index(user.user_account)
+            user.id = self.ids.next() << SHARD_BITS | index
+            groups[self.aliases[index]].append(user)
+        keys = [
+            UniqueKey(key_type=PLANET_CODE, key_value=user.planet_code, user_id=user.id)
+            for user in users
+            if user.planet_code
+        ]
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            UniqueKey.objects.using(DEFAULT_DB_ALIAS).bulk_create(keys)
+        return list(groups.items())
+
+    @staticmethod
+    def release(user_ids: Iterable[int]) -> None:
+        UniqueKey.objects.using(DEFAULT_DB_ALIAS).filter(
+            user_id__in=list(user_ids)
+        ).delete()
+
+    def on_deleted(self, sender, instance: User, using=None, **kwargs) -> None:
+        # 物理删除后星球编号可以再次使用
+        if using in self.aliases:
+            self.release([instance.id])
+
+
+user_shards = UserShards(
+    getattr(settings, "USER_SHARDS", ()),
+    config.user_id_block,
+    config.user_shard_workers,
+)
+post_delete.connect(user_shards.on_deleted, sender=User, dispatch_uid="user_shards")
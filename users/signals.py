@@ -0,0 +1,57 @@
+"""
+用户数据变更通知
+各个进程内索引通过 users_changed 信号保持与数据库同步
+"""
+
+from typing import Iterable, List
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+from core.sessions import invalidate_user_sessions
+from .models import Users as User
+from .sharding import user_shards
+
+# 参数: users - 变更后仍有效(未删除)的用户对象列表
+#       removed_ids - 已删除(含逻辑删除)的用户 id 列表
+users_changed = Signal()
+
+
+def notify_users_changed(user_ids: Iterable[int]) -> None:
+    """批量写入(update / bulk_create)不会触发 post_save，需要手动通知
+    事务提交后重新读取这些用户并广播
+    """
+    user_ids = list(user_ids)
+    if not user_ids or not users_changed.has_listeners(User):
+        return
+
+    def send():
+        users = user_shards.fetch(User.all_objects.all(), user_ids)
+        found = {user.id for user in users}
+        _send(users, [user_id for user_id in user_ids if user_id not in found])
+
+    transaction.on_commit(send)
+
+
+def _send(users: List[User], removed_ids: List[int]) -> None:
+    alive = [user for user in users if user.is_delete == 0]
+    removed_ids = removed_ids + [user.id for user in users if user.is_delete != 0]
+    users_changed.send(sender=User, users=alive, removed_ids=removed_ids)
+
+
+@receiver(post_save, sender=User)
+def _on_user_saved(sender, instance: User, using=None, **kwargs) -> None:
+    # 事务回滚时不应修改索引，所以等(写入的库，分片时是用户所在分片)提交后再广播
+    transaction.on_commit(lambda: _send([instance], []), using=using)
+
+
+@receiver(post_delete, sender=User)
+def _on_user_deleted(sender, instance: User, using=None, **kwargs) -> None:
+    user_id = instance.id
+    transaction.on_commit(lambda: _send([], [user_id]), using=using)
+
+
+@receiver(users_changed)
+def _invalidate_sessions(sender, removed_ids=(), **kwargs) -> None:
+    # 用户被删除后，不再从缓存中读取其登录态
+    for user_id in removed_ids:
+        invalidate_user_sessions(user_id)
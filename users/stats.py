@@ -0,0 +1,229 @@
+"""
+用户统计计数
+    - user_stats 表维护用户总数、未删除数、已删除数，以及未删除用户按角色、按状态的人数；
+      读取只涉及 (计数个数 × user_stats_slots) 行，耗时与用户数无关
+    - UserServices 在注册、删除、逻辑删除/恢复时写入增量(UPDATE value = value + delta)：
+      不分片时与用户表的写入在同一个事务中提交；分片时在用户所在分片提交后写入主库
+    - 每个计数分成 user_stats_slots 个槽位，每次写入随机选一个，并发注册不会都等同一行的锁
+    - 其他途径的写入(Django admin、直接改库)以及分片提交后写计数失败会造成偏差，由 reconcile()
+      按真实的 COUNT 校正：reconcile_user_stats 命令，或读取时发现距上次校正超过
+      user_stats_reconcile_interval 秒，在后台线程中执行
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count, F, Sum
+from core.config import get_config
+from .models import UserStat, Users as User
+from .sharding import user_shards
+
+config = get_config()
+logger = logging.getLogger("django")
+
+TOTAL = "total"
+ACTIVE = "active"
+DELETED = "deleted"
+ROLE_PREFIX = "role:"
+STATUS_PREFIX = "status:"
+# 上次校正的时间(unix 秒)，同时用作校正的互斥锁，不是计数
+RECONCILED_AT = "reconciled_at"
+
+
+def count_keys(user_role: int, user_status: int, is_delete: int) -> List[str]:
+    """一个用户计入的计数"""
+    if is_delete:
+        return [TOTAL, DELETED]
+    return [TOTAL, ACTIVE, f"{ROLE_PREFIX}{user_role}", f"{STATUS_PREFIX}{user_status}"]
+
+
+class UserStats:
+    def __init__(self, slots: int, reconcile_interval: float):
+        self.slots = max(1, slots)
+        self.reconcile_interval = reconcile_interval
+        self._lock = threading.Lock()
+        self._reconciling = False
+
+    @staticmethod
+    def atomic():
+        """不分片时开启主库事务，使计数与用户表的写入一起提交；分片时各分片自行提交"""
+        return nullcontext() if user_shards.enabled else transaction.atomic()
+
+    # 增量
+    def created(self, users: Iterable[User]) -> None:
+        self._record(users, 1)
+
+    def removed(self, users: Iterable[User]) -> None:
+        """物理删除"""
+        self._record(users, -1)
+
+    def deleted_changed(
+        self, rows: Iterable[Tuple[int, int]], deleted: bool, using: str
+    ) -> None:
+        """逻辑删除(deleted=True)或恢复了这些 (user_role, user_status) 的用户"""
+        deltas = Counter()
+        for user_role, user_status in rows:
+            for key in count_keys(user_role, user_status, deleted):
+                deltas[key] += 1
+            for key in count_keys(user_role, user_status, not deleted):
+                deltas[key] -= 1
+        self.add(deltas, using)
+
+    def purged(self, count: int, using: str) -> None:
+        """物理删除了 count 个已逻辑删除的用户"""
+        self.add({TOTAL: -count, DELETED: -count}, using)
+
+    def _record(self, users: Iterable[User], sign: int) -> None:
+        by_db: Dict[str, Counter] = defaultdict(Counter)
+        for user in users:
+            deltas = by_db[user._state.db or DEFAULT_DB_ALIAS]
+            for key in count_keys(user.user_role, user.user_status, user.is_delete):
+                deltas[key] += sign
+        for using, deltas in by_db.items():
+            self.add(deltas, using)
+
+    def add(self, deltas: Mapping[str, int], using: str = DEFAULT_DB_ALIAS) -> None:
+        """using 是用户表写入的库：主库时在调用方的事务中写入，分片时在该分片的事务提交后写入"""
+        deltas = {name: delta for name, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        if using == DEFAULT_DB_ALIAS:
+            self._apply(deltas)
+        else:
+            # 此时用户已写入分片，计数写入失败只记录日志，由校正兜底
+            transaction.on_commit(
+                partial(self._apply, deltas), using=using, robust=True
+            )
+
+    def _apply(self, deltas: Mapping[str, int]) -> None:
+        slot = random.randrange(self.slots)
+        stats = UserStat.objects.using(DEFAULT_DB_ALIAS)
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            # 按名称顺序加锁，并发的事务不会互相等待成环
+            for name in sorted(deltas):
+                row = stats.filter(name=name, slot=slot)
+                if not row.update(value=F("value") + deltas[name]):
+                    _, created = stats.get_or_create(
+                        name=name, slot=slot, defaults={"value": deltas[name]}
+                    )
+                    if not created:
+                        row.update(value=F("value") + deltas[name])
+
+    # 读取
+    def snapshot(self) -> Dict[str, Any]:
+        values = dict(
+            UserStat.objects.values_list("name").annotate(Sum("value")).order_by()
+        )
+        reconciled_at = values.pop(RECONCILED_AT, None)
+        self._maybe_reconcile(reconciled_at)
+        return {
+            "total": values.get(TOTAL, 0),
+            "active": values.get(ACTIVE, 0),
+            "deleted": values.get(DELETED, 0),
+            "by_role": _group(values, ROLE_PREFIX),
+            "by_status": _group(values, STATUS_PREFIX),
+            "reconciled_at": (
+                datetime.fromtimestamp(reconciled_at, timezone.utc)
+                if reconciled_at
+                else None
+            ),
+        }
+
+    # 校正
+    @staticmethod
+    def count() -> Counter:
+        """按真实的 COUNT 统计(按删除标记、角色、状态分组，各分片求和)"""
+        actual = Counter()
+        grouped = User.all_objects.values_list(
+            "is_delete", "user_role", "user_status"
+        ).annotate(Count("id"))
+        for rows in user_shards.gather(user_shards.each(grouped.order_by())):
+            for is_delete, user_role, user_status, count in rows:
+                for key in count_keys(user_role, user_status, is_delete):
+                    actual[key] += count
+        return actual
+
+    def reconcile(self, max_age: Optional[float] = None) -> Optional[Dict[str, int]]:
+        """把计数校正为真实值，返回偏差(真实值 - 计数值，只含不为 0 的项)；
+        max_age 不为空且距上次校正不到 max_age 秒时不校正，返回 None
+        """
+        stats = UserStat.objects.using(DEFAULT_DB_ALIAS)
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            # 先用锁定读排队：同一时刻只有一个校正
+            marker = list(
+                stats.select_for_update()
+                .filter(name=RECONCILED_AT)
+                .values_list("value", flat=True)
+            )
+            if not marker:
+                stats.create(name=RECONCILED_AT, slot=0, value=0)
+            elif max_age is not None and time.time() - max(marker) < max_age:
+                return None
+            # 锁住全部计数行再 COUNT(不依赖 REPEATABLE READ，Django 在 MySQL 上默认 READ COMMITTED)：
+            # 不分片时用户表的写入与计数在同一事务中，已更新计数的事务提交后才能拿到锁，
+            # 尚未更新计数的事务要等校正提交，其未提交的用户行也不会被 COUNT 读到，增量不会被重复计入；
+            # 与 _apply 相同按名称顺序加锁。首次写入某个名称、槽位时新建的行不在锁内，只发生一次，由下次校正修正
+            counted = Counter()
+            for name, value in (
+                stats.select_for_update()
+                .exclude(name=RECONCILED_AT)
+                .order_by("name", "slot")
+                .values_list("name", "value")
+            ):
+                counted[name] += value
+            actual = self.count()
+            drift = {
+                name: actual.get(name, 0) - counted.get(name, 0)
+                for name in actual.keys() | counted.keys()
+            }
+            drift = {name: delta for name, delta in drift.items() if delta}
+            if drift:
+                # 以增量写入，与并发写入的增量互不覆盖
+                self._apply(drift)
+            stats.filter(name=RECONCILED_AT).update(value=int(time.time()))
+        if drift:
+            logger.warning(f"user stats drift corrected: {drift}")
+        return drift
+
+    def _maybe_reconcile(self, reconciled_at: Optional[int]) -> None:
+        if self.reconcile_interval <= 0 or (
+            reconciled_at and time.time() - reconciled_at < self.reconcile_interval
+        ):
+            return
+        with self._lock:
+            if self._reconciling:
+                return
+            self._reconciling = True
+        threading.Thread(
+            target=self._reconcile_in_background, name="user-stats", daemon=True
+        ).start()
+
+    def _reconcile_in_background(self) -> None:
+        try:
+            self.reconcile(max_age=self.reconcile_interval)
+        except Exception:
+            logger.exception("user stats reconcile failed")
+        finally:
+            # 本线程的连接不会在请求结束时关闭(或归还连接池)
+            connections.close_all()
+            with self._lock:
+                self._reconciling = False
+
+
+def _group(values: Mapping[str, int], prefix: str) -> Dict[int, int]:
+    groups = {
+        int(name[len(prefix) :]): value
+        for name, value in values.items()
+        if name.startswith(prefix) and value
+    }
+    return dict(sorted(groups.items()))
+
+
+user_stats = UserStats(config.user_stats_slots, config.user_stats_reconcile_interval)
@@ -0,0 +1,155 @@
+"""
+标签 -> 用户 id 的位图倒排索引
+Users.tags 是自由格式的字符串，用 LIKE 无法高效回答"同时有 X、Y 且没有 Z"的查询；
+这里为每个标签维护一个压缩位图，AND/OR/NOT 查询变成位图的 &、|、- 运算
+"""
+
+import json
+import logging
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+from core.bitmap import RoaringBitmap
+from core.db_router import use_primary
+from .models import Users as User
+from .index_sync import SyncedIndex
+from .sharding import user_shards
+from .signals import users_changed
+
+logger = logging.getLogger("django")
+
+_SPLIT_PATTERN = re.compile(r"[,，;；\s]+")
+
+
+def normalize_tag(tag: str) -> str:
+    return tag.strip().casefold()
+
+
+def parse_tags(raw: Optional[str]) -> Tuple[str, ...]:
+    """解析 Users.tags，兼容 JSON 数组(如 ["java","男"])和逗号/空白分隔两种写法"""
+    if not raw:
+        return ()
+    tags: Iterable = ()
+    try:
+        value = json.loads(raw)
+        if isinstance(value, list):
+            tags = (str(tag) for tag in value)
+        elif isinstance(value, str):
+            tags = _SPLIT_PATTERN.split(value)
+    except ValueError:
+        tags = _SPLIT_PATTERN.split(raw)
+    normalized = (normalize_tag(tag) for tag in tags)
+    return tuple(sorted({tag for tag in normalized if tag}))
+
+
+class TagBitmapIndex(SyncedIndex):
+    """线程安全的进程内标签位图索引，首次查询时从数据库构建
+    与数据库的同步见 users/index_sync.py
+    """
+
+    field = "tags"
+
+    def __init__(self):
+        super().__init__()
+        self._bitmaps: Dict[str, RoaringBitmap] = {}
+        self._all = RoaringBitmap()
+        self._user_tags: Dict[int, Tuple[str, ...]] = {}
+
+    @use_primary()
+    def build(self) -> None:
+        """从 users 表全量构建索引"""
+        postings: Dict[str, List[int]] = {}
+        user_tags: Dict[int, Tuple[str, ...]] = {}
+        rows = user_shards.iterate(User.objects.values_list("id", "tags"))
+        for user_id, raw in rows:
+            tags = parse_tags(raw)
+            user_tags[user_id] = tags
+            for tag in tags:
+                postings.setdefault(tag, []).append(user_id)
+        bitmaps = {tag: RoaringBitmap(ids) for tag, ids in postings.items()}
+        with self._lock:
+            self._bitmaps = bitmaps
+            self._all = RoaringBitmap(user_tags.keys())
+            self._user_tags = user_tags
+            self._built = True
+        logger.info(
+            f"tag bitmap index built: {len(user_tags)} users, {len(bitmaps)} tags"
+        )
+
+    def invalidate(self) -> None:
+        """丢弃索引，下次查询时重新构建"""
+        with self._lock:
+            self._bitmaps, self._all, self._user_tags = {}, RoaringBitmap(), {}
+            self._built = False
+
+    def upsert(self, user_id: int, raw_tags: Optional[str]) -> None:
+        tags = parse_tags(raw_tags)
+        with self._lock:
+            self._remove(user_id)
+            self._user_tags[user_id] = tags
+            self._all.add(user_id)
+            for tag in tags:
+                bitmap = self._bitmaps.get(tag)
+                if bitmap is None:
+                    bitmap = self._bitmaps[tag] = RoaringBitmap()
+                bitmap.add(user_id)
+
+    def remove(self, user_id: int) -> None:
+        with self._lock:
+            self._remove(user_id)
+
+    def _remove(self, user_id: int) -> None:
+        tags = self._user_tags.pop(user_id, None)
+        if tags is None:
+            return
+        self._all.discard(user_id)
+        for tag in tags:
+            bitmap = self._bitmaps.get(tag)
+            if bitmap is not None:
+                bitmap.discard(user_id)
+                if not bitmap:
+                    del self._bitmaps[tag]
+
+    def query(
+        self,
+        all_tags: Iterable[str] = (),
+        any_tags: Iterable[str] = (),
+        none_tags: Iterable[str] = (),
+    ) -> RoaringBitmap:
+        """返回满足条件的用户 id 位图(新对象，可在锁外安全遍历)
+        Args:
+            all_tags: 必须同时拥有的标签(AND)
+            any_tags: 至少拥有其中一个的标签(OR)
+            none_tags: 不能拥有的标签(NOT)
+            all_tags、any_tags 都为空时从全部用户开始筛选
+        """
+        all_tags = {normalize_tag(tag) for tag in all_tags if tag.strip()}
+        any_tags = {normalize_tag(tag) for tag in any_tags if tag.strip()}
+        none_tags = {normalize_tag(tag) for tag in none_tags if tag.strip()}
+        self.ensure_built()
+        empty = RoaringBitmap()
+        with self._lock:
+            # 从最小的位图开始求交集，中间结果尽快变小
+            required = sorted(
+                (self._bitmaps.get(tag, empty) for tag in all_tags), key=len
+            )
+            result = required[0].copy() if required else None
+            for bitmap in required[1:]:
+                if not result:
+                    break
+                result = result & bitmap
+            if any_tags:
+                union = RoaringBitmap()
+                for tag in any_tags:
+                    union = union | self._bitmaps.get(tag, empty)
+                result = union if result is None else result & union
+            if result is None:
+                result = self._all.copy()
+            for tag in none_tags:
+                if not result:
+                    break
+                result = result - self._bitmaps.get(tag, empty)
+            return result
+
+
+user_tag_index = TagBitmapIndex()
+users_changed.connect(user_tag_index.on_users_changed, dispatch_uid="user_tag_index")
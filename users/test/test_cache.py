@@ -0,0 +1,60 @@
+import pytest
+from users.cache import CacheBackend, LocalMemoryBackend, SafetyUserCache
+from users.models import Users as User
+
+
+def _create_user(account: str) -> User:
+    return User.objects.create(
+        user_account=account,
+        user_name=account,
+        user_password="pwd",
+        user_status=0,
+        is_delete=0,
+        user_role=0,
+    )
+
+
+@pytest.mark.django_db(transaction=False)
+def test_get_many_reads_through(django_assert_num_queries):
+    cache = SafetyUserCache(LocalMemoryBackend(100, 60))
+    first, second = _create_user("cacheone"), _create_user("cachetwo")
+
+    # 未命中的 id 只发一条 IN 查询，不存在的 id 不在结果中
+    with django_assert_num_queries(1):
+        users = cache.get_many([first.id, second.id, 10**9])
+    assert sorted(users) == [first.id, second.id]
+    assert users[first.id].user_account == "cacheone"
+
+    with django_assert_num_queries(0):
+        assert cache.get(second.id).user_account == "cachetwo"
+
+    # 更换版本戳后重新读取数据库
+    User.objects.filter(id=first.id).update(user_name="renamed")
+    cache.bump([first.id])
+    with django_assert_num_queries(1):
+        assert cache.get(first.id).user_name == "renamed"
+
+
+@pytest.mark.django_db(transaction=False)
+def test_stale_write_back_is_ignored():
+    cache = SafetyUserCache(LocalMemoryBackend(100, 60))
+    user = _create_user("cacherace")
+
+    # 读取方先取得版本戳，随后写操作更换版本戳，读取方再写回旧数据
+    hits, versions = cache._lookup([user.id])
+    stale = cache._convert([user])
+    User.objects.filter(id=user.id).update(user_name="fresh")
+    cache.bump([user.id])
+    cache._store(stale, versions)
+
+    assert cache.get(user.id).user_name == "fresh"
+
+
+def test_cache_backend_must_implement_interface():
+    class Incomplete(CacheBackend):
+        def get_many(self, keys):
+            return {}
+
+    # 缺少方法时在实例化时失败，而不是在第一次未命中时
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import pytest
+from core.exception.business_exception import BusinessException
+from users import hashers
+from users.hashers import (
+    HashingPool,
+    PasswordHasher,
+    PBKDF2Hasher,
+    SaltedMD5Hasher,
+    ScryptHasher,
+    acheck_password,
+    check_password,
+    identify_hasher,
+)
+
+
+@pytest.mark.parametrize(
+    "hasher",
+    [PBKDF2Hasher(1000), ScryptHasher(1024, 8, 1), SaltedMD5Hasher("salt")],
+)
+def test_hasher_round_trip(hasher):
+    encoded = hasher.encode("password123")
+    assert hasher.verify("password123", encoded)
+    assert not hasher.verify("password124", encoded)
+    assert identify_hasher(encoded).algorithm == hasher.algorithm
+
+
+def test_hasher_must_update():
+    encoded = PBKDF2Hasher(1000).encode("password123")
+    assert not PBKDF2Hasher(1000).must_update(encoded)
+    assert PBKDF2Hasher(2000).must_update(encoded)
+    # 旧参数的密文仍然可以校验
+    assert PBKDF2Hasher(2000).verify("password123", encoded)
+
+
+def test_hashing_pool_bounded():
+    pool = HashingPool("thread", workers=1, max_pending=1)
+    assert pool.run(PBKDF2Hasher(1000).encode, "password123").startswith("pbkdf2")
+    assert asyncio.run(pool.arun(len, "abc")) == 3
+    assert pool.map(len, ["a", "bb", "ccc"]) == [1, 2, 3]
+
+    # 排队任务达到上限时直接拒绝
+    pool._pending = pool.max_pending
+    with pytest.raises(BusinessException) as exc:
+        pool.run(len, "abc")
+    assert exc.value.description == "系统繁忙，请稍后重试"
+
+
+def test_unknown_account_still_hashes(monkeypatch):
+    calls = []
+
+    def verify(hasher, password, encoded):
+        calls.append((hasher.algorithm, encoded))
+        return hasher.verify(password, encoded)
+
+    monkeypatch.setattr(hashers, "_verify", verify)
+    # 账号不存在时用当前算法校验一个固定密文，耗时与账号存在时相同
+    assert check_password("password123", None) == (False, False)
+    assert asyncio.run(acheck_password("password123", "")) == (False, False)
+    current = hashers.get_hasher(hashers.config.password_hasher)
+    assert [algorithm for algorithm, _ in calls] == [current.algorithm] * 2
+    assert calls[0][1] == calls[1][1]
+    assert identify_hasher(calls[0][1]) is current
+
+
+def test_batch_hashing_leaves_login_workers(monkeypatch):
+    started, release = threading.Event(), threading.Event()
+
+    def slow_encode(hasher, password):
+        started.set()
+        release.wait(10)
+        return password
+
+    monkeypatch.setattr(hashers, "_encode", slow_encode)
+    batch = threading.Thread(
+        target=hashers.make_passwords, args=(["password123"] * 20,)
+    )
+    batch.start()
+    try:
+        assert started.wait(5)
+        # 批量加密占满批量池时，登录校验仍然立即拿到工作线程
+        hasher = PBKDF2Hasher(1000)
+        future = hashers.hashing_pool.submit(
+            hashers._verify, hasher, "password123", hasher.encode("password123")
+        )
+        assert future.result(timeout=5)
+        assert batch.is_alive()
+    finally:
+        release.set()
+        batch.join()
+
+
+def test_password_hasher_must_implement_interface():
+    class Incomplete(PasswordHasher):
+        algorithm = "incomplete"
+
+        def encode(self, password):
+            return password
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,37 @@
+import io
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from users.management.commands.index_advisor import suggest_columns
+from users.models import Users as User
+from users.test.test_sharding import sqlite_shards  # noqa: F401
+
+
+def test_suggest_columns():
+    sql = (
+        'SELECT "users"."id" FROM "users" WHERE ("users"."is_delete" = %s '
+        'AND "users"."user_role" = %s AND "users"."create_time" >= %s '
+        'AND "users"."user_name" LIKE %s) ORDER BY "users"."id" ASC LIMIT 21'
+    )
+    assert suggest_columns(sql, "users") == ("is_delete", "user_role", "create_time")
+    # 只有低基数列和主键时不建议索引
+    sql = 'SELECT * FROM "users" WHERE "users"."is_delete" = %s ORDER BY "users"."id"'
+    assert suggest_columns(sql, "users") is None
+
+
+@pytest.mark.django_db(transaction=False)
+def test_index_advisor_command():
+    out = io.StringIO()
+    call_command("index_advisor", stdout=out)
+    report = out.getvalue()
+    assert "全表扫描" in report
+    assert "-- register" in report
+    assert '"users" ("is_delete", "user_account")' in report
+    assert '"users" ("is_delete", "update_time")' in report
+
+
+def test_index_advisor_refuses_sharded(sqlite_shards):
+    with pytest.raises(CommandError):
+        call_command("index_advisor", stdout=io.StringIO())
+    # 分片中的写入无法回滚，不执行任何场景
+    assert not any(User.all_objects.using(alias).exists() for alias in sqlite_shards)
@@ -0,0 +1,50 @@
+import pytest
+from users.matcher import TagMatcher, np
+from users.models import Users as User
+from users.service import UserServices
+
+pytestmark = pytest.mark.skipif(np is None, reason="numpy 未安装")
+
+
+def test_tag_matcher_top_k():
+    matcher = TagMatcher()
+    matcher._built = True  # 不从数据库构建
+    matcher.upsert(1, '["java","python","男"]')
+    matcher.upsert(2, '["java","python"]')
+    matcher.upsert(3, '["java"]')
+    matcher.upsert(4, '["go"]')
+
+    # jaccard: 2 -> 2/3, 3 -> 1/3，4 没有共同标签
+    ranked = matcher.top_k('["java","python","男"]', 10, exclude_user_id=1)
+    assert [user_id for user_id, _ in ranked] == [2, 3]
+    assert ranked[0][1] == pytest.approx(2 / 3)
+
+    ranked = matcher.top_k('["java"]', 2, metric="cosine")
+    assert [user_id for user_id, _ in ranked] == [3, 2]
+
+    # 更新后旧行失效
+    matcher.upsert(3, '["go"]')
+    matcher.remove(2)
+    assert [user_id for user_id, _ in matcher.top_k('["java"]', 10)] == [1]
+
+
+@pytest.mark.django_db(transaction=False)
+def test_match_users():
+    ids = [
+        User.objects.create(
+            user_account=f"match{i}",
+            user_password="pwd",
+            user_status=0,
+            is_delete=0,
+            user_role=0,
+            tags=tags,
+        ).id
+        for i, tags in enumerate(['["篮球","java"]', '["篮球","java"]', '["篮球"]'])
+    ]
+    from users.matcher import tag_matcher
+
+    tag_matcher.invalidate()
+    users = UserServices.match_users(ids[0], 2)
+    assert [user.user_id for user in users] == ids[1:]
+    assert users[0].score == 1.0
+    tag_matcher.invalidate()
@@ -0,0 +1,92 @@
+import pytest
+from users.models import Users as User
+from users.ngram_index import NgramIndex, user_name_index
+from users.service import UserServices
+
+
+def test_ngram_index_search():
+    index = NgramIndex()
+    index._built = True  # 不从数据库构建
+    index.upsert(1, "Alice")
+    index.upsert(2, "alicia")
+    index.upsert(3, "Bob")
+
+    assert index.search("LIC") == [1, 2]
+    assert index.search("lice") == [1]
+    # 短于 n 时无法使用索引
+    assert index.search("al") is None
+    # n-gram 都命中但不是连续子串
+    index.upsert(4, "abcxbcd")
+    assert index.search("abcd") == []
+
+    # 更新与删除
+    index.upsert(1, "Carol")
+    assert index.search("lic") == [2]
+    index.remove(2)
+    assert index.search("lic") == []
+    assert index._postings.get("lic") is None
+
+
+def test_ngram_index_rank():
+    index = NgramIndex()
+    index._built = True
+    index.upsert(1, "johnny walker")
+    index.upsert(2, "john")
+    ranked = index.rank("john", [1, 2])
+    assert [user_id for user_id, _ in ranked] == [2, 1]
+    assert ranked[0][1] == 1.0
+
+
+@pytest.mark.django_db(transaction=False)
+def test_list_uses_ngram_index():
+    user_name_index.invalidate()
+    for i, name in enumerate(["Wang Xiaoming", "wangwu", "Li Si"]):
+        User.objects.create(
+            user_name=name,
+            user_account=f"ngram{i}",
+            user_password="pwd",
+            user_status=0,
+            is_delete=0,
+            user_role=0,
+        )
+
+    page = UserServices.list("WANG")
+    assert [user.user_name for user in page["records"]] == ["Wang Xiaoming", "wangwu"]
+    assert user_name_index.built
+
+    page = UserServices.list("wangw", rank=True)
+    assert [user.user_name for user in page["records"]] == ["wangwu"]
+    user_name_index.invalidate()
+
+
+@pytest.mark.django_db(transaction=False)
+def test_ngram_index_catches_up_with_other_writers(monkeypatch):
+    user_name_index.invalidate()
+    assert UserServices.list("zhaoliu")["records"] == []
+
+    # 其他进程或直接写库新增的用户不会触发信号
+    (other,) = User.objects.bulk_create(
+        [
+            User(
+                user_name="zhaoliu",
+                user_account="ngram_other",
+                user_password="pwd",
+                user_status=0,
+                is_delete=0,
+                user_role=0,
+            )
+        ]
+    )
+    assert user_name_index.search("zhaoliu") == []
+    monkeypatch.setattr(user_name_index, "_refreshed_at", 0.0)
+    page = UserServices.list("zhaoliu")
+    assert [user.user_id for user in page["records"]] == [other.id]
+
+    # 改名不改变 id，由定期重建读取
+    User.objects.filter(user_account="ngram_other").update(user_name="sunqi")
+    user_name_index._rebuild()
+    assert user_name_index.search("zhaoliu") == []
+    assert [user.user_id for user in UserServices.list("sunqi")["records"]] == [
+        other.id
+    ]
+    user_name_index.invalidate()
@@ -0,0 +1,118 @@
+import io
+import json
+import sqlite3
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from benchmarks import run
+from tags.models import Tags
+from users.models import UniqueKey, Users as User
+from users.sharding import user_shards
+from users.test.test_sharding import sqlite_shards  # noqa: F401
+
+
+def _seeded(prefix):
+    return list(
+        User.all_objects.filter(user_account__startswith=prefix)
+        .order_by("id")
+        .values_list("user_account", "user_name", "planet_code", "tags")
+    )
+
+
+@pytest.mark.django_db(transaction=False)
+def test_seed_is_deterministic_and_unique():
+    options = dict(users=300, seed=7, prefix="seedtest", batch_size=64)
+    options.update(tag_parents=3, tags_per_parent=4, stdout=io.StringIO())
+    call_command("seed", **options)
+    first = _seeded("seedtest")
+    assert len(first) == 300
+    assert len({row[0] for row in first}) == 300
+    assert len({row[2] for row in first}) == 300
+    assert all(len(row[2]) <= 5 for row in first)
+
+    children = Tags.objects.filter(tag_name__endswith="-seedtest-0")
+    assert children.count() == 3
+    tag_names = set(Tags.objects.values_list("tag_name", flat=True))
+    counts = {}
+    for row in first:
+        for tag in json.loads(row[3] or "[]"):
+            assert tag in tag_names
+            counts[tag] = counts.get(tag, 0) + 1
+    # Zipf 分布：最热门的标签明显多于最冷门的
+    assert max(counts.values()) > 3 * min(counts.values())
+
+    # 同样的库状态和种子生成同样的数据，已有标签被复用
+    User.all_objects.filter(user_account__startswith="seedtest").delete()
+    call_command("seed", **options)
+    assert _seeded("seedtest") == first
+    assert Tags.objects.filter(tag_name__contains="-seedtest").count() == 3 + 12
+
+
+def test_benchmark_seed_creates_all_tables(
+    tmp_path, django_db_setup, django_db_blocker
+):
+    # 基准测试在空的 SQLite 文件上建表并生成数据，结束后切回测试数据库
+    original = connection.settings_dict["NAME"]
+    path = str(tmp_path / "bench.sqlite3")
+    with django_db_blocker.unblock():
+        try:
+            run.seed(20, path)
+            # 复用已生成的文件
+            run.seed(20, path)
+        finally:
+            run.use_database(original)
+    with sqlite3.connect(path) as db:
+        assert db.execute("SELECT COUNT(*) FROM users").fetchone() == (20,)
+        assert db.execute(
+            "SELECT SUM(value) FROM user_stats WHERE name = 'total'"
+        ).fetchone() == (20,)
+
+
+def test_seed_writes_to_shards(sqlite_shards):
+    call_command(
+        "seed",
+        users=40,
+        seed=3,
+        prefix="seedshard",
+        tag_parents=1,
+        stdout=io.StringIO(),
+    )
+    rows = [
+        (alias, user_id, account, planet_code)
+        for alias in sqlite_shards
+        for user_id, account, planet_code in User.all_objects.using(alias).values_list(
+            "id", "user_account", "planet_code"
+        )
+    ]
+    assert len(rows) == 40
+    assert (
+        not User.all_objects.using("default")
+        .filter(user_account__startswith="seedshard")
+        .exists()
+    )
+    # 按账号路由到分片，id 由全局序列分配，星球编号登记在 unique_keys
+    for alias, user_id, account, _ in rows:
+        assert sqlite_shards[user_shards.shard_index(account)] == alias
+        assert user_shards.alias_for_id(user_id) == alias
+    assert set(UniqueKey.objects.values_list("key_value", flat=True)) == {
+        planet_code for *_, planet_code in rows
+    }
+
+    # 再次生成时跳过各分片中已存在的账号和星球编号
+    call_command(
+        "seed",
+        users=10,
+        seed=3,
+        prefix="seedshard",
+        tag_parents=1,
+        stdout=io.StringIO(),
+    )
+    accounts = [
+        account
+        for alias in sqlite_shards
+        for account in User.all_objects.using(alias).values_list(
+            "user_account", flat=True
+        )
+    ]
+    assert len(accounts) == len(set(accounts)) == 50
+    assert UniqueKey.objects.count() == 50
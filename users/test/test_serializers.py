@@ -0,0 +1,72 @@
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+import pytest
+from ninja.responses import NinjaJSONEncoder
+from core.serialization import dumps
+from users import api
+from users.models import Users as User
+from users.schemas import (
+    MatchUser,
+    MatchUserData,
+    SafetyUser,
+    SearchResponse,
+    UserLoginResponseData,
+)
+from users.serializers import match_record, search_record
+from users.service import UserServices
+
+USER = dict(
+    user_account="fastuser",
+    user_name="快速",
+    user_id=7,
+    avatar_url=None,
+    gender=1,
+    phone=None,
+    email="a@b.c",
+    user_status=0,
+    user_role=0,
+    planet_code="12",
+)
+
+
+def test_compiled_serializers_match_model_dump():
+    user = SafetyUser(**USER)
+    expected = UserLoginResponseData.model_validate(user).model_dump()
+    assert list(search_record(user).items()) == list(expected.items())
+
+    matched = MatchUser(**USER, score=0.5)
+    expected = MatchUserData.model_validate(matched).model_dump(by_alias=True)
+    assert list(match_record(matched).items()) == list(expected.items())
+    assert "username" in expected and "id" in expected
+
+
+def test_dumps_matches_default_encoder():
+    data = {
+        "time": datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+        "amount": Decimal("1.50"),
+        1: "非字符串键",
+    }
+    assert json.loads(dumps(data)) == json.loads(json.dumps(data, cls=NinjaJSONEncoder))
+
+
+@pytest.mark.django_db(transaction=False)
+def test_fast_search_response_matches_validated(client, monkeypatch):
+    user_id = UserServices.user_register("fastadmin", "12345678", "12345678", "fast")
+    User.objects.filter(id=user_id).update(user_role=1)
+    UserServices.user_register("fastother", "12345678", "12345678", "fsto")
+    client.post(
+        "/api/users/login",
+        {"userAccount": "fastadmin", "userPassword": "12345678"},
+        content_type="application/json",
+    )
+
+    bodies = []
+    for fast in (True, False):
+        monkeypatch.setattr(api.config, "fast_serialization", fast)
+        response = client.get("/api/users/search", {"limit": 1})
+        assert response["Content-Type"] == "application/json; charset=utf-8"
+        bodies.append(response.json())
+    assert bodies[0] == bodies[1]
+    assert bodies[0]["data"]["next_cursor"]
+    SearchResponse.model_validate(bodies[0])
@@ -0,0 +1,97 @@
+import pytest
+from django.db import IntegrityError, connections
+from core.exception.business_exception import BusinessException
+from users.models import IdSequence, UniqueKey, Users as User
+from users.service import UserServices
+from users.sharding import SHARD_BITS, IdAllocator, user_shards
+
+SHARDS = ["shard_a", "shard_b", "shard_c"]
+
+
+@pytest.fixture
+def sqlite_shards(django_db_setup, django_db_blocker, tmp_path, monkeypatch):
+    """三个 SQLite 文件作为 users 分片；id_sequences 和 unique_keys 在测试库，结束时清空"""
+    for alias in SHARDS:
+        connections.settings[alias] = {
+            **connections.settings["default"],
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": str(tmp_path / f"{alias}.sqlite3"),
+        }
+    monkeypatch.setattr(user_shards, "aliases", SHARDS)
+    monkeypatch.setattr(user_shards, "ids", IdAllocator("users", 5))
+    with django_db_blocker.unblock():
+        try:
+            for alias in SHARDS:
+                with connections[alias].schema_editor() as editor:
+                    editor.create_model(User)
+            yield SHARDS
+        finally:
+            UniqueKey.objects.all().delete()
+            IdSequence.objects.all().delete()
+            for alias in SHARDS:
+                connections[alias].close()
+                del connections[alias]
+                del connections.settings[alias]
+
+
+def register(n: int, planet_code: str = "") -> int:
+    return UserServices.user_register(
+        f"sharded{n:03d}", "12345678", "12345678", planet_code or f"s{n}"
+    )
+
+
+def test_users_spread_by_account_with_global_ids(sqlite_shards):
+    ids = [register(n) for n in range(20)]
+    assert len(set(ids)) == 20
+    for n, user_id in enumerate(ids):
+        alias = sqlite_shards[user_shards.shard_index(f"sharded{n:03d}")]
+        assert user_shards.alias_for_id(user_id) == alias
+        assert User.objects.using(alias).filter(id=user_id).exists()
+    assert all(User.objects.using(alias).exists() for alias in sqlite_shards)
+    # 序号按 5 个一块领取
+    sequences = sorted(user_id >> SHARD_BITS for user_id in ids)
+    assert IdSequence.objects.get(name="users").next_value == sequences[-1] + 1
+
+    # 登录查账号所在的分片
+    user = UserServices.do_login(None, "sharded007", "12345678")
+    assert user.user_id == ids[7]
+
+
+def test_list_merges_shards_in_id_order(sqlite_shards):
+    ids = sorted(register(n) for n in range(20))
+    seen, cursor = [], None
+    while True:
+        page = UserServices.list(cursor=cursor, limit=7)
+        seen += [record.user_id for record in page["records"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ids
+
+
+def test_planet_code_unique_across_shards(sqlite_shards):
+    holder = register(0, planet_code="pc1")
+    # 找一个落在其他分片的账号
+    other = next(
+        n
+        for n in range(1, 100)
+        if user_shards.shard_index(f"sharded{n:03d}")
+        != user_shards.shard_index("sharded000")
+    )
+    with pytest.raises(BusinessException) as exc:
+        register(other, planet_code="pc1")
+    assert exc.value.description == "重复星球编号"
+
+    # 绕过预查时由 unique_keys 兜底，分片中不留下数据
+    user = UserServices._build_user(f"sharded{other:03d}", "x", "pc1", 0)
+    with pytest.raises(IntegrityError):
+        user_shards.create(user)
+    assert not any(
+        queryset.filter(user_account=user.user_account).exists()
+        for queryset in user_shards.each(User.all_objects)
+    )
+
+    # 删除后星球编号可以再次使用
+    assert UserServices.delete_user(holder)
+    assert not UniqueKey.objects.filter(key_value="pc1").exists()
+    assert register(other, planet_code="pc1") > 0
@@ -0,0 +1,26 @@
+import io
+import json
+from django.core.management import call_command
+from users.management.commands.startup_profile import parse_importtime
+
+
+def test_parse_importtime():
+    text = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |     users.schemas\n"
+        "import time:        30 |        150 |   users.api\n"
+    )
+    assert parse_importtime(text) == {
+        "users.schemas": (120, 120),
+        "users.api": (30, 150),
+    }
+
+
+def test_startup_profile_command(tmp_path):
+    out = io.StringIO()
+    output = tmp_path / "startup.json"
+    call_command("startup_profile", runs=1, top=5, output=str(output), stdout=out)
+    assert "NinjaAPI" in out.getvalue()
+    result = json.loads(output.read_text())
+    assert set(result["phases"]) >= {"django.setup", "URLconf", "NinjaAPI"}
+    assert "users.api" in result["modules"]
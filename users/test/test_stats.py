@@ -0,0 +1,104 @@
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from users.models import Users as User
+from users.schemas import UserRegisterRequest
+from users.service import UserServices
+from users.stats import user_stats
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    # 不在后台线程中校正；先校正一次，以当前库中的真实值为基准
+    monkeypatch.setattr(user_stats, "reconcile_interval", 0)
+    user_stats.reconcile()
+    return user_stats.snapshot()
+
+
+def changes(before, after):
+    """两次统计之间有变化的计数"""
+    result = {
+        name: after[name] - before[name] for name in ("total", "active", "deleted")
+    }
+    for group in ("by_role", "by_status"):
+        for key in before[group].keys() | after[group].keys():
+            result[f"{group}:{key}"] = after[group].get(key, 0) - before[group].get(
+                key, 0
+            )
+    return {name: delta for name, delta in result.items() if delta}
+
+
+@pytest.mark.django_db(transaction=False)
+def test_counters_follow_writes(stats):
+    first = UserServices.user_register("stats001", "12345678", "12345678", "st1")
+    UserServices.user_register("stats002", "12345678", "12345678", "st2", 1)
+    UserServices.batch_register(
+        [
+            UserRegisterRequest(
+                userAccount=f"stats10{n}",
+                userPassword="12345678",
+                checkPassword="12345678",
+                planetCode=f"st1{n}",
+            )
+            for n in range(3)
+        ]
+    )
+    after = UserServices.stats()
+    assert changes(stats, after) == {
+        "total": 5,
+        "active": 5,
+        "by_role:0": 5,
+        "by_status:0": 4,
+        "by_status:1": 1,
+    }
+
+    # 逻辑删除、恢复只计入状态确实变化的行
+    second = User.objects.get(user_account="stats002").id
+    assert UserServices.bulk_set_deleted([first, second]) == 2
+    assert UserServices.bulk_set_deleted([first, second]) == 0
+    assert UserServices.bulk_set_deleted([first], deleted=False) == 1
+    assert UserServices.delete_user(first)
+    assert changes(stats, UserServices.stats()) == {
+        "total": 4,
+        "active": 3,
+        "deleted": 1,
+        "by_role:0": 3,
+        "by_status:0": 3,
+    }
+    # 计数与真实值一致
+    assert user_stats.reconcile() == {}
+
+
+@pytest.mark.django_db(transaction=False)
+def test_reconcile_corrects_drift(stats):
+    # 绕过 UserServices 的写入不计数
+    User.objects.bulk_create(
+        [
+            User(
+                user_account="drift001",
+                user_password="x",
+                user_status=2,
+                user_role=1,
+                is_delete=0,
+            )
+        ]
+    )
+    assert changes(stats, UserServices.stats()) == {}
+
+    out = StringIO()
+    call_command("reconcile_user_stats", stdout=out)
+    assert "status:2: +1" in out.getvalue()
+    after = UserServices.stats()
+    assert changes(stats, after) == {
+        "total": 1,
+        "active": 1,
+        "by_role:1": 1,
+        "by_status:2": 1,
+    }
+    assert after["reconciled_at"] is not None
+
+    # 最近校正过时跳过
+    assert user_stats.reconcile(max_age=60) is None
+    out = StringIO()
+    call_command("reconcile_user_stats", "--max-age", "60", stdout=out)
+    assert "跳过" in out.getvalue()
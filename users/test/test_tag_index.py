@@ -0,0 +1,79 @@
+import pytest
+from users.models import Users as User
+from users.service import UserServices
+from users.tag_index import TagBitmapIndex, parse_tags, user_tag_index
+
+
+def test_parse_tags():
+    assert parse_tags('["Java", "男", "java"]') == ("java", "男")
+    assert parse_tags("java, python，大一") == ("java", "python", "大一")
+    assert parse_tags("学生") == ("学生",)
+    assert parse_tags(None) == ()
+
+
+def test_tag_bitmap_query():
+    index = TagBitmapIndex()
+    index._built = True  # 不从数据库构建
+    index.upsert(1, '["java","python"]')
+    index.upsert(2, '["java","男"]')
+    index.upsert(3, '["python"]')
+    index.upsert(4, None)
+
+    assert list(index.query(all_tags=["java"])) == [1, 2]
+    assert list(index.query(all_tags=["java", "python"])) == [1]
+    assert list(index.query(any_tags=["男", "python"])) == [1, 2, 3]
+    assert list(index.query(all_tags=["java"], none_tags=["男"])) == [1]
+    assert list(index.query(none_tags=["java"])) == [3, 4]
+    assert list(index.query(all_tags=["go"])) == []
+
+    index.upsert(1, '["go"]')
+    index.remove(2)
+    assert list(index.query(all_tags=["java"])) == []
+    assert list(index.query(all_tags=["go"])) == [1]
+
+
+@pytest.mark.django_db(transaction=False)
+def test_search_by_tags():
+    user_tag_index.invalidate()
+    for i, tags in enumerate(['["java","python"]', '["java"]', '["python"]']):
+        User.objects.create(
+            user_account=f"tagsearch{i}",
+            user_password="pwd",
+            user_status=0,
+            is_delete=0,
+            user_role=0,
+            tags=tags,
+        )
+
+    page = UserServices.search_by_tags(all_tags=["java"], limit=1)
+    assert [user.user_account for user in page["records"]] == ["tagsearch0"]
+    page = UserServices.search_by_tags(all_tags=["java"], cursor=page["next_cursor"])
+    assert [user.user_account for user in page["records"]] == ["tagsearch1"]
+    assert page["next_cursor"] is None
+
+    page = UserServices.search_by_tags(any_tags=["python"], none_tags=["java"])
+    assert [user.user_account for user in page["records"]] == ["tagsearch2"]
+    user_tag_index.invalidate()
+
+
+@pytest.mark.django_db(transaction=False)
+def test_tag_search_requires_admin(client):
+    UserServices.user_register("tagged01", "12345678", "12345678", "tg1")
+    UserServices.user_register("tagadmin", "12345678", "12345678", "tg2")
+    User.objects.filter(user_account="tagadmin").update(user_role=1)
+
+    def login(account):
+        client.post(
+            "/api/users/login",
+            {"userAccount": account, "userPassword": "12345678"},
+            content_type="application/json",
+        )
+
+    # 未登录、普通用户都拿不到用户列表(不带标签时原本会返回全部用户)
+    assert client.get("/api/users/search/tags").json()["data"]["records"] == []
+    login("tagged01")
+    assert client.get("/api/users/search/tags").json()["data"]["records"] == []
+
+    login("tagadmin")
+    records = client.get("/api/users/search/tags").json()["data"]["records"]
+    assert {"tagged01", "tagadmin"} <= {record["user_account"] for record in records}
@@ -0,0 +1,104 @@
+import pytest
+from unittest.mock import patch
+from django.db import IntegrityError, connection
+from core.bloom import BloomFilter
+from core.exception.business_exception import BusinessException
+from users.models import Users as User
+from users.service import UserServices
+from users.unique_filter import UniqueValueFilter
+
+
+def test_bloom_filter_save_and_load(tmp_path):
+    bloom = BloomFilter(1000, 0.01)
+    for i in range(1000):
+        bloom.add(f"user{i}")
+    count = bloom.count
+    bloom.add("user0")  # 重复元素不计数
+    assert bloom.count == count
+    assert all(f"user{i}" in bloom for i in range(1000))
+    false_positives = sum(f"other{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+    bloom.max_id = 42
+    path = str(tmp_path / "account.bloom")
+    bloom.save(path)
+    loaded = BloomFilter.load(path, 0.01)
+    assert loaded.bits == bloom.bits
+    assert (loaded.count, loaded.max_id) == (count, 42)
+    assert BloomFilter.load(str(tmp_path / "missing.bloom")) is None
+
+
+def _create_user(account: str, planet_code: str) -> User:
+    return User.objects.create(
+        user_account=account,
+        planet_code=planet_code,
+        user_password="pwd",
+        user_status=0,
+        is_delete=0,
+        user_role=0,
+    )
+
+
+@pytest.fixture
+def unique_indexes(db):
+    """测试库的 users 表按模型建表，没有唯一索引；随测试事务回滚"""
+    with connection.cursor() as cursor:
+        for field in ("user_account", "planet_code"):
+            cursor.execute(f"CREATE UNIQUE INDEX users_{field}_uniq ON users ({field})")
+
+
+@pytest.mark.django_db(transaction=False)
+def test_unique_value_filter_build_and_catch_up(tmp_path, unique_indexes):
+    first = _create_user("bloomone", "bf1")
+    value_filter = UniqueValueFilter(
+        "user_account", path=str(tmp_path / "account.bloom"), refresh_interval=0
+    )
+    assert value_filter.might_contain("bloomone")
+    assert value_filter.built
+    assert not value_filter.might_contain("bloomnone")
+
+    # 从快照加载后按 id 追赶快照之后新增的行
+    value_filter.save()
+    second = _create_user("bloomtwo", "bf2")
+    reloaded = UniqueValueFilter(
+        "user_account", path=str(tmp_path / "account.bloom"), refresh_interval=0
+    )
+    assert reloaded.might_contain("bloomtwo")
+    assert reloaded._bloom.max_id == second.id > first.id
+
+
+@pytest.mark.django_db(transaction=False)
+def test_register_skips_exists_query_and_maps_integrity_error():
+    UserServices.user_register("bloomuser", "12345678", "12345678", "bf3")
+    with pytest.raises(BusinessException) as exc:
+        UserServices.user_register("bloomuser", "12345678", "12345678", "bf4")
+    assert exc.value.description == "重复用户名"
+
+    # 过滤器漏掉了其他进程的写入时，由插入时的唯一索引冲突兜底
+    with patch("users.service.account_filter.might_contain", return_value=False):
+        with patch.object(User, "save", side_effect=IntegrityError("Duplicate entry")):
+            with pytest.raises(BusinessException) as exc:
+                UserServices.user_register("bloomuser", "12345678", "12345678", "bf5")
+    assert exc.value.description == "重复用户名"
+
+
+@pytest.mark.django_db(transaction=False)
+def test_unique_value_filter_requires_unique_index():
+    _create_user("bloomplain", "bf6")
+    value_filter = UniqueValueFilter("user_account", refresh_interval=0)
+    # 没有唯一索引时不能跳过查询
+    assert value_filter.might_contain("bloomnone")
+    assert not value_filter.built
+
+
+@pytest.mark.django_db(transaction=False)
+def test_soft_deleted_account_stays_in_filter(unique_indexes):
+    user = _create_user("bloomgone", "bf7")
+    User.all_objects.filter(id=user.id).update(is_delete=1)
+    value_filter = UniqueValueFilter("user_account", refresh_interval=0)
+    assert value_filter.might_contain("bloomgone")
+
+    # 已逻辑删除的账号仍然占用唯一索引，插入冲突报重复用户名
+    with pytest.raises(BusinessException) as exc:
+        UserServices.user_register("bloomgone", "12345678", "12345678", "bf8")
+    assert exc.value.description == "重复用户名"
@@ -1,19 +1,27 @@
 import hashlib
-from unittest.mock import MagicMock
+import json
+from unittest.mock import AsyncMock, MagicMock
 import pytest
 import warnings
 from pydantic import PydanticDeprecatedSince20
 
 warnings.filterwarnings("ignore", category=PydanticDeprecatedSince20)
 from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from users import export
 from users.models import Users as User
 from users.service import UserServices
+from users.schemas import UserRegisterRequest
+from users.hashers import check_password
 from django.utils import timezone
+from django.core.management import call_command
 from core.exception.business_exception import BusinessException
-from core.config import ProjectConfig
+from core.config import get_config
 from django.http import HttpRequest
+from asgiref.sync import async_to_sync
 
-config = ProjectConfig()  # type: ignore
+config = get_config()
 
 USER_LOGIN_STATE = config.user_login_state
 SALT = config.salt
@@ -202,3 +210,260 @@ def test_do_logout():
         user_service.do_logout(mock_request)
     assert exc.value.description == "用户已登出"
     mock_session.flush.assert_called()
+
+
+@pytest.mark.django_db(transaction=False)
+def test_async_register_and_login():
+    # 异步版本与同步版本行为一致
+    with pytest.raises(BusinessException) as exc:
+        async_to_sync(UserServices.auser_register)(
+            "abc", "password123", "password123", "1"
+        )
+    assert exc.value.description == "用户账号过短"
+
+    user_id = async_to_sync(UserServices.auser_register)(
+        "asyncuser1", "password123", "password123", "a1234"
+    )
+    assert user_id > 0
+
+    with pytest.raises(BusinessException) as exc:
+        async_to_sync(UserServices.auser_register)(
+            "asyncuser1", "password123", "password123", "a1235"
+        )
+    assert exc.value.description == "重复用户名"
+
+    mock_request = MagicMock(spec=HttpRequest)
+    mock_request.session = MagicMock()
+    mock_request.session.aset = AsyncMock()
+    result = async_to_sync(UserServices.ado_login)(
+        mock_request, "asyncuser1", "password123"
+    )
+    assert result.user_id == user_id
+    mock_request.session.aset.assert_awaited_once()
+
+    assert async_to_sync(UserServices.adelete_user)(user_id)
+    assert not async_to_sync(UserServices.adelete_user)(user_id)
+
+
+@pytest.mark.django_db(transaction=False)
+def test_list_keyset_pagination():
+    for i in range(5):
+        User.objects.create(
+            user_name=f"page{i}",
+            user_account=f"pageuser{i}",
+            user_password="pwd",
+            planet_code=f"p{i}",
+            user_status=i % 2,
+            is_delete=0,
+            user_role=0,
+            create_time=timezone.now(),
+        )
+
+    # 逐页获取，直到没有下一页
+    seen = []
+    cursor = None
+    while True:
+        page = UserServices.list("page", cursor=cursor, limit=2)
+        seen += [user.user_account for user in page["records"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [f"pageuser{i}" for i in range(5)]
+
+    # 过滤条件
+    page = UserServices.list("page", user_status=1, limit=10)
+    assert [user.user_account for user in page["records"]] == ["pageuser1", "pageuser3"]
+    assert page["next_cursor"] is None
+
+    # 非法游标
+    with pytest.raises(BusinessException) as exc:
+        UserServices.list("page", cursor="not-a-cursor")
+    assert exc.value.description == "分页游标无效"
+
+
+@pytest.mark.django_db(transaction=False)
+def test_export_resumable():
+    ids = [
+        User.objects.create(
+            user_account=f"export{i}",
+            user_password="pwd",
+            planet_code=f"e{i}",
+            user_status=0,
+            is_delete=0,
+            user_role=0,
+        ).id
+        for i in range(3)
+    ]
+
+    # 分批读取与一次读取结果相同，after_id 之前的数据不再导出
+    lines = list(UserServices.export("ndjson", after_id=ids[0]))
+    exported = [json.loads(line)["user_id"] for line in lines]
+    assert exported[-2:] == ids[1:]
+    assert ids[0] not in exported
+
+    lines = list(UserServices.export("csv", after_id=ids[1]))
+    assert lines[0].startswith("user_account,user_name,user_id")
+    assert lines[-1].startswith("export2,")
+
+    with pytest.raises(BusinessException) as exc:
+        UserServices.export("xml")
+    assert exc.value.description == "不支持的导出格式"
+
+
+@pytest.mark.django_db(transaction=False)
+def test_export_streams_under_asgi(monkeypatch):
+    UserServices.user_register("exportadmin", "12345678", "12345678", "ea1")
+    User.objects.filter(user_account="exportadmin").update(user_role=1)
+    for i in range(3):
+        UserServices.user_register(f"asgiexport{i}", "12345678", "12345678", f"ae{i}")
+    # 每次只从同步线程取一行，确认是边读边发送而不是一次性读完
+    monkeypatch.setattr(export, "ASYNC_BATCH_LINES", 1)
+
+    async def run():
+        client = AsyncClient()
+        await client.post(
+            "/api/users/login",
+            {"userAccount": "exportadmin", "userPassword": "12345678"},
+            content_type="application/json",
+        )
+        response = await client.get("/api/users/export", {"format": "ndjson"})
+        assert response.is_async
+        return [chunk async for chunk in response.streaming_content]
+
+    chunks = async_to_sync(run)()
+    accounts = [json.loads(chunk)["user_account"] for chunk in chunks]
+    assert len(chunks) == len(accounts) >= 4
+    assert {"asgiexport0", "asgiexport1", "asgiexport2"} <= set(accounts)
+
+
+@pytest.mark.django_db(transaction=False)
+def test_batch_register():
+    User.objects.create(
+        user_account="batchold",
+        user_password="pwd",
+        planet_code="bold",
+        user_status=0,
+        is_delete=0,
+        user_role=0,
+    )
+
+    def item(account, planet_code, password="password123"):
+        return UserRegisterRequest(
+            user_account=account,
+            user_password=password,
+            check_password=password,
+            planet_code=planet_code,
+        )
+
+    results = UserServices.batch_register(
+        [
+            item("batchnew1", "bn1"),
+            item("batchnew2", "bn2"),
+            item("batchold", "bn3"),  # 与数据库重复
+            item("batchnew1", "bn4"),  # 批次内重复
+            item("batchnew3", "bold"),  # 星球编号与数据库重复
+            item("batchnew4", "bn5", password="short"),
+        ]
+    )
+    assert [result["success"] for result in results] == [True, True] + [False] * 4
+    assert [result["description"] for result in results[2:]] == [
+        "重复用户名",
+        "重复用户名",
+        "重复星球编号",
+        "用户密码过短",
+    ]
+    assert User.objects.get(user_account="batchnew2").id == results[1]["user_id"]
+
+
+@pytest.mark.django_db(transaction=False)
+def test_login_upgrades_legacy_md5_password():
+    User.objects.create(
+        user_account="legacymd5",
+        user_password=hashlib.md5((SALT + "password123").encode("utf-8")).hexdigest(),
+        user_status=0,
+        is_delete=0,
+        user_role=0,
+        planet_code="md5",
+    )
+    UserServices.do_login(None, "legacymd5", "password123")
+
+    # 旧的 MD5 密文在登录成功后被替换为当前算法
+    encoded = User.objects.get(user_account="legacymd5").user_password
+    assert encoded.startswith(config.password_hasher + "$")
+    assert check_password("password123", encoded) == (True, False)
+    assert check_password("wrongpassword", encoded) == (False, False)
+
+    # 升级后仍然可以正常登录
+    result = UserServices.do_login(None, "legacymd5", "password123")
+    assert result.user_account == "legacymd5"
+
+
+@pytest.mark.django_db(transaction=False)
+def test_bulk_soft_delete_restore_and_purge():
+    ids = [
+        User.objects.create(
+            user_account=f"bulkdel{i}",
+            user_password="pwd",
+            user_status=0,
+            is_delete=0,
+            user_role=0,
+        ).id
+        for i in range(3)
+    ]
+
+    # 逻辑删除：已删除和不存在的 id 不计入
+    assert UserServices.bulk_set_deleted(ids[:2] + [10**9]) == 2
+    assert UserServices.bulk_set_deleted(ids[:2]) == 0
+    assert list(User.objects.filter(id__in=ids).values_list("id", flat=True)) == [
+        ids[2]
+    ]
+    assert User.all_objects.filter(id__in=ids).count() == 3
+
+    # 恢复
+    assert UserServices.bulk_set_deleted([ids[0]], deleted=False) == 1
+    assert User.objects.filter(id=ids[0]).exists()
+
+    # 只物理删除逻辑删除超过 N 天的用户
+    User.all_objects.filter(id=ids[1]).update(
+        update_time=timezone.now() - timezone.timedelta(days=40)
+    )
+    call_command("purge_deleted_users", days=30, batch_size=1, sleep=0)
+    assert not User.all_objects.filter(id=ids[1]).exists()
+    assert User.all_objects.filter(id__in=ids).count() == 2
+
+    with pytest.raises(BusinessException) as exc:
+        UserServices.bulk_set_deleted([])
+    assert exc.value.description == "参数为空"
+
+
+@pytest.mark.django_db(transaction=False)
+def test_login_throttle_rejects_before_database(client, monkeypatch):
+    from core.throttle import ShardedTokenBucketBackend
+    from users.service import login_throttle
+
+    monkeypatch.setattr(login_throttle, "backend", ShardedTokenBucketBackend())
+    monkeypatch.setattr(config, "login_throttle_account_burst", 2)
+    UserServices.user_register("throttled", "12345678", "12345678", "thr")
+
+    for _ in range(2):
+        response = client.post(
+            "/api/users/login",
+            {"userAccount": "throttled", "userPassword": "wrongpassword"},
+            content_type="application/json",
+        )
+        assert response.json()["code"] == 40102
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.post(
+            "/api/users/login",
+            {"userAccount": "throttled", "userPassword": "12345678"},
+            content_type="application/json",
+        )
+    assert response.status_code == 429
+    assert response.json()["code"] == 42900
+    assert not [q for q in queries if '"users"' in q["sql"]]
+
+    # 其他账号不受影响
+    with pytest.raises(BusinessException) as exc:
+        UserServices.do_login(None, "otheraccount", "12345678")
+    assert exc.value.code == 40102
@@ -0,0 +1,254 @@
+"""
+账号 / 星球编号唯一性的概率预检
+注册时先查进程内布隆过滤器：判断"一定不存在"时跳过数据库的 exists() 查询，
+判断"可能存在"时再回表确认；最终由数据库唯一索引在插入时兜底(并发注册、其他进程的写入)
+跳过查询依赖唯一索引：首次使用时检查 users 表(分片时每个分片)上的唯一索引，
+没有时不启用过滤器，每次注册都查询数据库
+过滤器包含已逻辑删除的行：它们仍然占用唯一索引中的值
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from typing import Optional
+from asgiref.sync import sync_to_async
+from django.db import connections, router
+from django.db.models.signals import post_delete, post_save
+from core.bloom import BloomFilter
+from core.config import get_config
+from core.db_router import use_primary
+from .models import Users as User
+from .sharding import user_shards
+from .signals import users_changed
+
+config = get_config()
+logger = logging.getLogger("django")
+
+# 过滤器容量为当前行数的 GROWTH 倍，且不小于 MIN_CAPACITY
+GROWTH = 2
+MIN_CAPACITY = 100000
+# 删除(布隆过滤器无法移除元素)累积超过 STALE_MIN 且超过现有元素的 STALE_RATIO 时重建
+STALE_MIN = 1000
+STALE_RATIO = 0.2
+
+
+class UniqueValueFilter:
+    """users 表某个唯一字段的进程内布隆过滤器
+
+    - 首次使用时从数据库构建；配置了持久化目录时优先加载快照，再按主键增量追赶
+    - 本进程的写入通过信号实时加入；其他进程的新增行每隔 refresh_interval 秒按 id 追赶一次
+    - 元素数超过容量或删除累积过多时整体重建
+    """
+
+    def __init__(
+        self,
+        field: str,
+        enabled: bool = True,
+        error_rate: float = 0.001,
+        path: Optional[str] = None,
+        refresh_interval: float = 5,
+    ):
+        self.field = field
+        self.enabled = enabled
+        self.error_rate = error_rate
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self._lock = threading.RLock()
+        self._bloom: Optional[BloomFilter] = None
+        self._stale = 0
+        self._refreshed_at = 0.0
+        # 数据库是否有该字段的唯一索引，首次刷新时检查
+        self._indexed: Optional[bool] = None
+
+    @property
+    def built(self) -> bool:
+        return self._bloom is not None
+
+    def build(self) -> None:
+        """从 users 表全量构建"""
+        count = sum(queryset.count() for queryset in user_shards.each(User.all_objects))
+        bloom = BloomFilter(max(count * GROWTH, MIN_CAPACITY), self.error_rate)
+        rows = user_shards.iterate(
+            User.all_objects.exclude(**{f"{self.field}__isnull": True})
+            .values_list("id", self.field)
+            .order_by()
+        )
+        for user_id, value in rows:
+            bloom.add(value)
+            bloom.max_id = max(bloom.max_id, user_id)
+        with self._lock:
+            self._bloom, self._stale = bloom, 0
+            self._refreshed_at = time.monotonic()
+        logger.info(f"{self.field} bloom filter built: {bloom.count} values")
+        self.save()
+
+    def _load(self) -> bool:
+        if not self.path:
+            return False
+        bloom = BloomFilter.load(self.path, self.error_rate)
+        if bloom is None or bloom.saturated:
+            return False
+        with self._lock:
+            self._bloom, self._stale = bloom, 0
+        self._catch_up()
+        logger.info(f"{self.field} bloom filter loaded: {bloom.count} values")
+        return True
+
+    def _catch_up(self) -> None:
+        """加入 id 大于已知最大 id 的新行(其他进程的注册)
+        分片时各进程按块领取 id，其他进程较小的 id 可能晚于这里的最大 id 写入而被跳过；
+        漏掉的值只会让注册跳过预查，由唯一索引和 unique_keys 表兜底
+        """
+        bloom = self._bloom
+        rows = user_shards.iterate(
+            User.all_objects.filter(id__gt=bloom.max_id)
+            .exclude(**{f"{self.field}__isnull": True})
+            .values_list("id", self.field)
+            .order_by("id")
+        )
+        for user_id, value in rows:
+            bloom.add(value)
+            bloom.max_id = max(bloom.max_id, user_id)
+        self._refreshed_at = time.monotonic()
+
+    def _needs_rebuild(self) -> bool:
+        bloom = self._bloom
+        return (
+            bloom is None
+            or bloom.saturated
+            or self._stale > max(STALE_MIN, bloom.count * STALE_RATIO)
+        )
+
+    def _needs_refresh(self) -> bool:
+        return self._needs_rebuild() or (
+            self.refresh_interval > 0
+            and time.monotonic() - self._refreshed_at >= self.refresh_interval
+        )
+
+    def _verify_index(self) -> bool:
+        """插入时能否由数据库拒绝重复值：分片时星球编号由 unique_keys 表保证，
+        其余情况要求 users 表(分片时每个分片)上有该字段的单列唯一索引
+        """
+        if self.field == "planet_code" and user_shards.enabled:
+            return True
+        aliases = user_shards.aliases or [router.db_for_write(User)]
+        return all(
+            self.field in unique_columns(User._meta.db_table, alias)
+            for alias in aliases
+        )
+
+    @use_primary()
+    def refresh(self) -> None:
+        with self._lock:
+            if self._indexed is None:
+                self._indexed = self._verify_index()
+                if not self._indexed:
+                    logger.warning(
+                        f"{self.field} bloom filter disabled: "
+                        f"no unique index on users.{self.field}"
+                    )
+            if not self._indexed:
+                return
+            if self._bloom is None and self._load():
+                return
+            if self._needs_rebuild():
+                self.build()
+            elif self._needs_refresh():
+                self._catch_up()
+
+    def might_contain(self, value: str) -> bool:
+        """返回 False 表示数据库中一定不存在该值，未启用时总是返回 True"""
+        if not self.enabled or self._indexed is False:
+            return True
+        if self._needs_refresh():
+            self.refresh()
+        return not self._indexed or value in self._bloom
+
+    async def amight_contain(self, value: str) -> bool:
+        if not self.enabled or self._indexed is False:
+            return True
+        # 只有需要访问数据库时才切换到线程执行
+        if self._needs_refresh():
+            await sync_to_async(self.refresh)()
+        return not self._indexed or value in self._bloom
+
+    def add(self, value: Optional[str]) -> None:
+        bloom = self._bloom
+        if bloom is None or not value:
+            return
+        bloom.add(value)
+
+    def invalidate(self) -> None:
+        """丢弃过滤器，下次使用时重新检查唯一索引并构建(例如绕过 ORM 批量导入或修改数据、表结构后)"""
+        with self._lock:
+            self._bloom = None
+            self._indexed = None
+
+    def save(self) -> None:
+        if not self.path or self._bloom is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._bloom.save(self.path)
+        except OSError:
+            logger.warning(f"save {self.field} bloom filter failed", exc_info=True)
+
+    def on_saved(self, sender, instance: User, **kwargs) -> None:
+        # 保存后立即加入(不等事务提交)：回滚只会多出误判，不会漏判
+        self.add(getattr(instance, self.field))
+
+    def on_deleted(self, sender, instance: User, **kwargs) -> None:
+        self._stale += 1
+
+    def on_users_changed(self, sender, users=(), removed_ids=(), **kwargs) -> None:
+        for user in users:
+            self.add(getattr(user, self.field))
+        self._stale += len(removed_ids)
+
+
+def unique_columns(table: str, alias: str) -> set:
+    """表上单列唯一约束(含主键)的列名"""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return {
+        constraint["columns"][0]
+        for constraint in constraints.values()
+        if constraint["unique"] and len(constraint["columns"]) == 1
+    }
+
+
+def _path(field: str) -> Optional[str]:
+    if not config.unique_filter_dir:
+        return None
+    return os.path.join(config.unique_filter_dir, f"{field}.bloom")
+
+
+account_filter = UniqueValueFilter(
+    "user_account",
+    config.unique_filter,
+    config.unique_filter_error_rate,
+    _path("user_account"),
+    config.unique_filter_refresh,
+)
+planet_code_filter = UniqueValueFilter(
+    "planet_code",
+    config.unique_filter,
+    config.unique_filter_error_rate,
+    _path("planet_code"),
+    config.unique_filter_refresh,
+)
+
+for _filter in (account_filter, planet_code_filter):
+    post_save.connect(
+        _filter.on_saved, sender=User, dispatch_uid=f"{_filter.field}_filter"
+    )
+    post_delete.connect(
+        _filter.on_deleted, sender=User, dispatch_uid=f"{_filter.field}_filter"
+    )
+    users_changed.connect(
+        _filter.on_users_changed, dispatch_uid=f"{_filter.field}_filter"
+    )
+    atexit.register(_filter.save)